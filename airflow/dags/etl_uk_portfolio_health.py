@@ -1,17 +1,26 @@
+import os
 from datetime import datetime, timedelta
 
-from airflow.models.baseoperator import chain
-from airflow.operators.python import PythonOperator
+from airflow.models import Variable
+from airflow.operators.python import PythonOperator, ShortCircuitOperator
 from airflow.providers.snowflake.operators.snowflake import SnowflakeOperator
 
 from airflow import DAG
+from src.pipeline.jobs.advanced_metrics import main as build_advanced_metrics
 from src.pipeline.jobs.data_quality import dq_check
 from src.pipeline.jobs.export_snapshots import export_portfolio_metrics
-from src.pipeline.jobs.incremental_load import main as run_incremental_main
+from src.pipeline.jobs.fact_prices import main as build_fact_prices
+from src.pipeline.jobs.incremental_load import load_source, source_tasks
 from src.pipeline.jobs.load_transactions_csv import main as load_transactions_csv
+from src.pipeline.jobs.portfolio_metrics import main as build_portfolio_metrics
+from src.pipeline.jobs.positions_daily import main as build_positions_daily
 from src.pipeline.jobs.profile_queries import profile_snowflake_queries
 from src.pipeline.jobs.upload_to_s3 import upload_latest_snapshot
 from src.pipeline.utils.alerts import send_slack_alert
+from src.pipeline.utils.task_graph import TASK_DEPENDENCIES, schema_hash
+
+SQL_DIR = "/opt/airflow/sql"
+SCHEMA_HASH_VARIABLE = "etl_uk_portfolio_health_schema_hash"
 
 
 def airflow_failure_callback(context):
@@ -24,6 +33,20 @@ def airflow_failure_callback(context):
     send_slack_alert(msg)
 
 
+def schema_changed():
+    """
+    True when the DDL files differ from the last applied version (or FORCE_DDL=1);
+    False skips the DDL tasks for this run.
+    """
+    if os.getenv("FORCE_DDL", "0") == "1":
+        return True
+    return Variable.get(SCHEMA_HASH_VARIABLE, default_var=None) != schema_hash(SQL_DIR)
+
+
+def record_schema_version():
+    Variable.set(SCHEMA_HASH_VARIABLE, schema_hash(SQL_DIR))
+
+
 default_args = {
     "owner": "izel",
     "retries": 2,
@@ -39,8 +62,16 @@ with DAG(
     default_args=default_args,
     max_active_runs=1,
     tags=["portfolio", "etl", "analytics"],
-    template_searchpath=["/opt/airflow/sql"],
+    template_searchpath=[SQL_DIR],
 ) as dag:
+    # Only the first DDL task is skipped directly; the rest of the DDL chain skips
+    # through the default all_success rule, and the first data tasks use
+    # none_failed so they still run after a skipped DDL block
+    t_check_schema_version = ShortCircuitOperator(
+        task_id="check_schema_version",
+        python_callable=schema_changed,
+        ignore_downstream_trigger_rules=False,
+    )
     t_apply_roles = SnowflakeOperator(
         task_id="apply_roles",
         sql="00_roles_warehouses.sql",
@@ -59,39 +90,67 @@ with DAG(
         snowflake_conn_id="snowflake_default",
     )
 
-    t_incremental_load = PythonOperator(
-        task_id="incremental_load",
-        python_callable=run_incremental_main,
+    t_apply_metrics_view = SnowflakeOperator(
+        task_id="apply_metrics_view",
+        sql="04_portfolio_metrics.sql",
+        snowflake_conn_id="snowflake_default",
+    )
+    t_record_schema_version = PythonOperator(
+        task_id="record_schema_version",
+        python_callable=record_schema_version,
     )
 
+    # The source / symbol batch list (INCREMENTAL_SYMBOL_BATCH) is built when the run
+    # starts, not when the scheduler parses this file, and passed on as XCom
+    t_plan_incremental_load = PythonOperator(
+        task_id="plan_incremental_load",
+        python_callable=source_tasks,
+        trigger_rule="none_failed",
+    )
+    # One mapped instance per planned batch, each with its own connection and
+    # watermark, so a retry only re-runs what failed; dq_check waits for all of them
+    t_incremental_load = PythonOperator.partial(
+        task_id="incremental_load",
+        python_callable=load_source,
+        trigger_rule="none_failed",
+        map_index_template=(
+            "{{ task.op_kwargs['source'] }} "
+            "{{ (task.op_kwargs.get('symbols') or []) | join(',') }}"
+        ),
+    ).expand(op_kwargs=t_plan_incremental_load.output)
+
     t_dq_check = PythonOperator(
         task_id="dq_check",
         python_callable=dq_check,
     )
-    t_build_fact_prices = SnowflakeOperator(
+    # Computed in Python with a window look-back and as-of FX conversion
+    # (src/pipeline/transform/prices.py, fx.py); 03_analytics_table.sql stays as
+    # the former USD/GBP-only, exact-date definition
+    t_build_fact_prices = PythonOperator(
         task_id="build_fact_prices",
-        sql="03_analytics_table.sql",
-        snowflake_conn_id="snowflake_default",
+        python_callable=build_fact_prices,
     )
     t_load_transactions_csv = PythonOperator(
         task_id="load_transactions_csv",
         python_callable=load_transactions_csv,
+        trigger_rule="none_failed",
     )
-    t_build_positions_daily = SnowflakeOperator(
+    # Event-sourced in Python (src/pipeline/transform/positions.py);
+    # 05_positions_daily.sql stays as the reference definition
+    t_build_positions_daily = PythonOperator(
         task_id="build_positions_daily",
-        sql="05_positions_daily.sql",
-        snowflake_conn_id="snowflake_default",
+        python_callable=build_positions_daily,
     )
 
-    t_build_portfolio_metrics = SnowflakeOperator(
+    t_build_portfolio_metrics = PythonOperator(
         task_id="build_portfolio_metrics",
-        sql="04_portfolio_metrics.sql",
-        snowflake_conn_id="snowflake_default",
+        python_callable=build_portfolio_metrics,
     )
-    t_build_advanced_metrics = SnowflakeOperator(
+    # Computed in Python (src/pipeline/transform/advanced_metrics.py);
+    # 06_advanced_metrics.sql stays as the reference definition
+    t_build_advanced_metrics = PythonOperator(
         task_id="build_advanced_metrics",
-        sql="06_advanced_metrics.sql",
-        snowflake_conn_id="snowflake_default",
+        python_callable=build_advanced_metrics,
     )
 
     t_export_snapshot = PythonOperator(
@@ -107,18 +166,8 @@ with DAG(
         python_callable=upload_latest_snapshot,
     )
 
-    chain(
-        t_apply_roles,
-        t_apply_schemas,
-        t_apply_tables,
-        t_incremental_load,
-        t_dq_check,
-        t_build_fact_prices,
-        t_load_transactions_csv,
-        t_build_positions_daily,
-        t_build_portfolio_metrics,
-        t_build_advanced_metrics,
-        t_export_snapshot,
-        t_upload_s3,
-        t_profile_queries,
-    )
+    # Wire the graph from src/pipeline/utils/task_graph.py
+    tasks = {t.task_id: t for t in dag.tasks}
+    for task_id, upstream in TASK_DEPENDENCIES.items():
+        for upstream_id in upstream:
+            tasks[upstream_id] >> tasks[task_id]
@@ -37,6 +37,13 @@ CREATE TABLE IF NOT EXISTS PORTFOLIO.RAW.PORTFOLIO_POSITIONS (
   CONSTRAINT pk_positions PRIMARY KEY (portfolio_id, symbol)
 );
 
+-- Read by the FACT_PRICES build (src/pipeline/jobs/fact_prices.py)
+CREATE TABLE IF NOT EXISTS PORTFOLIO.ANALYTICS.DIM_SYMBOL (
+  SYMBOL STRING PRIMARY KEY,
+  COMPANY_NAME STRING,
+  CURRENCY STRING
+);
+
 CREATE TABLE IF NOT EXISTS PORTFOLIO.ANALYTICS.FACT_PRICES (
   SYMBOL STRING,
 	DATE DATE,
@@ -48,11 +55,17 @@ CREATE TABLE IF NOT EXISTS PORTFOLIO.ANALYTICS.FACT_PRICES (
 	CLOSE NUMBER(18,6),
 	VOLUME NUMBER(38,0),
 	USD_TO_GBP NUMBER(18,8),
+	FX_TO_GBP NUMBER(24,12),
 	CLOSE_GBP NUMBER(34,12),
 	DAILY_RETURN NUMBER(31,12),
 	ROLLING_7D_AVG_CLOSE NUMBER(33,9),
-	ROLLING_30D_VOLATILITY FLOAT
+	ROLLING_30D_VOLATILITY FLOAT,
+	_LOADED_AT TIMESTAMP_NTZ
 );
+-- GBP per unit of the listing currency (USD_TO_GBP for US listings)
+ALTER TABLE PORTFOLIO.ANALYTICS.FACT_PRICES ADD COLUMN IF NOT EXISTS FX_TO_GBP NUMBER(24,12);
+-- Start of the build run that last wrote the row; portfolio metrics recompute from it
+ALTER TABLE PORTFOLIO.ANALYTICS.FACT_PRICES ADD COLUMN IF NOT EXISTS _LOADED_AT TIMESTAMP_NTZ;
 
 CREATE TABLE IF NOT EXISTS PORTFOLIO.ANALYTICS.PIPELINE_MONITORING (
   run_id STRING NOT NULL,
@@ -61,8 +74,50 @@ CREATE TABLE IF NOT EXISTS PORTFOLIO.ANALYTICS.PIPELINE_MONITORING (
   status STRING NOT NULL,
   record_count NUMBER,
   error_message STRING,
+  span_path STRING,
+  started_at TIMESTAMP_NTZ,
+  duration_s FLOAT,
+  cpu_s FLOAT,
+  peak_rss_mb FLOAT,
+  rows_in NUMBER,
+  rows_out NUMBER,
+  bytes NUMBER,
   _logged_at TIMESTAMP_NTZ DEFAULT CURRENT_TIMESTAMP()
 );
+-- Stage timings from src/pipeline/utils/instrument.py (one row per span)
+ALTER TABLE PORTFOLIO.ANALYTICS.PIPELINE_MONITORING ADD COLUMN IF NOT EXISTS span_path STRING;
+ALTER TABLE PORTFOLIO.ANALYTICS.PIPELINE_MONITORING ADD COLUMN IF NOT EXISTS started_at TIMESTAMP_NTZ;
+ALTER TABLE PORTFOLIO.ANALYTICS.PIPELINE_MONITORING ADD COLUMN IF NOT EXISTS duration_s FLOAT;
+ALTER TABLE PORTFOLIO.ANALYTICS.PIPELINE_MONITORING ADD COLUMN IF NOT EXISTS cpu_s FLOAT;
+ALTER TABLE PORTFOLIO.ANALYTICS.PIPELINE_MONITORING ADD COLUMN IF NOT EXISTS peak_rss_mb FLOAT;
+ALTER TABLE PORTFOLIO.ANALYTICS.PIPELINE_MONITORING ADD COLUMN IF NOT EXISTS rows_in NUMBER;
+ALTER TABLE PORTFOLIO.ANALYTICS.PIPELINE_MONITORING ADD COLUMN IF NOT EXISTS rows_out NUMBER;
+ALTER TABLE PORTFOLIO.ANALYTICS.PIPELINE_MONITORING ADD COLUMN IF NOT EXISTS bytes NUMBER;
+
+-- Snowflake cost per pipeline task and run, from QUERY_TAG'd query history
+CREATE TABLE IF NOT EXISTS PORTFOLIO.ANALYTICS.QUERY_PROFILE_HISTORY (
+  run_id STRING NOT NULL,
+  dag_id STRING,
+  task_id STRING NOT NULL,
+  run_start TIMESTAMP_NTZ,
+  run_end TIMESTAMP_NTZ,
+  queries NUMBER,
+  elapsed_s FLOAT,
+  execution_s FLOAT,
+  queued_s FLOAT,
+  bytes_scanned NUMBER,
+  partitions_scanned NUMBER,
+  partitions_total NUMBER,
+  bytes_spilled_local NUMBER,
+  bytes_spilled_remote NUMBER,
+  rows_produced NUMBER,
+  elapsed_ratio FLOAT,
+  bytes_ratio FLOAT,
+  spill_ratio FLOAT,
+  regression STRING,
+  _profiled_at TIMESTAMP_NTZ DEFAULT CURRENT_TIMESTAMP(),
+  CONSTRAINT pk_query_profile_history PRIMARY KEY (run_id, task_id)
+);
 
 -- Transactions log
 CREATE TABLE IF NOT EXISTS PORTFOLIO.RAW.PORTFOLIO_TRANSACTIONS (
@@ -85,14 +140,37 @@ CREATE TABLE IF NOT EXISTS PORTFOLIO.ANALYTICS.PORTFOLIO_POSITIONS_DAILY (
   _created_at  TIMESTAMP_NTZ DEFAULT CURRENT_TIMESTAMP(),
   CONSTRAINT pk_positions_daily PRIMARY KEY (portfolio_id, symbol, date)
 );
-CREATE OR REPLACE TABLE PORTFOLIO.RAW.FACT_BENCHMARK (
+-- Run-length positions: one row per stretch of constant, non-zero quantity.
+-- valid_to is the last day held (inclusive), NULL while the position is open.
+CREATE TABLE IF NOT EXISTS PORTFOLIO.ANALYTICS.PORTFOLIO_POSITION_RUNS (
+  portfolio_id STRING NOT NULL,
+  symbol       STRING NOT NULL,
+  valid_from   DATE NOT NULL,
+  valid_to     DATE,
+  quantity     NUMBER(18,6) NOT NULL,
+  CONSTRAINT pk_position_runs PRIMARY KEY (portfolio_id, symbol, valid_from)
+)
+CLUSTER BY (portfolio_id, symbol);
+CREATE TABLE IF NOT EXISTS PORTFOLIO.RAW.FACT_BENCHMARK (
     DATE DATE NOT NULL,
     SYMBOL STRING NOT NULL,
     CLOSE NUMBER(18,6),
     PRIMARY KEY (DATE, SYMBOL)
 );
 
-CREATE OR REPLACE TABLE PORTFOLIO.ANALYTICS.FACT_PORTFOLIO_ADV_METRICS (
+-- Daily portfolio value, return and rolling risk (incrementally maintained)
+CREATE TABLE IF NOT EXISTS PORTFOLIO.ANALYTICS.FACT_PORTFOLIO_DAILY (
+    PORTFOLIO_ID STRING NOT NULL,
+    DATE DATE NOT NULL,
+    TOTAL_VALUE_GBP FLOAT,
+    WEIGHTED_DAILY_RETURN FLOAT,
+    ROLLING_30D_VOLATILITY FLOAT,
+    DAILY_VAR_95 FLOAT,
+    PRIMARY KEY (PORTFOLIO_ID, DATE)
+)
+CLUSTER BY (portfolio_id, date);
+
+CREATE TABLE IF NOT EXISTS PORTFOLIO.ANALYTICS.FACT_PORTFOLIO_ADV_METRICS (
     DATE DATE NOT NULL,
     PORTFOLIO_ID STRING NOT NULL,
     SHARPE_RATIO FLOAT,
@@ -102,3 +180,20 @@ CREATE OR REPLACE TABLE PORTFOLIO.ANALYTICS.FACT_PORTFOLIO_ADV_METRICS (
     ALPHA FLOAT,
     PRIMARY KEY (DATE, PORTFOLIO_ID)
 );
+
+-- Carry-forward state for incremental advanced metrics: each portfolio's next
+-- look-back start, and the running value peak over the rows before it
+CREATE TABLE IF NOT EXISTS PORTFOLIO.ANALYTICS.ADV_METRICS_STATE (
+    PORTFOLIO_ID STRING NOT NULL,
+    CONTEXT_FROM DATE NOT NULL,
+    PEAK_BEFORE FLOAT,
+    PRIMARY KEY (PORTFOLIO_ID)
+);
+
+-- Incremental portfolio metrics: FACT_PRICES and position rows loaded up to
+-- LOADED_THROUGH are reflected in each portfolio's FACT_PORTFOLIO_DAILY rows
+CREATE TABLE IF NOT EXISTS PORTFOLIO.ANALYTICS.PORTFOLIO_METRICS_STATE (
+    PORTFOLIO_ID STRING NOT NULL,
+    LOADED_THROUGH TIMESTAMP_NTZ NOT NULL,
+    PRIMARY KEY (PORTFOLIO_ID)
+);
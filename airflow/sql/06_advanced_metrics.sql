@@ -220,4 +220,4 @@ WHEN NOT MATCHED THEN INSERT (
 )
 VALUES (
     c.date, c.portfolio_id, c.sharpe_ratio, c.sortino_ratio, c.max_drawdown, c.beta, c.alpha
-);
\ No newline at end of file
+);
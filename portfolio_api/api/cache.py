@@ -0,0 +1,47 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .snowflake_client import pooled_conn
+
+# DAG steps that change what the API serves bump their LOAD_METADATA row; the
+# newest LAST_ALTERED of the ANALYTICS tables also covers writes that do not
+# (DDL re-runs, manual backfills).
+PIPELINE_VERSION_SQL = """
+    SELECT
+        (SELECT MAX(_updated_at) FROM PORTFOLIO.RAW.LOAD_METADATA),
+        (SELECT MAX(LAST_ALTERED) FROM PORTFOLIO.INFORMATION_SCHEMA.TABLES
+         WHERE TABLE_SCHEMA = 'ANALYTICS' AND TABLE_TYPE = 'BASE TABLE')
+"""
+PIPELINE_VERSION_KEY = "api:pipeline_version"
+
+
+def pipeline_version() -> str:
+    """
+    Version of the warehouse data, re-read at most every PIPELINE_VERSION_TTL seconds.
+    """
+    version = cache.get(PIPELINE_VERSION_KEY)
+    if version is None:
+        with pooled_conn() as conn:
+            cur = conn.cursor()
+            cur.execute(PIPELINE_VERSION_SQL)
+            row = cur.fetchone()
+        version = "|".join(str(v) if v else "none" for v in (row or (None, None)))
+        cache.set(PIPELINE_VERSION_KEY, version, settings.PIPELINE_VERSION_TTL)
+    return version
+
+
+def cached_result(name: str, params: tuple, loader):
+    """
+    Read-through cache for endpoint results. The key includes the pipeline version,
+    so a new DAG run makes old entries unreachable and they simply age out.
+    """
+    version = pipeline_version()
+    raw = "|".join([name, version, *map(str, params)])
+    key = f"api:{name}:{hashlib.sha1(raw.encode()).hexdigest()}"
+    result = cache.get(key)
+    if result is None:
+        result = loader()
+        cache.set(key, result, settings.API_RESULT_CACHE_TTL)
+    return result
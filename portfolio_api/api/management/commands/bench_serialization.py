@@ -0,0 +1,96 @@
+import json
+import time
+import tracemalloc
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+
+from api.rows import _iter_json, fetch_records
+
+
+class FakeCursor:
+    """Replays rows shaped like VIEW_PORTFOLIO_METRICS (Decimals, dates, NaN)."""
+
+    description = [
+        ("PORTFOLIO_ID",),
+        ("DATE",),
+        ("TOTAL_VALUE_GBP",),
+        ("WEIGHTED_DAILY_RETURN",),
+        ("ROLLING_30D_VOLATILITY",),
+        ("DAILY_VAR_95",),
+    ]
+
+    def __init__(self, n):
+        start = date(2000, 1, 3)
+        self.rows = [
+            (
+                "P1",
+                start + timedelta(days=i),
+                Decimal("10456.320000000000") + i,
+                0.0025 if i else float("nan"),
+                0.0132 if i > 1 else float("nan"),
+                -0.023,
+            )
+            for i in range(n)
+        ]
+        self._pos = 0
+
+    def fetchall(self):
+        rows, self._pos = self.rows[self._pos :], len(self.rows)
+        return rows
+
+    def fetchmany(self, size):
+        rows = self.rows[self._pos : self._pos + size]
+        self._pos += len(rows)
+        return rows
+
+
+def _pandas_path(cursor):
+    # The previous view implementation (pandas imported lazily, bench only).
+    import numpy as np
+    import pandas as pd
+
+    rows = cursor.fetchall()
+    columns = [desc[0] for desc in cursor.description]
+    df = pd.DataFrame(rows, columns=columns)
+    df.to_dict(orient="records")  # debug print "BEFORE CLEANING"
+    df = df.replace({np.nan: None})
+    df.to_dict(orient="records")  # debug print "AFTER CLEANING"
+    records = df.to_dict(orient="records")
+    return json.dumps(records, default=str).encode()
+
+
+def _lean_path(cursor):
+    return b"".join(_iter_json(fetch_records(cursor)))
+
+
+class Command(BaseCommand):
+    help = "Per-request CPU time and peak allocations: pandas round trip vs cursor-to-JSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", default="30,1000,20000")
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def _measure(self, fn, n, repeat):
+        fn(FakeCursor(n))  # warm imports
+        cursors = [FakeCursor(n) for _ in range(repeat)]
+        t0 = time.process_time()
+        for cur in cursors:
+            fn(cur)
+        cpu = (time.process_time() - t0) / repeat
+        cursor = FakeCursor(n)
+        tracemalloc.start()
+        fn(cursor)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return cpu, peak
+
+    def handle(self, *args, **opts):
+        for n in [int(x) for x in opts["rows"].split(",")]:
+            for name, fn in (("pandas", _pandas_path), ("lean", _lean_path)):
+                cpu, peak = self._measure(fn, n, opts["repeat"])
+                self.stdout.write(
+                    f"rows={n:6d} {name:<7} cpu={cpu * 1000:8.2f}ms "
+                    f"peak_alloc={peak / 1e6:7.2f}MB"
+                )
@@ -0,0 +1,110 @@
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from api.snowflake_client import SnowflakePool
+
+
+class FakeConnection:
+    """Stand-in backend: a login handshake on connect, then fixed query latency."""
+
+    def __init__(self, connect_latency, query_latency):
+        time.sleep(connect_latency)
+        self.query_latency = query_latency
+        self._closed = False
+
+    def cursor(self):
+        return self
+
+    def execute(self, sql, params=None):
+        time.sleep(self.query_latency)
+        return self
+
+    def fetchall(self):
+        return [(1,)]
+
+    def close(self):
+        self._closed = True
+
+    def is_closed(self):
+        return self._closed
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _percentile(samples, p):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-test per-request Snowflake connections vs the pooled client "
+        "against a local stand-in backend and report p50/p99 latency."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=400)
+        parser.add_argument("--concurrency", type=int, default=16)
+        parser.add_argument("--connect-ms", type=float, default=400)
+        parser.add_argument("--query-ms", type=float, default=30)
+        parser.add_argument("--pool-max", type=int, default=8)
+        parser.add_argument(
+            "--warmup", type=int, default=50, help="unmeasured requests first"
+        )
+
+    def _run(self, handler, n, concurrency):
+        latencies = []
+        lock = threading.Lock()
+
+        def one(_):
+            t0 = time.perf_counter()
+            handler()
+            with lock:
+                latencies.append(time.perf_counter() - t0)
+
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(one, range(n)))
+        return latencies, time.perf_counter() - t0
+
+    def _report(self, name, latencies, wall):
+        self.stdout.write(
+            f"{name:<12} p50={_percentile(latencies, 50) * 1000:7.1f}ms "
+            f"p99={_percentile(latencies, 99) * 1000:7.1f}ms "
+            f"mean={statistics.mean(latencies) * 1000:7.1f}ms "
+            f"throughput={len(latencies) / wall:7.1f} req/s"
+        )
+
+    def handle(self, *args, **opts):
+        connect, query = opts["connect_ms"] / 1000, opts["query_ms"] / 1000
+
+        def factory():
+            return FakeConnection(connect, query)
+
+        def per_request():
+            with factory() as conn:
+                conn.cursor().execute("SELECT 1").fetchall()
+
+        pool = SnowflakePool(factory=factory, max_size=opts["pool_max"])
+
+        def pooled():
+            with pool.connection() as conn:
+                conn.cursor().execute("SELECT 1").fetchall()
+
+        n, c = opts["requests"], opts["concurrency"]
+        self._run(per_request, opts["warmup"], c)
+        lat, wall = self._run(per_request, n, c)
+        self._report("per-request", lat, wall)
+        self._run(pooled, opts["warmup"], c)
+        lat, wall = self._run(pooled, n, c)
+        self._report("pooled", lat, wall)
+        self.stdout.write(f"pool metrics: {pool.metrics()}")
+        pool.close_all()
@@ -0,0 +1,59 @@
+import json
+import math
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.http import StreamingHttpResponse
+
+
+def _clean(value):
+    """Make a Snowflake cursor value JSON-safe: NaN -> None, Decimal -> float, dates -> ISO."""
+    if isinstance(value, float):
+        return None if math.isnan(value) or math.isinf(value) else value
+    if isinstance(value, Decimal):
+        return None if not value.is_finite() else float(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def columns(cursor) -> list[str]:
+    return [desc[0] for desc in cursor.description]
+
+
+def iter_records(cursor, batch_size=1000):
+    """Yield one dict per row, fetching `batch_size` rows at a time."""
+    cols = columns(cursor)
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            return
+        for row in rows:
+            yield {c: _clean(v) for c, v in zip(cols, row)}
+
+
+def fetch_records(cursor) -> list[dict]:
+    return list(iter_records(cursor))
+
+
+def _iter_json(records):
+    yield b"["
+    first = True
+    for rec in records:
+        yield (b"" if first else b",") + json.dumps(rec, allow_nan=False).encode()
+        first = False
+    yield b"]"
+
+
+def stream_records(records, headers=None) -> StreamingHttpResponse:
+    """
+    Stream an iterable of records as a JSON array without materialising it,
+    for long date ranges. The connection must stay open until iteration ends,
+    so pass a generator that owns its cursor.
+    """
+    response = StreamingHttpResponse(
+        _iter_json(records), content_type="application/json"
+    )
+    for k, v in (headers or {}).items():
+        response[k] = v
+    return response
@@ -1,4 +1,7 @@
 import os
+import threading
+import time
+from contextlib import contextmanager
 from pathlib import Path
 
 import snowflake.connector
@@ -32,4 +35,203 @@ def get_snowflake_conn():
         database=database,
         schema=schema,
         role=role,
+        # pooled sessions can sit idle for a long time between requests
+        client_session_keep_alive=True,
     )
+
+
+class PoolExhausted(TimeoutError):
+    pass
+
+
+class SnowflakePool:
+    """
+    Process-wide, thread-safe pool of Snowflake connections.
+
+    - keeps at least `min_size` and at most `max_size` connections
+    - connections idle for more than `ping_after` seconds are checked with
+      SELECT 1 on checkout; dead ones are replaced
+    - connections idle for more than `idle_timeout` are closed (down to min_size)
+    - callers wait up to `checkout_timeout` seconds for a free connection
+    """
+
+    def __init__(
+        self,
+        factory=get_snowflake_conn,
+        min_size=1,
+        max_size=8,
+        idle_timeout=600.0,
+        ping_after=60.0,
+        checkout_timeout=10.0,
+        clock=time.monotonic,
+    ):
+        self._factory = factory
+        self.min_size = min_size
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.ping_after = ping_after
+        self.checkout_timeout = checkout_timeout
+        self._clock = clock
+        self._cond = threading.Condition()
+        self._idle = []  # (conn, returned_at), most recently used last
+        self._size = 0
+        self._stats = {
+            "checkouts": 0,
+            "created": 0,
+            "closed": 0,
+            "health_check_failures": 0,
+            "waits": 0,
+            "wait_seconds_total": 0.0,
+            "wait_seconds_max": 0.0,
+            "exhausted": 0,
+        }
+
+    def _close(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._size -= 1
+            self._stats["closed"] += 1
+            self._cond.notify()
+
+    def _healthy(self, conn, idle_for: float) -> bool:
+        if conn.is_closed():
+            return False
+        if idle_for < self.ping_after:
+            return True
+        try:
+            cur = conn.cursor()
+            cur.execute("SELECT 1")
+            cur.close()
+            return True
+        except Exception:
+            return False
+
+    def _evict_idle(self):
+        # caller holds the lock; returns connections to close outside it
+        now = self._clock()
+        stale = []
+        while self._idle and self._size - len(stale) > self.min_size:
+            conn, returned_at = self._idle[0]
+            if now - returned_at < self.idle_timeout:
+                break
+            stale.append(self._idle.pop(0)[0])
+        return stale
+
+    def acquire(self):
+        start = self._clock()
+        deadline = start + self.checkout_timeout
+        waited = False
+        while True:
+            with self._cond:
+                stale = self._evict_idle()
+                conn = returned_at = None
+                create = False
+                while conn is None and not create:
+                    if self._idle:
+                        conn, returned_at = self._idle.pop()
+                    elif self._size < self.max_size:
+                        self._size += 1
+                        create = True
+                    else:
+                        remaining = deadline - self._clock()
+                        if remaining <= 0:
+                            self._stats["exhausted"] += 1
+                            raise PoolExhausted(
+                                f"No Snowflake connection free after {self.checkout_timeout}s"
+                            )
+                        waited = True
+                        self._cond.wait(remaining)
+            for s in stale:
+                self._close(s)
+
+            if create:
+                try:
+                    conn = self._factory()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+                with self._cond:
+                    self._stats["created"] += 1
+            elif not self._healthy(conn, self._clock() - returned_at):
+                with self._cond:
+                    self._stats["health_check_failures"] += 1
+                self._close(conn)
+                continue
+
+            wait = self._clock() - start
+            with self._cond:
+                self._stats["checkouts"] += 1
+                if waited:
+                    self._stats["waits"] += 1
+                self._stats["wait_seconds_total"] += wait
+                self._stats["wait_seconds_max"] = max(
+                    self._stats["wait_seconds_max"], wait
+                )
+            return conn
+
+    def release(self, conn, broken=False):
+        if broken or conn.is_closed():
+            self._close(conn)
+            return
+        with self._cond:
+            self._idle.append((conn, self._clock()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        except Exception:
+            self.release(conn, broken=conn.is_closed())
+            raise
+        else:
+            self.release(conn)
+
+    def metrics(self) -> dict:
+        with self._cond:
+            return {
+                **self._stats,
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+            }
+
+    def close_all(self):
+        with self._cond:
+            idle, self._idle = self._idle, []
+        for conn, _ in idle:
+            self._close(conn)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> SnowflakePool:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = SnowflakePool(
+                min_size=int(os.getenv("SNOWFLAKE_POOL_MIN", "1")),
+                max_size=int(os.getenv("SNOWFLAKE_POOL_MAX", "8")),
+                idle_timeout=float(os.getenv("SNOWFLAKE_POOL_IDLE_TIMEOUT", "600")),
+                ping_after=float(os.getenv("SNOWFLAKE_POOL_PING_AFTER", "60")),
+                checkout_timeout=float(os.getenv("SNOWFLAKE_POOL_TIMEOUT", "10")),
+            )
+        return _pool
+
+
+def pooled_conn():
+    """
+    Borrow a connection from the process-wide pool:
+
+        with pooled_conn() as conn:
+            ...
+    """
+    return get_pool().connection()
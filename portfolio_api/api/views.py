@@ -1,98 +1,183 @@
-import numpy as np
-import pandas as pd
+from datetime import date
+
+from django.conf import settings
 from django.shortcuts import render
 from rest_framework.decorators import api_view
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 
-from .snowflake_client import get_snowflake_conn
+from .cache import cached_result
+from .rows import fetch_records, iter_records, stream_records
+from .snowflake_client import pooled_conn
 
+DEFAULT_LIMIT = 30
 
-@api_view(["GET"])
-def portfolio_metrics(request, portfolio_id):
-    """
-    Return the last 30 days of portfolio metrics for the given portfolio.
-    """
-    query = f"""
-        SELECT *
-        FROM PORTFOLIO.ANALYTICS.VIEW_PORTFOLIO_METRICS
-        WHERE PORTFOLIO_ID = '{portfolio_id}'
-        ORDER BY DATE DESC
-        LIMIT 30
-    """
 
-    # Connect to Snowflake
-    with get_snowflake_conn() as conn:
+def _query_records(query, params=None):
+    with pooled_conn() as conn:
         cursor = conn.cursor()
-        cursor.execute(query)
-        rows = cursor.fetchall()
-
-        # Get column names dynamically
-        columns = [desc[0] for desc in cursor.description]
-
-        # Convert to Pandas DataFrame
-        df = pd.DataFrame(rows, columns=columns)
-        # Debug check
-        print("BEFORE CLEANING:", df.to_dict(orient="records"))
+        cursor.execute(query, params)
+        # Cursor rows go straight to JSON-safe dicts (NaN -> None, Decimal -> float)
+        return fetch_records(cursor)
 
-        # Replace NaN (created by Pandas) with None for JSON serialization
-        df = df.replace({np.nan: None})
 
-        # Debug check after cleaning
-        print("AFTER CLEANING:", df.to_dict(orient="records"))
+def _stream_query(query, params=None):
+    # Holds the pooled connection until the last row has been streamed out
+    with pooled_conn() as conn:
+        cursor = conn.cursor()
+        cursor.execute(query, params)
+        yield from iter_records(cursor)
+
+
+def _parse_date(request, name):
+    value = request.query_params.get(name)
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value).isoformat()
+    except ValueError:
+        raise ValidationError({name: "Expected a date formatted as YYYY-MM-DD."})
+
+
+def _parse_limit(request, default):
+    value = request.query_params.get("limit")
+    if value is None:
+        return default
+    try:
+        limit = int(value)
+    except ValueError:
+        limit = 0
+    if not 1 <= limit <= settings.API_MAX_LIMIT:
+        raise ValidationError(
+            {"limit": f"Expected an integer between 1 and {settings.API_MAX_LIMIT}."}
+        )
+    return limit
+
+
+def _next_link(request, next_cursor):
+    params = request.query_params.copy()
+    params["cursor"] = next_cursor
+    return f"{request.build_absolute_uri(request.path)}?{params.urlencode()}"
+
+
+def _date_filter(request, portfolio_id):
+    """WHERE clause and bind params for a portfolio and the optional from/to dates."""
+    where, params = ["PORTFOLIO_ID = %s"], [portfolio_id]
+    for name, clause in (("from", "DATE >= %s"), ("to", "DATE <= %s")):
+        value = _parse_date(request, name)
+        if value:
+            where.append(clause)
+            params.append(value)
+    return " AND ".join(where), params
+
+
+def _paged(request, name, table, portfolio_id):
+    """
+    Newest-first page of `table` for a portfolio.
 
-    return Response(df.to_dict(orient="records"))
+    Query params: from / to (inclusive dates), limit, cursor. The cursor is the DATE
+    of the last row already seen; the next page is fetched with DATE < cursor, so
+    each page is a bounded, date-pruned range scan rather than an OFFSET. The next
+    cursor is returned in the X-Next-Cursor header and a Link: rel="next" URL.
+    """
+    limit = _parse_limit(request, DEFAULT_LIMIT)
+    before = _parse_date(request, "cursor")
+    where, params = _date_filter(request, portfolio_id)
+    if before:
+        where += " AND DATE < %s"
+        params.append(before)
+
+    if limit <= settings.API_STREAM_ROWS:
+
+        def load():
+            records = _query_records(
+                f"SELECT * FROM {table} WHERE {where} ORDER BY DATE DESC LIMIT %s",
+                [*params, limit + 1],
+            )
+            more = len(records) > limit
+            records = records[:limit]
+            return records, records[-1]["DATE"] if more else None
+
+        records, next_cursor = cached_result(name, (where, *params, limit), load)
+        response = Response(records)
+    else:
+        # Large pages: resolve the page's date bounds first (one narrow column),
+        # then stream the full rows for exactly that range.
+        dates = _query_records(
+            f"SELECT DATE FROM {table} WHERE {where} ORDER BY DATE DESC LIMIT %s",
+            [*params, limit + 1],
+        )
+        next_cursor = dates[limit - 1]["DATE"] if len(dates) > limit else None
+        page_where, page_params = where, params
+        if dates:
+            page_where += " AND DATE >= %s"
+            page_params = [*params, dates[:limit][-1]["DATE"]]
+        response = stream_records(
+            _stream_query(
+                f"SELECT * FROM {table} WHERE {page_where} ORDER BY DATE DESC",
+                page_params,
+            )
+        )
+
+    if next_cursor:
+        response["X-Next-Cursor"] = next_cursor
+        response["Link"] = f'<{_next_link(request, next_cursor)}>; rel="next"'
+    return response
 
 
 @api_view(["GET"])
-def portfolio_advanced_metrics(request, portfolio_id):
-    query = f"""
-        SELECT *
-        FROM FACT_PORTFOLIO_ADV_METRICS
-        WHERE PORTFOLIO_ID = '{portfolio_id}'
-        ORDER BY DATE DESC
-        LIMIT 30
+def portfolio_metrics(request, portfolio_id):
     """
+    Return portfolio metrics for the given portfolio, newest first
+    (the last 30 days unless from/to/limit/cursor say otherwise).
+    """
+    return _paged(
+        request,
+        "portfolio_metrics",
+        "PORTFOLIO.ANALYTICS.VIEW_PORTFOLIO_METRICS",
+        portfolio_id,
+    )
 
-    with get_snowflake_conn() as conn:
-        cursor = conn.cursor()
-        cursor.execute(query)
-        rows = cursor.fetchall()
-        columns = [desc[0] for desc in cursor.description]
-
-        import numpy as np
-        import pandas as pd
-
-        df = pd.DataFrame(rows, columns=columns)
-
-        # Replace NaN with None
-        df = df.replace({np.nan: None})
 
-    return Response(df.to_dict(orient="records"))
+@api_view(["GET"])
+def portfolio_advanced_metrics(request, portfolio_id):
+    return _paged(
+        request,
+        "portfolio_advanced_metrics",
+        "PORTFOLIO.ANALYTICS.FACT_PORTFOLIO_ADV_METRICS",
+        portfolio_id,
+    )
 
 
+@api_view(["GET"])
 def dashboard(request, portfolio_id="P1"):
+    where, params = _date_filter(request, portfolio_id)
+    limit = _parse_limit(request, 100)
     query = f"""
         SELECT DATE, TOTAL_VALUE_GBP, WEIGHTED_DAILY_RETURN
         FROM VIEW_PORTFOLIO_METRICS
-        WHERE PORTFOLIO_ID = '{portfolio_id}'
+        WHERE {where}
         ORDER BY DATE
-        LIMIT 100
+        LIMIT %s
     """
 
-    with get_snowflake_conn() as conn:
-        cur = conn.cursor()
-        cur.execute(query)
-        rows = cur.fetchall()
-        cols = [desc[0] for desc in cur.description]
-
-    df = pd.DataFrame(rows, columns=cols)
-    df = df.replace({np.nan: None})
+    records = cached_result(
+        "dashboard",
+        (where, *params, limit),
+        lambda: _query_records(query, [*params, limit]),
+    )
 
     context = {
         "portfolio_id": portfolio_id,
-        "dates": [str(d) for d in df["DATE"]],
-        "values": [round(v, 2) if v else None for v in df["TOTAL_VALUE_GBP"]],
-        "returns": [round(r, 4) if r else None for r in df["WEIGHTED_DAILY_RETURN"]],
+        "dates": [r["DATE"] for r in records],
+        "values": [
+            round(r["TOTAL_VALUE_GBP"], 2) if r["TOTAL_VALUE_GBP"] else None
+            for r in records
+        ],
+        "returns": [
+            round(r["WEIGHTED_DAILY_RETURN"], 4) if r["WEIGHTED_DAILY_RETURN"] else None
+            for r in records
+        ],
     }
 
     return render(request, "dashboard.html", context)
@@ -90,6 +90,36 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# Endpoint results are keyed on the pipeline version (see api/cache.py), so a long
+# TTL is safe. Set API_CACHE_DIR to share the cache between worker processes.
+
+if os.getenv("API_CACHE_DIR"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": os.getenv("API_CACHE_DIR"),
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "portfolio-api",
+        }
+    }
+
+API_RESULT_CACHE_TTL = int(os.getenv("API_RESULT_CACHE_TTL", str(24 * 3600)))
+# How often to re-check LOAD_METADATA for a new pipeline run
+PIPELINE_VERSION_TTL = int(os.getenv("PIPELINE_VERSION_TTL", "30"))
+
+# Metrics endpoints: largest page a client may request, and the page size above
+# which rows are streamed instead of buffered (and cached)
+API_MAX_LIMIT = int(os.getenv("API_MAX_LIMIT", "10000"))
+API_STREAM_ROWS = int(os.getenv("API_STREAM_ROWS", "1000"))
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
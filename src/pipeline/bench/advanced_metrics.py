@@ -0,0 +1,70 @@
+"""
+Benchmark for the NumPy advanced metrics engine.
+
+    python -m src.pipeline.bench.advanced_metrics --portfolios 10000 --years 5 --sql
+
+--sql also times the SELECT inside airflow/sql/06_advanced_metrics.sql, run
+unchanged (apart from table names) on DuckDB over the same synthetic data. Parity
+with that SQL, and of incremental runs with a full recompute, is checked by
+tests/test_advanced_metrics.py.
+"""
+
+import argparse
+import re
+import time
+from pathlib import Path
+
+import duckdb
+import pandas as pd
+
+from ..transform.advanced_metrics import compute_advanced_metrics
+from ..utils.logging import log
+from .synthetic import portfolio_returns
+
+SQL_FILE = Path(__file__).resolve().parents[3] / "airflow/sql/06_advanced_metrics.sql"
+
+
+def reference_sql() -> str:
+    """The metrics SELECT from 06_advanced_metrics.sql, pointed at local tables."""
+    text = SQL_FILE.read_text()
+    select = re.search(
+        r"using\s*\((.*)\)\s*c\s+on\s", text, re.DOTALL | re.IGNORECASE
+    ).group(1)
+    return select.replace(
+        "PORTFOLIO.ANALYTICS.VIEW_PORTFOLIO_METRICS", "portfolio_metrics"
+    ).replace("PORTFOLIO.RAW.FACT_BENCHMARK", "fact_benchmark")
+
+
+def run_sql(base: pd.DataFrame, benchmark: pd.DataFrame) -> pd.DataFrame:
+    con = duckdb.connect()
+    con.execute("CREATE MACRO IFF(c, a, b) AS CASE WHEN c THEN a ELSE b END")
+    con.register("portfolio_metrics", base)
+    con.register("fact_benchmark", benchmark)
+    out = con.execute(reference_sql()).df()
+    return out.rename(columns=str.upper)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--portfolios", type=int, default=200)
+    ap.add_argument("--years", type=int, default=2)
+    ap.add_argument("--sql", action="store_true", help="also time the SQL on DuckDB")
+    args = ap.parse_args()
+
+    base, benchmark = portfolio_returns(args.portfolios, args.years, seed=1)
+    t0 = time.perf_counter()
+    metrics = compute_advanced_metrics(base, benchmark)
+    t_np = time.perf_counter() - t0
+    log(
+        f"[BENCH] numpy  {args.portfolios} portfolios x {args.years}y "
+        f"({len(metrics)} rows): {t_np:.2f}s ({len(metrics) / t_np:,.0f} rows/s)"
+    )
+    if args.sql:
+        t0 = time.perf_counter()
+        run_sql(base, benchmark)
+        t_sql = time.perf_counter() - t0
+        log(f"[BENCH] duckdb SQL: {t_sql:.2f}s ({t_sql / t_np:.1f}x numpy)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Critical-path report for the etl_uk_portfolio_health DAG from recorded task timings.
+
+    python -m src.pipeline.bench.critical_path timings.json
+    airflow tasks states-for-dag-run etl_uk_portfolio_health <run_id> -o json > run.json
+    python -m src.pipeline.bench.critical_path run.json
+
+Timings are either {"task_id": seconds, ...} or a list of records (JSON or CSV)
+with task_id and either duration or start_date/end_date; mapped tasks count as
+their slowest instance. Reports the sequential
+sum (the old fully chained DAG), the critical path of TASK_DEPENDENCIES (the best
+end-to-end time with enough workers) and, when start/end times are present, the
+run's observed wall time.
+"""
+
+import argparse
+
+from ..utils.logging import log
+from ..utils.task_graph import (
+    TASK_DEPENDENCIES,
+    critical_path,
+    load_timings,
+    topological_order,
+)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("timings", help="JSON or CSV of task timings")
+    args = ap.parse_args()
+
+    durations, wall = load_timings(args.timings)
+    unknown = sorted(set(durations) - set(TASK_DEPENDENCIES))
+    if unknown:
+        log(f"[BENCH] ignoring timings for tasks not in the graph: {unknown}")
+
+    total, path = critical_path(durations)
+    sequential = sum(durations.get(t, 0.0) for t in TASK_DEPENDENCIES)
+    on_path = set(path)
+    for task in topological_order():
+        mark = "*" if task in on_path else " "
+        log(f"[BENCH] {mark} {task:<24} {durations.get(task, 0.0):>8.1f}s")
+    log(f"[BENCH] sequential sum : {sequential:.1f}s")
+    log(f"[BENCH] critical path  : {total:.1f}s ({sequential / max(total, 1e-9):.2f}x)")
+    log(f"[BENCH]   via {' -> '.join(path)}")
+    if wall is not None:
+        log(f"[BENCH] observed wall  : {wall:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Peak memory and throughput of the transactions CSV ingestion, whole-file versus
+chunked, plus resume and delta-detection checks. Each mode runs in its own process so peak RSS is
+measured separately; staging is simulated by serializing chunks to Parquet, which
+is what write_pandas does before its PUT.
+
+    python -m src.pipeline.bench.csv_ingest --rows 5000000 --chunk-rows 250000
+"""
+
+import argparse
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from ..jobs.load_transactions_csv import COLUMNS, stream_csv
+from ..load.delta import RowHashIndex, file_fingerprint
+from ..utils.instrument import peak_rss_mb
+from ..utils.logging import log
+
+
+def write_csv(path: Path, rows: int, seed: int = 0, block: int = 1_000_000):
+    """A transactions export in the loader's column layout, written block by block."""
+    rng = np.random.default_rng(seed)
+    days = pd.date_range("2020-01-01", "2025-09-30").strftime("%Y-%m-%d").to_numpy()
+    for start in range(0, rows, block):
+        n = min(block, rows - start)
+        delta = np.round(rng.normal(5, 40, n), 6)
+        pd.DataFrame(
+            {
+                "transaction_id": [f"T{i:010d}" for i in range(start, start + n)],
+                "portfolio_id": np.char.add("P", rng.integers(0, 5000, n).astype(str)),
+                "symbol": np.char.add("S", rng.integers(0, 500, n).astype(str)),
+                "quantity_delta": delta,
+                "transaction_date": rng.choice(days, n),
+                "transaction_type": np.where(delta > 0, "BUY", "SELL"),
+            },
+            columns=COLUMNS,
+        ).to_csv(path, mode="a" if start else "w", header=not start, index=False)
+
+
+def _stage(chunk: pd.DataFrame):
+    chunk.to_parquet(io.BytesIO(), index=False)
+
+
+def worker(mode: str, path: str, chunk_rows: int):
+    t0 = time.perf_counter()
+    if mode == "whole":
+        df = pd.read_csv(path)
+        _stage(df)
+        rows = len(df)
+    else:
+        rows = stream_csv(path, _stage, chunk_rows, resume=False)["rows"]
+    elapsed = time.perf_counter() - t0
+    log(
+        f"[BENCH] {mode:<7} {rows:,} rows in {elapsed:.2f}s "
+        f"({rows / elapsed:,.0f} rows/s), peak RSS {peak_rss_mb():.0f} MB"
+    )
+
+
+def check_resume(path: str, rows: int, chunk_rows: int):
+    """Fail after two chunks, then retry: every row must be staged exactly once."""
+    staged = []
+
+    def flaky(chunk):
+        if len(staged) == 2:
+            raise ConnectionError("simulated upload failure")
+        staged.append(chunk["transaction_id"])
+
+    try:
+        stream_csv(path, flaky, chunk_rows)
+    except ConnectionError:
+        pass
+    stats = stream_csv(
+        path, lambda chunk: staged.append(chunk["transaction_id"]), chunk_rows
+    )
+    ids = pd.concat(staged, ignore_index=True)
+    if len(ids) != rows or ids.duplicated().any():
+        raise AssertionError(f"resume staged {len(ids)} rows for a {rows}-row file")
+    log(
+        f"[PARITY] resume OK: {stats['rows']} rows after the retry, {len(ids)} in total"
+    )
+
+
+def check_delta(path: Path, rows: int, chunk_rows: int, changes: int = 1000):
+    """A reload of an edited export must stage exactly the appended and edited rows."""
+    index = RowHashIndex(path.parent / "index")
+    t0 = time.perf_counter()
+    stats = stream_csv(str(path), _stage, chunk_rows, resume=False, index=index)
+    index.commit(file_fingerprint(str(path)))
+    log(f"[BENCH] first load with hashing: {time.perf_counter() - t0:.2f}s")
+
+    df = pd.read_csv(path, dtype=str)
+    edited = np.random.default_rng(3).choice(len(df), changes, replace=False)
+    already = (pd.to_numeric(df["quantity_delta"].iloc[edited]) == 1.5).sum()
+    df.loc[edited, "quantity_delta"] = "1.5"
+    appended = df.tail(changes).assign(
+        transaction_id=[f"N{i:010d}" for i in range(changes)]
+    )
+    pd.concat([df, appended]).to_csv(path, index=False)
+    del df
+
+    fingerprint = file_fingerprint(str(path), previous=index.fingerprint)
+    if index.unchanged(fingerprint):
+        raise AssertionError("edited file reported as unchanged")
+    t0 = time.perf_counter()
+    stats = stream_csv(str(path), _stage, chunk_rows, resume=False, index=index)
+    index.commit(fingerprint)
+    expected = 2 * changes - already
+    log(
+        f"[BENCH] delta load: {stats['staged']} of {stats['rows']} rows staged "
+        f"in {time.perf_counter() - t0:.2f}s"
+    )
+    if stats["staged"] != expected:
+        raise AssertionError(f"staged {stats['staged']} rows, expected {expected}")
+    if not index.unchanged(file_fingerprint(str(path), previous=index.fingerprint)):
+        raise AssertionError("reloaded file not recognised as unchanged")
+    log(f"[PARITY] delta OK: {expected} rows staged, unchanged file skipped")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--rows", type=int, default=2_000_000)
+    ap.add_argument("--chunk-rows", type=int, default=250_000)
+    ap.add_argument("--worker", choices=["whole", "chunked"], help=argparse.SUPPRESS)
+    ap.add_argument("--csv", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+    if args.worker:
+        worker(args.worker, args.csv, args.chunk_rows)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATA_DIR"] = tmp  # keep the checkpoint out of ./data
+        path = Path(tmp) / "portfolio_transactions.csv"
+        write_csv(path, args.rows)
+        log(f"[BENCH] {args.rows:,} rows, {path.stat().st_size / 2**20:.0f} MB of CSV")
+        for mode in ("whole", "chunked"):
+            subprocess.run(
+                [
+                    sys.executable,
+                    "-m",
+                    __spec__.name,
+                    "--worker",
+                    mode,
+                    "--csv",
+                    str(path),
+                    "--chunk-rows",
+                    str(args.chunk_rows),
+                ],
+                check=True,
+            )
+        check_resume(str(path), args.rows, max(1, args.rows // 5))
+        check_delta(path, args.rows, args.chunk_rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Data quality rule suites (src/pipeline/utils/dq.py): one compiled query per table
+versus the former one query per check, in DuckDB standing in for Snowflake.
+
+    python -m src.pipeline.bench.dq --symbols 500 --years 5
+
+Times suites of growing size on synthetic EQUITY_DAILY with injected NULLs,
+duplicate keys, non-positive prices and spikes, also against the local DataFrame
+pass. tests/test_dq.py checks that all three give the same values.
+"""
+
+import argparse
+import functools
+import time
+
+import duckdb
+import numpy as np
+import pandas as pd
+
+from ..utils.dq import DQ_SUITES, compile_suite, suite_values
+from ..utils.logging import log
+from .synthetic import equity_bars
+
+
+def with_defects(df: pd.DataFrame, value_col: str, seed: int = 1) -> pd.DataFrame:
+    """A few NULLs, duplicate keys, non-positive values and 3x spikes."""
+    rng = np.random.default_rng(seed)
+    df = df.copy()
+    n = len(df)
+    df.loc[rng.choice(n, 5, replace=False), value_col] = np.nan
+    df.loc[rng.choice(n, 3, replace=False), value_col] = -1.0
+    spikes = rng.choice(n, 7, replace=False)
+    df.loc[spikes, value_col] = df.loc[spikes, value_col] * 3
+    return pd.concat([df, df.sample(4, random_state=seed)], ignore_index=True)
+
+
+def scaled_suite(suite: dict, size: int) -> dict:
+    """`size` distinct rules: the suite's own, then variants with other thresholds."""
+    rules = []
+    i = 0
+    while len(rules) < size:
+        for rule in suite["rules"]:
+            if len(rules) == size:
+                break
+            variant = dict(rule, name=f"{rule['name']}_{i}")
+            if rule["type"] == "return_spike":
+                variant["max_abs_return"] = rule["max_abs_return"] * (1 + i / 10)
+            elif rule["type"] == "range":
+                variant["min"] = rule.get("min", 0) - i
+            elif rule["type"] == "freshness":
+                variant["max_age_days"] = rule["max_age_days"] + i
+            rules.append(variant)
+        i += 1
+    return {"rules": rules}
+
+
+def run_compiled(con, table: str, suite: dict) -> tuple:
+    return con.execute(compile_suite(table, suite)).fetchone()
+
+
+def run_per_rule(con, table: str, suite: dict) -> tuple:
+    return tuple(
+        con.execute(compile_suite(table, {"rules": [rule]})).fetchone()[0]
+        for rule in suite["rules"]
+    )
+
+
+def timed(fn, repeat: int):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        out = fn()
+    return out, (time.perf_counter() - t0) / repeat
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--symbols", type=int, default=500)
+    ap.add_argument("--years", type=int, default=5)
+    ap.add_argument("--sizes", default="5,10,20,40")
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    equity = with_defects(
+        equity_bars(args.symbols, 252 * args.years, gaps=0.02), "CLOSE"
+    )
+    con = duckdb.connect()
+    con.register("equity_daily", equity)
+
+    rows = len(equity)
+    for size in [int(s) for s in args.sizes.split(",")]:
+        suite = scaled_suite(DQ_SUITES["PORTFOLIO.RAW.EQUITY_DAILY"], size)
+        _, t_one = timed(
+            functools.partial(run_compiled, con, "equity_daily", suite), args.repeat
+        )
+        _, t_many = timed(
+            functools.partial(run_per_rule, con, "equity_daily", suite), args.repeat
+        )
+        _, t_local = timed(functools.partial(suite_values, equity, suite), args.repeat)
+        log(
+            f"[BENCH] {size:>3} rules over {rows:,} rows: one query "
+            f"{t_one * 1000:.0f} ms, query per rule {t_many * 1000:.0f} ms "
+            f"({t_many / t_one:.1f}x), local pass {t_local * 1000:.0f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Benchmark for the FACT_PRICES build (src/pipeline/jobs/fact_prices.py).
+
+    python -m src.pipeline.bench.fact_prices --symbols 500 --years 5
+
+REFERENCE_SQL is 03_analytics_table.sql's window SELECT in DuckDB dialect over
+all of history (without the exact-date FX join, which dropped rows on days
+without a fix). Times the full build against it and daily increments with only
+the CONTEXT_ROWS look-back, and shows how far the former fresh-window MERGE
+drifts. tests/test_fact_prices.py checks full and incremental builds against
+the SQL.
+"""
+
+import argparse
+import time
+
+import duckdb
+import numpy as np
+import pandas as pd
+
+from ..transform.fx import convert_to_gbp, rate_matrix
+from ..transform.prices import CONTEXT_ROWS, compute_fact_prices
+from ..utils.logging import log
+from .synthetic import business_days, equity_bars, fx_rates
+
+REFERENCE_SQL = """
+SELECT
+    e.SYMBOL,
+    e.DATE,
+    (e.CLOSE / LAG(e.CLOSE) OVER (PARTITION BY e.SYMBOL ORDER BY e.DATE)) - 1
+        AS DAILY_RETURN,
+    AVG(e.CLOSE) OVER (
+        PARTITION BY e.SYMBOL ORDER BY e.DATE ROWS BETWEEN 6 PRECEDING AND CURRENT ROW
+    ) AS ROLLING_7D_AVG_CLOSE,
+    STDDEV_SAMP(e.CLOSE) OVER (
+        PARTITION BY e.SYMBOL ORDER BY e.DATE ROWS BETWEEN 29 PRECEDING AND CURRENT ROW
+    ) AS ROLLING_30D_VOLATILITY
+FROM equity_daily e
+WHERE e.DATE > ?
+"""
+CHECKED = ["DAILY_RETURN", "ROLLING_7D_AVG_CLOSE", "ROLLING_30D_VOLATILITY"]
+
+
+def synthetic_data(symbols: int, years: int, seed: int = 0):
+    """EQUITY_DAILY with gaps and a few NULL closes, and FX_DAILY missing some days."""
+    equity = equity_bars(symbols, 252 * years, seed, gaps=0.02, null_closes=0.002)
+    fx = fx_rates({"USDGBP": 0.79}, business_days(252 * years), seed)
+    return equity.drop(columns="SOURCE"), fx
+
+
+def joined(equity: pd.DataFrame, fx: pd.DataFrame) -> pd.DataFrame:
+    """BARS_SQL without DIM_SYMBOL (all USD listings), converted as the job does."""
+    return convert_to_gbp(equity.assign(CURRENCY="USD"), rate_matrix(fx))
+
+
+def run_sql(equity, fx, after) -> pd.DataFrame:
+    con = duckdb.connect()
+    con.register("equity_daily", equity)
+    con.register("fx_daily", fx)
+    return con.execute(REFERENCE_SQL, [after]).df()
+
+
+def compare(ours: pd.DataFrame, ref: pd.DataFrame, rtol: float, atol: float) -> int:
+    keys = ["SYMBOL", "DATE"]
+    ours, ref = ours.copy(), ref.copy()
+    for df in (ours, ref):
+        df["DATE"] = pd.to_datetime(df["DATE"])
+    merged = ours.merge(ref, on=keys, suffixes=("", "_SQL"), validate="one_to_one")
+    if len(merged) != len(ours) or len(merged) != len(ref):
+        raise AssertionError(f"row count mismatch: {len(ours)} vs {len(ref)}")
+    total = 0
+    for col in CHECKED:
+        a = merged[col].to_numpy(dtype=np.float64)
+        b = merged[f"{col}_SQL"].to_numpy(dtype=np.float64)
+        bad = int((~np.isclose(a, b, rtol=rtol, atol=atol, equal_nan=True)).sum())
+        log(f"[PARITY] {col:<24} mismatches={bad:<6} nulls={np.isnan(a).sum()}")
+        total += bad
+    return total
+
+
+def context_rows(bars: pd.DataFrame, watermark) -> pd.DataFrame:
+    """CONTEXT_SQL: the last CONTEXT_ROWS rows per symbol up to the watermark."""
+    past = bars[bars["DATE"] <= watermark].sort_values("DATE")
+    return past.groupby("SYMBOL", sort=False).tail(CONTEXT_ROWS)[
+        ["SYMBOL", "DATE", "CLOSE"]
+    ]
+
+
+def replay_incremental(bars: pd.DataFrame, runs: int):
+    """Initial build, then `runs` daily increments; returns (rows, seconds per run)."""
+    days = np.sort(bars["DATE"].unique())
+    done = [compute_fact_prices(bars[bars["DATE"] <= days[-runs - 1]])]
+    elapsed = 0.0
+    for prev, day in zip(days[-runs - 1 : -1], days[-runs:]):
+        context = context_rows(bars, prev)
+        t0 = time.perf_counter()
+        done.append(compute_fact_prices(bars[bars["DATE"] == day], context))
+        elapsed += time.perf_counter() - t0
+    return pd.concat(done, ignore_index=True), elapsed / runs
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--symbols", type=int, default=500)
+    ap.add_argument("--years", type=int, default=5)
+    ap.add_argument("--runs", type=int, default=20, help="incremental runs to replay")
+    ap.add_argument("--rtol", type=float, default=1e-9)
+    ap.add_argument("--atol", type=float, default=1e-9)
+    args = ap.parse_args()
+
+    equity, fx = synthetic_data(args.symbols, args.years)
+    bars = joined(equity, fx)
+    t0 = time.perf_counter()
+    ref = run_sql(equity, fx, pd.Timestamp("1900-01-01"))
+    t_sql = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    full = compute_fact_prices(bars)
+    t_full = time.perf_counter() - t0
+    dropped = len(equity) - len(equity.merge(fx[["DATE"]], on="DATE"))
+    log(f"[BENCH] rows the exact-date FX join used to drop: {dropped:,}")
+    log(
+        f"[BENCH] full build of {len(full):,} rows: python {t_full:.2f}s, DuckDB {t_sql:.2f}s"
+    )
+
+    _, per_run = replay_incremental(bars, args.runs)
+    log(
+        f"[BENCH] {args.runs} incremental runs: {per_run * 1000:.1f} ms per run "
+        f"on {CONTEXT_ROWS} context rows per symbol"
+    )
+
+    # The former MERGE: windows over the rows after the watermark only
+    days = np.sort(bars["DATE"].unique())
+    watermark = days[-args.runs - 1]
+    fresh = run_sql(equity, fx, watermark)
+    bad = compare(fresh, ref[ref["DATE"] > watermark], args.rtol, args.atol)
+    log(f"[PARITY] fresh-window MERGE: {bad} wrong values in the last {args.runs} days")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+import json
+import threading
+import time
+import zlib
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+
+def daily_series(n_days: int, end: Optional[date] = None, seed: int = 0) -> dict:
+    """
+    Build an Alpha Vantage style "Time Series (Daily)" mapping, newest date first,
+    with weekdays only (like the real API).
+    """
+    rng = np.random.default_rng(seed)
+    end = end or date.today()
+    days = []
+    d = end
+    while len(days) < n_days:
+        if d.weekday() < 5:
+            days.append(d)
+        d -= timedelta(days=1)
+    closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n_days)))
+    series = {}
+    for d, c in zip(days, closes):
+        series[d.isoformat()] = {
+            "1. open": f"{c * 0.99:.4f}",
+            "2. high": f"{c * 1.01:.4f}",
+            "3. low": f"{c * 0.98:.4f}",
+            "4. close": f"{c:.4f}",
+            "5. adjusted close": f"{c:.4f}",
+            "6. volume": str(int(rng.integers(1e5, 1e7))),
+            "7. dividend amount": "0.0000",
+            "8. split coefficient": "1.0",
+        }
+    return series
+
+
+class FakeAlphaVantage:
+    """
+    Local stand-in for the Alpha Vantage query endpoint.
+    Serves synthetic TIME_SERIES_DAILY_ADJUSTED / FX_DAILY payloads after a fixed
+    `latency` (seconds) to mimic network round trips.
+
+        with FakeAlphaVantage(latency=0.2) as url:
+            os.environ["ALPHAVANTAGE_BASE_URL"] = url
+    """
+
+    def __init__(
+        self, latency: float = 0.1, full_days: int = 5000, compact_days: int = 100
+    ):
+        self.latency = latency
+        self.full_days = full_days
+        self.compact_days = compact_days
+        self.requests = 0
+        self._payloads = {}
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    def _payload(self, params: dict) -> bytes:
+        function = params.get("function", "")
+        size = (
+            self.compact_days
+            if params.get("outputsize") == "compact"
+            else self.full_days
+        )
+        key = (function, params.get("symbol") or params.get("from_symbol"), size)
+        with self._lock:
+            self.requests += 1
+            if key not in self._payloads:
+                series = daily_series(size, seed=zlib.crc32(repr(key).encode()))
+                if function == "FX_DAILY":
+                    body = {"Time Series FX (Daily)": series}
+                else:
+                    body = {"Time Series (Daily)": series}
+                self._payloads[key] = json.dumps(body).encode()
+            return self._payloads[key]
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                params = {
+                    k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()
+                }
+                body = fake._payload(params)
+                time.sleep(fake.latency)
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def __enter__(self) -> str:
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        host, port = self._server.server_address
+        return f"http://{host}:{port}/query"
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,59 @@
+"""
+Wall-clock scaling of Alpha Vantage extraction against a local fake server.
+
+    python -m src.pipeline.bench.fetch_scaling --symbols 10,50,100 --workers 1,8
+"""
+
+import argparse
+import os
+import time
+
+from ..extract import alpha
+from ..extract.rate_limit import AlphaVantageLimiter
+from ..utils.logging import log
+from .fake_alpha import FakeAlphaVantage
+
+
+def run(symbol_counts, worker_counts, latency, calls_per_minute, full_days):
+    results = []
+    with FakeAlphaVantage(latency=latency, full_days=full_days) as url:
+        os.environ["ALPHAVANTAGE_BASE_URL"] = url
+        for n in symbol_counts:
+            symbols = [f"SYM{i:04d}" for i in range(n)]
+            for workers in worker_counts:
+                limiter = AlphaVantageLimiter(calls_per_minute=calls_per_minute)
+                t0 = time.perf_counter()
+                df = alpha.fetch_equities(
+                    symbols, "1900-01-01", max_workers=workers, limiter=limiter
+                )
+                elapsed = time.perf_counter() - t0
+                results.append((n, workers, elapsed, len(df)))
+                log(
+                    f"[BENCH] symbols={n:5d} workers={workers:3d} "
+                    f"wall={elapsed:7.2f}s rows={len(df)} "
+                    f"per_symbol={elapsed / n * 1000:6.1f}ms"
+                )
+    return results
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--symbols", default="10,50,100,200")
+    ap.add_argument("--workers", default="1,4,16")
+    ap.add_argument(
+        "--latency", type=float, default=0.1, help="fake server latency (s)"
+    )
+    ap.add_argument("--calls-per-minute", type=float, default=6000)
+    ap.add_argument("--full-days", type=int, default=1000)
+    args = ap.parse_args()
+    run(
+        [int(x) for x in args.symbols.split(",")],
+        [int(x) for x in args.workers.split(",")],
+        args.latency,
+        args.calls_per_minute,
+        args.full_days,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Benchmark for the FX rate matrix (src/pipeline/transform/fx.py).
+
+    python -m src.pipeline.bench.fx --rows 2000000 --years 5
+
+FX fixes for USDGBP, EURUSD, USDJPY and EURCHF (a cross, triangulated through EUR
+and USD) each miss a few business days. Price rows in USD, EUR, GBP, GBX, JPY and
+CHF on any calendar day are converted to GBP by the matrix, timed against a
+per-pair pandas merge_asof reference with the triangulation written out by hand.
+tests/test_fx.py checks that both agree.
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from ..transform.fx import rate_matrix
+from ..utils.logging import log
+from .synthetic import business_days, fx_rates
+
+PAIRS = {"USDGBP": 0.79, "EURUSD": 1.08, "USDJPY": 150.0, "EURCHF": 0.95}
+CURRENCIES = ["USD", "EUR", "GBP", "GBX", "JPY", "CHF"]
+
+
+def synthetic_fx(years: int, seed: int = 0) -> pd.DataFrame:
+    return fx_rates(PAIRS, business_days(252 * years), seed)
+
+
+def synthetic_prices(rows: int, fx: pd.DataFrame, seed: int = 1) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    first, last = fx["DATE"].min(), fx["DATE"].max()
+    span = (last - first).days
+    # A few days before the first fix and after the last one
+    offsets = rng.integers(-5, span + 5, rows)
+    return pd.DataFrame(
+        {
+            "DATE": first + pd.to_timedelta(offsets, unit="D"),
+            "CURRENCY": rng.choice(CURRENCIES, rows),
+        }
+    )
+
+
+def reference(prices: pd.DataFrame, fx: pd.DataFrame) -> np.ndarray:
+    """GBP per unit of each row's currency via merge_asof on every pair."""
+    rows = prices.reset_index().sort_values("DATE")
+    for pair in PAIRS:
+        quotes = fx.loc[fx["PAIR"] == pair, ["DATE", "RATE"]].sort_values("DATE")
+        rows = pd.merge_asof(rows, quotes.rename(columns={"RATE": pair}), on="DATE")
+    usd_per = {
+        "USD": 1.0,
+        "GBP": 1 / rows["USDGBP"],
+        "EUR": rows["EURUSD"],
+        "JPY": 1 / rows["USDJPY"],
+        "CHF": rows["EURUSD"] / rows["EURCHF"],
+    }
+    out = pd.Series(np.nan, index=rows.index)
+    for currency in CURRENCIES:
+        mask = rows["CURRENCY"] == currency
+        base, scale = ("GBP", 0.01) if currency == "GBX" else (currency, 1.0)
+        value = usd_per[base] * scale / usd_per["GBP"]
+        out[mask] = value[mask] if isinstance(value, pd.Series) else value
+    return out.set_axis(rows["index"]).sort_index().to_numpy()
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--rows", type=int, default=2_000_000)
+    ap.add_argument("--years", type=int, default=5)
+    args = ap.parse_args()
+
+    fx = synthetic_fx(args.years)
+    prices = synthetic_prices(args.rows, fx)
+
+    t0 = time.perf_counter()
+    matrix = rate_matrix(fx)
+    t_build = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    ours = matrix.factors(prices["CURRENCY"], prices["DATE"], "GBP")
+    t_apply = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    rate_matrix(fx)
+    t_memo = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    reference(prices, fx)
+    t_ref = time.perf_counter() - t0
+
+    log(
+        f"[BENCH] {len(prices):,} rows in {len(CURRENCIES)} currencies, "
+        f"{np.isnan(ours).sum():,} without a rate"
+    )
+    log(
+        f"[BENCH] matrix {matrix.values.shape[0]} days x {len(matrix.currencies)} "
+        f"currencies built in {t_build * 1000:.1f} ms (cached lookup "
+        f"{t_memo * 1000:.1f} ms); applied in {t_apply * 1000:.0f} ms vs "
+        f"merge_asof {t_ref * 1000:.0f} ms ({t_ref / t_apply:.1f}x)"
+    )
+    for n in (args.rows // 4, args.rows):
+        part = prices.iloc[:n]
+        t0 = time.perf_counter()
+        matrix.factors(part["CURRENCY"], part["DATE"])
+        log(
+            f"[BENCH] apply to {n:>10,} rows: {(time.perf_counter() - t0) * 1000:.0f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
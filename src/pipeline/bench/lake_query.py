@@ -0,0 +1,89 @@
+"""
+Pruned lake queries (src/pipeline/load/lake.py) versus a full scan of the same
+Parquet dataset filtered in pandas.
+
+    python -m src.pipeline.bench.lake_query --symbols 500 --years 10
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+from ..load.lake import scan
+from ..load.local import write_partitioned
+from ..utils.io import processed_dir
+from ..utils.logging import log
+from .synthetic import equity_bars
+
+QUERIES = [
+    ("one symbol, full history", ["S0007"], None, None, None),
+    ("10 symbols, one quarter, 2 cols", [f"S{i:04d}" for i in range(10)],
+     "2024-04-01", "2024-06-30", ["DATE", "CLOSE"]),
+    ("all symbols, one month, CLOSE", None, "2025-03-01", "2025-03-31",
+     ["SYMBOL", "DATE", "CLOSE"]),
+]  # fmt: skip
+
+
+def full_scan(base_name, symbols, start, end, columns) -> pd.DataFrame:
+    df = pd.read_parquet(processed_dir() / base_name)
+    df = df.drop(columns=[c for c in df.columns if c.startswith("DATE_")])  # bucket
+    df["SYMBOL"] = df["SYMBOL"].astype(str)
+    keep = pd.Series(True, index=df.index)
+    if symbols is not None:
+        keep &= df["SYMBOL"].isin(symbols)
+    if start is not None:
+        keep &= df["DATE"] >= pd.Timestamp(start)
+    if end is not None:
+        keep &= df["DATE"] <= pd.Timestamp(end)
+    return df.loc[keep, columns or df.columns]
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--symbols", type=int, default=500)
+    ap.add_argument("--years", type=int, default=10)
+    ap.add_argument("--granularity", default="year")
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATA_DIR"] = tmp
+        df = equity_bars(args.symbols, 252 * args.years)
+        write_partitioned(
+            df, "equity_daily", ["SYMBOL", "DATE"], granularity=args.granularity
+        )
+        log(f"[BENCH] lake of {len(df):,} rows, granularity={args.granularity}")
+        del df
+
+        for label, symbols, start, end, columns in QUERIES:
+            t0 = time.perf_counter()
+            for _ in range(args.repeat):
+                ref = full_scan("equity_daily", symbols, start, end, columns)
+            t_full = (time.perf_counter() - t0) / args.repeat
+            t0 = time.perf_counter()
+            for _ in range(args.repeat):
+                table, stats = scan("equity_daily", symbols, start, end, columns)
+            t_scan = (time.perf_counter() - t0) / args.repeat
+
+            ours = table.to_pandas()[list(ref.columns)]
+            key = [c for c in ("SYMBOL", "DATE") if c in ref.columns]
+            pd.testing.assert_frame_equal(
+                ours.sort_values(key, ignore_index=True),
+                ref.sort_values(key, ignore_index=True),
+                check_dtype=False,
+            )
+            log(
+                f"[BENCH] {label:<32} rows={stats['rows']:<7} "
+                f"files {stats['files']}/{stats['files_total']} "
+                f"row groups {stats['row_groups']}/{stats['row_groups_total']} | "
+                f"pruned {t_scan * 1000:.0f} ms, full scan {t_full * 1000:.0f} ms "
+                f"({t_full / t_scan:.0f}x)"
+            )
+        log("[PARITY] pruned results match the full scan")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Per-day partitioned writes (the former write_partitioned) versus the dataset
+writer, on synthetic EQUITY_DAILY bars.
+
+    python -m src.pipeline.bench.lake_write --symbols 200 --years 5
+
+Reports write time, file count and the time and files opened to read one
+symbol's full history back.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+import pyarrow.dataset as ds
+
+from ..load.local import read_manifest, write_partitioned
+from ..utils.io import processed_dir
+from ..utils.logging import log
+from .synthetic import equity_bars
+
+
+def legacy_write(df: pd.DataFrame, base_name: str, partition_cols: list[str]) -> Path:
+    """The original loop: one small file per symbol per day, written serially."""
+    base = processed_dir() / base_name
+    for combo, group in df.groupby(partition_cols):
+        parts = [f"{col}={val}" for col, val in zip(partition_cols, combo)]
+        path = base.joinpath(*parts)
+        path.mkdir(parents=True, exist_ok=True)
+        group.to_parquet(path / f"{base_name}.parquet", index=False)
+    return base
+
+
+def _files(base: Path) -> int:
+    return sum(1 for _ in base.rglob("*.parquet"))
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--symbols", type=int, default=200)
+    ap.add_argument("--years", type=int, default=5)
+    ap.add_argument("--granularity", default="year")
+    args = ap.parse_args()
+
+    df = equity_bars(args.symbols, 252 * args.years)
+    symbol = df["SYMBOL"].iloc[0]
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATA_DIR"] = tmp
+
+        t0 = time.perf_counter()
+        legacy = legacy_write(df, "legacy", ["SYMBOL", "DATE"])
+        t_legacy = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        history = pd.concat(
+            pd.read_parquet(p)
+            for p in sorted((legacy / f"SYMBOL={symbol}").rglob("*"))
+            if p.is_file()
+        )
+        r_legacy = time.perf_counter() - t0
+        log(
+            f"[BENCH] per-day: {len(df):,} rows -> {_files(legacy):,} files in "
+            f"{t_legacy:.2f}s; one symbol ({len(history)} rows) read in {r_legacy:.2f}s"
+        )
+
+        t0 = time.perf_counter()
+        base = write_partitioned(
+            df,
+            "dataset",
+            ["SYMBOL", "DATE"],
+            granularity=args.granularity,
+            keys=["SYMBOL", "DATE"],
+        )
+        t_new = time.perf_counter() - t0
+        manifest = read_manifest(base)
+        t0 = time.perf_counter()
+        dataset = ds.dataset(base, format="parquet", partitioning="hive")
+        fragments = list(dataset.get_fragments(filter=ds.field("SYMBOL") == symbol))
+        history = dataset.to_table(filter=ds.field("SYMBOL") == symbol)
+        r_new = time.perf_counter() - t0
+        log(
+            f"[BENCH] {args.granularity:<7} {len(df):,} rows -> {len(manifest['files']):,} "
+            f"files ({manifest['bytes'] / 2**20:.1f} MB) in {t_new:.2f}s; one symbol "
+            f"({history.num_rows} rows, {len(fragments)} files) read in {r_new:.3f}s"
+        )
+        if history.num_rows != len(df) // args.symbols:
+            raise AssertionError("symbol history row count mismatch")
+        log(
+            f"[BENCH] write {t_legacy / t_new:.0f}x faster, "
+            f"{_files(legacy) / len(manifest['files']):.0f}x fewer files"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+"""
+Compare write_pandas-style loading with the bulk COPY path (write_df_bulk)
+against a local DuckDB stand-in for Snowflake.
+
+    python -m src.pipeline.bench.load_modes --rows 2000000 --rtt 0.05
+
+The stand-in treats a temp directory as the stage: PUT copies files into it and
+COPY INTO reads them with read_parquet. --rtt adds a fixed delay per statement
+to model warehouse round trips.
+"""
+
+import argparse
+import glob
+import re
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import duckdb
+import pandas as pd
+
+from ..load.snowflake_loader import write_df_bulk
+from ..utils.logging import log
+from .synthetic import equity_bars
+
+PUT_RE = re.compile(
+    r"PUT\s+'file://(?P<src>[^']+)'\s+@(?P<stage>\S+).*?(PARALLEL=(?P<par>\d+))?",
+    re.IGNORECASE,
+)
+COPY_RE = re.compile(
+    r"COPY INTO\s+(?P<table>\S+)\s+FROM\s+@(?P<stage>\S+)", re.IGNORECASE
+)
+
+
+def _local_name(name: str) -> str:
+    return name.split(".")[-1].replace("%", "")
+
+
+class _Cursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.description = None
+        self._rows = []
+
+    def execute(self, sql, params=None):
+        self.conn.round_trips += 1
+        time.sleep(self.conn.rtt)
+        put, copy = PUT_RE.match(sql.strip()), COPY_RE.match(sql.strip())
+        if put:
+            dest = self.conn.stage_dir(put["stage"])
+            srcs = glob.glob(put["src"])
+            with ThreadPoolExecutor(int(put["par"] or 4)) as pool:
+                list(pool.map(lambda p: shutil.copy(p, dest), srcs))
+            self.description, self._rows = (
+                [("source",), ("status",)],
+                [(s, "UPLOADED") for s in srcs],
+            )
+        elif copy:
+            src = self.conn.stage_dir(copy["stage"])
+            table = _local_name(copy["table"])
+            before = self.conn.db.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            self.conn.db.execute(
+                f"INSERT INTO {table} BY NAME SELECT * FROM read_parquet('{src}/*.parquet')"
+            )
+            after = self.conn.db.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            shutil.rmtree(src)  # PURGE=TRUE
+            self.description = [
+                ("file",),
+                ("status",),
+                ("rows_parsed",),
+                ("rows_loaded",),
+            ]
+            self._rows = [(str(src), "LOADED", after - before, after - before)]
+        else:
+            res = self.conn.db.execute(sql, params or [])
+            self.description = res.description
+            self._rows = res.fetchall() if res.description else []
+        return self
+
+    def fetchall(self):
+        return self._rows
+
+    def fetchone(self):
+        return self._rows[0] if self._rows else None
+
+
+class DuckDBStandIn:
+    """Just enough of a Snowflake connection for the loaders in load/snowflake_loader.py."""
+
+    def __init__(self, rtt: float = 0.0):
+        self.db = duckdb.connect()
+        self.rtt = rtt
+        self.round_trips = 0
+        self._stage_root = Path(tempfile.mkdtemp(prefix="stage_"))
+
+    def stage_dir(self, stage: str) -> Path:
+        d = self._stage_root / re.sub(r"[^A-Za-z0-9_/]", "_", stage.rstrip("/"))
+        d.mkdir(parents=True, exist_ok=True)
+        return d
+
+    def cursor(self):
+        return _Cursor(self)
+
+    def close(self):
+        self.db.close()
+        shutil.rmtree(self._stage_root, ignore_errors=True)
+
+
+def _write_pandas_like(conn, df, table, chunk_size=None):
+    # Mirrors snowflake.connector.pandas_tools.write_pandas: temp stage,
+    # one gzip Parquet file and one sequential PUT per chunk, then COPY INTO.
+    cur = conn.cursor()
+    stage = f"{table}_tmp_stage"
+    cur.execute("SELECT 1")  # CREATE TEMPORARY STAGE
+    chunk_size = chunk_size or len(df)
+    with tempfile.TemporaryDirectory() as tmp:
+        nbytes = 0
+        for i, start in enumerate(range(0, len(df), chunk_size)):
+            path = Path(tmp) / f"file{i}.parquet"
+            df.iloc[start : start + chunk_size].to_parquet(
+                path, compression="gzip", index=False
+            )
+            nbytes += path.stat().st_size
+            cur.execute(f"PUT 'file://{path}' @{stage} PARALLEL=4")
+        cur.execute("SELECT 1")  # CREATE FILE FORMAT
+        cur.execute(f"COPY INTO {table} FROM @{stage}")
+    return nbytes
+
+
+def synthetic_equities(rows: int, symbols: int = 500) -> pd.DataFrame:
+    df = equity_bars(symbols, rows // symbols + 1).iloc[:rows]
+    return df.assign(DATE=df["DATE"].dt.date).reset_index(drop=True)
+
+
+DDL = """
+CREATE OR REPLACE TABLE EQUITY_DAILY (
+  SYMBOL VARCHAR, DATE DATE, OPEN DOUBLE, HIGH DOUBLE, LOW DOUBLE,
+  CLOSE DOUBLE, VOLUME BIGINT, SOURCE VARCHAR
+)
+"""
+
+
+def run(rows, rtt, chunk_size, file_mb, threads):
+    df = synthetic_equities(rows)
+    log(
+        f"[BENCH] {len(df)} rows, {df.memory_usage(deep=True).sum() / 1e6:.0f} MB in memory"
+    )
+
+    conn = DuckDBStandIn(rtt=rtt)
+    conn.cursor().execute(DDL)
+    conn.round_trips = 0
+    t0 = time.perf_counter()
+    nbytes = _write_pandas_like(conn, df, "EQUITY_DAILY", chunk_size)
+    elapsed = time.perf_counter() - t0
+    log(
+        f"[BENCH] write_pandas  {elapsed:7.2f}s  {nbytes / 1e6:7.1f} MB  "
+        f"round_trips={conn.round_trips}"
+    )
+    conn.close()
+
+    conn = DuckDBStandIn(rtt=rtt)
+    conn.cursor().execute(DDL)
+    conn.round_trips = 0
+    t0 = time.perf_counter()
+    stats = write_df_bulk(
+        conn, df, "EQUITY_DAILY", schema="RAW", file_mb=file_mb, threads=threads
+    )
+    elapsed = time.perf_counter() - t0
+    round_trips = conn.round_trips
+    loaded = conn.cursor().execute("SELECT COUNT(*) FROM EQUITY_DAILY").fetchone()[0]
+    log(
+        f"[BENCH] copy          {elapsed:7.2f}s  {stats['bytes'] / 1e6:7.1f} MB  "
+        f"round_trips={round_trips} files={stats['files']} loaded={loaded}"
+    )
+    conn.close()
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    ap.add_argument("--rtt", type=float, default=0.05, help="seconds per statement")
+    ap.add_argument(
+        "--chunk-size", type=int, default=100_000, help="write_pandas chunk_size"
+    )
+    ap.add_argument("--file-mb", type=float, default=64)
+    ap.add_argument("--threads", type=int, default=4)
+    args = ap.parse_args()
+    run(args.rows, args.rtt, args.chunk_size, args.file_mb, args.threads)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Micro-benchmark: row-by-row vs columnar parsing of Alpha Vantage payloads.
+
+    python -m src.pipeline.bench.parse_series --payload data/raw/aapl_full.json
+    python -m src.pipeline.bench.parse_series --days 6500 --start 2025-01-01
+
+Without --payload a synthetic full-history payload (same shape as
+TIME_SERIES_DAILY_ADJUSTED) is used.
+"""
+
+import argparse
+import json
+import time
+import tracemalloc
+from datetime import datetime
+
+import pandas as pd
+
+from ..extract.parsing import EQUITY_FIELDS, parse_time_series
+from ..utils.logging import log
+from .fake_alpha import daily_series
+
+
+def _legacy_parse(series: dict, start_date: str) -> pd.DataFrame:
+    # The pre-columnar implementation, kept here as the baseline.
+    records = []
+    for date_str, values in series.items():
+        date_obj = datetime.strptime(date_str, "%Y-%m-%d").date()
+        records.append(
+            {
+                "date": date_obj,
+                "open": float(values["1. open"]),
+                "high": float(values["2. high"]),
+                "low": float(values["3. low"]),
+                "close": float(values["4. close"]),
+                "volume": int(values["6. volume"]),
+            }
+        )
+    df = pd.DataFrame(records)
+    sd = pd.to_datetime(start_date).date()
+    return df[df["date"] >= sd].reset_index(drop=True)
+
+
+def _measure(fn, repeat):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        out = fn()
+    elapsed = (time.perf_counter() - t0) / repeat
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return out, elapsed, peak
+
+
+def run(series: dict, start_date: str, repeat: int):
+    legacy, t_legacy, m_legacy = _measure(
+        lambda: _legacy_parse(series, start_date), repeat
+    )
+    columnar, t_col, m_col = _measure(
+        lambda: parse_time_series(series, EQUITY_FIELDS, start_date), repeat
+    )
+    pd.testing.assert_frame_equal(legacy, columnar, check_dtype=False)
+    log(f"[BENCH] payload rows={len(series)} start={start_date} kept={len(columnar)}")
+    log(f"[BENCH] legacy   {t_legacy * 1000:8.2f} ms  peak={m_legacy / 1e6:7.2f} MB")
+    log(f"[BENCH] columnar {t_col * 1000:8.2f} ms  peak={m_col / 1e6:7.2f} MB")
+    log(f"[BENCH] speedup  {t_legacy / t_col:8.2f}x")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--payload", help="recorded Alpha Vantage JSON response")
+    ap.add_argument("--days", type=int, default=6500)
+    ap.add_argument("--start", default="1900-01-01")
+    ap.add_argument("--repeat", type=int, default=10)
+    args = ap.parse_args()
+
+    if args.payload:
+        with open(args.payload) as f:
+            series = json.load(f)["Time Series (Daily)"]
+    else:
+        series = daily_series(args.days)
+    run(series, args.start, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Run-over-run view of the span reports written by src/pipeline/utils/instrument.py.
+
+    python -m src.pipeline.bench.perf_report
+    python -m src.pipeline.bench.perf_report --history 10 --threshold 1.5
+
+Compares every span path of the latest run (summed over repeats, e.g. one
+load.write_df per CSV chunk) with its median over the previous runs and flags
+stages whose wall time or peak RSS grew past the threshold.
+"""
+
+import argparse
+import json
+from pathlib import Path
+
+import pandas as pd
+
+from ..utils.io import reports_dir
+from ..utils.logging import log
+
+
+def _rows(span: dict, run: str):
+    yield {
+        "run": run,
+        "path": span["path"],
+        "wall_s": span["wall_s"],
+        "cpu_s": span["cpu_s"],
+        "peak_rss_mb": span["peak_rss_mb"],
+        "rows_out": span["rows_out"],
+        "bytes": span["bytes"],
+    }
+    for child in span["children"]:
+        yield from _rows(child, run)
+
+
+def load_reports(root: Path) -> pd.DataFrame:
+    """One row per span path per run, in run order (first report written)."""
+    rows, started = [], {}
+    for path in root.glob("*/*.json"):
+        report = json.loads(path.read_text())
+        run = report["run_id"]
+        started[run] = min(started.get(run, report["written_at"]), report["written_at"])
+        for span in report["spans"]:
+            rows.extend(_rows(span, run))
+    if not rows:
+        return pd.DataFrame()
+    df = pd.DataFrame(rows)
+    df = df.groupby(["run", "path"], as_index=False).agg(
+        wall_s=("wall_s", "sum"),
+        cpu_s=("cpu_s", "sum"),
+        peak_rss_mb=("peak_rss_mb", "max"),
+        rows_out=("rows_out", "sum"),
+        bytes=("bytes", "sum"),
+    )
+    df["started"] = df["run"].map(started)
+    return df.sort_values(["started", "path"], ignore_index=True)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--dir", default=None, help="reports directory (DATA_DIR/reports)")
+    ap.add_argument("--history", type=int, default=5, help="previous runs to compare")
+    ap.add_argument("--threshold", type=float, default=1.5)
+    ap.add_argument("--min-seconds", type=float, default=0.5)
+    args = ap.parse_args()
+
+    df = load_reports(Path(args.dir) if args.dir else reports_dir())
+    if df.empty:
+        log("[BENCH] no span reports found")
+        return
+    runs = list(dict.fromkeys(df["run"]))
+    latest, previous = runs[-1], runs[-args.history - 1 : -1]
+    current = df[df["run"] == latest].set_index("path")
+    baseline = (
+        df[df["run"].isin(previous)].groupby("path")[["wall_s", "peak_rss_mb"]].median()
+    )
+    log(f"[BENCH] run {latest} against the median of {len(previous)} previous runs")
+    flagged = 0
+    for path, row in current.iterrows():
+        base = baseline.loc[path] if path in baseline.index else None
+        note = "new"
+        if base is not None:
+            wall = row["wall_s"] / max(base["wall_s"], 1e-9)
+            rss = row["peak_rss_mb"] / max(base["peak_rss_mb"], 1e-9)
+            note = f"wall x{wall:.2f} rss x{rss:.2f}"
+            slow = wall > args.threshold and row["wall_s"] >= args.min_seconds
+            if slow or rss > args.threshold:
+                note += "  <-- REGRESSION"
+                flagged += 1
+        log(
+            f"[BENCH] {path:<56} {row['wall_s']:>9.3f}s {row['peak_rss_mb']:>7.0f} MB "
+            f"rows {row['rows_out']:>9} {note}"
+        )
+    log(f"[BENCH] {flagged} stage(s) regressed beyond x{args.threshold}")
+
+
+if __name__ == "__main__":
+    main()
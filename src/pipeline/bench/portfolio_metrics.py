@@ -0,0 +1,80 @@
+"""
+Benchmark for FACT_PORTFOLIO_DAILY's rolling volatility and VaR.
+
+    python -m src.pipeline.bench.portfolio_metrics --portfolios 200 --years 5
+
+Compared with the former VIEW_PORTFOLIO_METRICS (04_portfolio_metrics.sql) in
+DuckDB dialect: a 30-row STDDEV_SAMP window plus a correlated PERCENTILE_CONT
+subquery per row over the trailing 30 calendar days. Parity with it, full and
+incremental, is checked by tests/test_portfolio_metrics.py.
+"""
+
+import argparse
+import time
+
+import duckdb
+import numpy as np
+import pandas as pd
+
+from ..transform.portfolio_metrics import compute_portfolio_metrics
+from ..utils.logging import log
+from .synthetic import portfolio_returns
+
+REFERENCE_SQL = """
+WITH with_vol AS (
+    SELECT
+        d.*,
+        STDDEV_SAMP(d.weighted_daily_return) OVER (
+            PARTITION BY d.PORTFOLIO_ID ORDER BY d.DATE ROWS BETWEEN 29 PRECEDING AND CURRENT ROW
+        ) AS rolling_30d_volatility
+    FROM daily d
+)
+SELECT
+    v.PORTFOLIO_ID,
+    v.DATE,
+    v.rolling_30d_volatility,
+    (
+        SELECT PERCENTILE_CONT(0.05) WITHIN GROUP (ORDER BY d2.weighted_daily_return)
+        FROM daily d2
+        WHERE d2.PORTFOLIO_ID = v.PORTFOLIO_ID
+          AND d2.DATE BETWEEN v.DATE - INTERVAL 29 DAY AND v.DATE
+    ) AS daily_var_95
+FROM with_vol v
+"""
+
+
+def run_sql(daily: pd.DataFrame) -> pd.DataFrame:
+    con = duckdb.connect()
+    con.register("daily", daily)
+    return con.execute(REFERENCE_SQL).df().rename(columns=str.upper)
+
+
+def daily_rows(portfolios: int, years: int) -> pd.DataFrame:
+    """Portfolio returns with some days dropped, so row and calendar windows differ."""
+    daily, _ = portfolio_returns(portfolios, years)
+    gaps = np.random.default_rng(2).random(len(daily)) < 0.05
+    return daily[~gaps].reset_index(drop=True)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--portfolios", type=int, default=200)
+    ap.add_argument("--years", type=int, default=2)
+    args = ap.parse_args()
+
+    daily = daily_rows(args.portfolios, args.years)
+
+    t0 = time.perf_counter()
+    compute_portfolio_metrics(daily)
+    t_py = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    run_sql(daily)
+    t_sql = time.perf_counter() - t0
+    log(
+        f"[BENCH] {len(daily):,} rows: python {t_py:.2f}s, "
+        f"correlated SQL on DuckDB {t_sql:.2f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
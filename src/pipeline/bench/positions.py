@@ -0,0 +1,189 @@
+"""
+Benchmark for the event-sourced positions engine.
+
+    python -m src.pipeline.bench.positions --transactions 1000000
+
+REFERENCE_SQL is 05_positions_daily.sql's first load in DuckDB dialect: every
+(portfolio, symbol) ever traded crossed with a calendar date spine and a running
+SUM of the daily deltas. replay_incremental runs days against the open runs
+only, upserting on (PORTFOLIO_ID, SYMBOL, VALID_FROM) like the job.
+tests/test_positions.py checks both against the engine.
+"""
+
+import argparse
+import time
+
+import duckdb
+import numpy as np
+import pandas as pd
+
+from ..transform.positions import (
+    KEYS,
+    RUN_COLUMNS,
+    expand_daily,
+    position_runs,
+    positions_as_of,
+)
+from ..utils.logging import log
+
+REFERENCE_SQL = """
+WITH base AS (
+    SELECT DISTINCT portfolio_id, symbol FROM tx
+),
+deltas AS (
+    SELECT portfolio_id, symbol, transaction_date AS date,
+           SUM(CAST(quantity_delta AS DECIMAL(18, 6))) AS qty_delta
+    FROM tx
+    WHERE transaction_date <= $as_of
+    GROUP BY 1, 2, 3
+),
+date_spine AS (
+    SELECT CAST(d AS DATE) AS date
+    FROM generate_series(
+        (SELECT MIN(transaction_date) FROM tx), $as_of, INTERVAL 1 DAY
+    ) t(d)
+),
+calc AS (
+    SELECT b.portfolio_id, b.symbol, s.date,
+           SUM(COALESCE(dl.qty_delta, 0)) OVER (
+               PARTITION BY b.portfolio_id, b.symbol ORDER BY s.date
+               ROWS UNBOUNDED PRECEDING
+           ) AS quantity
+    FROM base b
+    CROSS JOIN date_spine s
+    LEFT JOIN deltas dl
+      ON dl.portfolio_id = b.portfolio_id
+     AND dl.symbol = b.symbol
+     AND dl.date = s.date
+)
+SELECT portfolio_id, symbol, date, CAST(quantity AS DOUBLE) AS quantity,
+       quantity <> 0 AS held
+FROM calc
+"""
+
+
+def synthetic_transactions(
+    transactions: int, portfolios: int, symbols: int, years: int, seed: int = 0
+) -> pd.DataFrame:
+    """
+    PORTFOLIO_TRANSACTIONS-shaped rows: 6-decimal quantities, several trades on
+    some days, short positions, and about one trade in six closing the position
+    out exactly (the running quantity returns to zero).
+    """
+    rng = np.random.default_rng(seed)
+    end = pd.Timestamp("2025-09-30")
+    days = pd.date_range(end=end, periods=365 * years).to_numpy("datetime64[D]")
+    ids = np.array([f"P{i:05d}" for i in range(portfolios)], dtype=object)
+    syms = np.array([f"S{i:04d}" for i in range(symbols)], dtype=object)
+
+    # Keys trade at different rates; dates are independent uniform draws
+    key = rng.zipf(1.3, transactions) % (portfolios * symbols)
+    tx = pd.DataFrame(
+        {
+            "PORTFOLIO_ID": ids[key // symbols],
+            "SYMBOL": syms[key % symbols],
+            "TRANSACTION_DATE": rng.choice(days, transactions),
+            "QUANTITY_DELTA": np.round(rng.normal(5, 40, transactions), 6),
+        }
+    ).sort_values(KEYS + ["TRANSACTION_DATE"], kind="stable", ignore_index=True)
+
+    # Close-outs: the last trade of a day sells exactly what is held, so the
+    # day ends flat. Each close-out ends a segment of its key's trades.
+    micro = np.rint(tx["QUANTITY_DELTA"].to_numpy() * 1e6).astype(np.int64)
+    code = tx.groupby(KEYS, sort=False).ngroup().to_numpy()
+    dates = tx["TRANSACTION_DATE"].to_numpy()
+    last_of_day = np.ones(transactions, dtype=bool)
+    last_of_day[:-1] = (code[1:] != code[:-1]) | (dates[1:] != dates[:-1])
+    close = (rng.random(transactions) < 1 / 6) & last_of_day
+    micro[close] = 0
+    closes = pd.Series(close.astype(np.int64)).groupby(code).cumsum().to_numpy()
+    segment = closes - close
+    held = pd.Series(micro).groupby([code, segment]).transform("sum").to_numpy()
+    micro[close] = -held[close]
+    tx["QUANTITY_DELTA"] = micro / 1e6
+    return tx
+
+
+def run_sql(tx: pd.DataFrame, as_of) -> pd.DataFrame:
+    con = duckdb.connect()
+    con.register("tx", tx)
+    out = con.execute(REFERENCE_SQL, {"as_of": pd.Timestamp(as_of).date()}).df()
+    return out.rename(columns=str.upper)
+
+
+def replay_incremental(tx: pd.DataFrame, runs: int, as_of) -> pd.DataFrame:
+    """Full replay up to a cutoff, then `runs` daily runs fed the open runs only."""
+    days = np.sort(tx["TRANSACTION_DATE"].unique())
+    cutoff = days[-runs - 1]
+    table = position_runs(tx[tx["TRANSACTION_DATE"] <= cutoff], as_of=cutoff)
+    read = 0
+    for day in days[-runs:]:
+        new = tx[(tx["TRANSACTION_DATE"] > cutoff) & (tx["TRANSACTION_DATE"] <= day)]
+        open_runs = table[table["VALID_TO"].isna()]
+        touched = pd.MultiIndex.from_frame(open_runs[KEYS]).isin(
+            pd.MultiIndex.from_frame(new[KEYS])
+        )
+        read += len(open_runs) + len(new)
+        changed = position_runs(new, opening=open_runs[touched], as_of=day)
+        # Upsert on the runs table's primary key
+        table = pd.concat([table, changed], ignore_index=True).drop_duplicates(
+            subset=KEYS + ["VALID_FROM"], keep="last"
+        )
+        cutoff = day
+    log(f"[INCREMENTAL] {runs} runs read {read / runs:,.0f} rows/run")
+    return table.sort_values(RUN_COLUMNS[:3], ignore_index=True)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--transactions", type=int, default=1_000_000)
+    ap.add_argument("--portfolios", type=int, default=2000)
+    ap.add_argument("--symbols", type=int, default=100)
+    ap.add_argument("--years", type=int, default=5)
+    args = ap.parse_args()
+
+    tx = synthetic_transactions(
+        args.transactions, args.portfolios, args.symbols, args.years, seed=1
+    )
+    as_of = tx["TRANSACTION_DATE"].max()
+    start = tx["TRANSACTION_DATE"].min()
+    t0 = time.perf_counter()
+    runs = position_runs(tx, as_of=as_of)
+    t_runs = time.perf_counter() - t0
+
+    keys = tx.groupby(KEYS, sort=False).ngroups
+    days = (as_of - start).days + 1
+    valid_to = runs["VALID_TO"].fillna(as_of)
+    held_days = int(((valid_to - runs["VALID_FROM"]).dt.days + 1).sum())
+    log(
+        f"[BENCH] {len(tx):,} transactions -> {len(runs):,} runs in {t_runs:.2f}s "
+        f"({len(tx) / t_runs:,.0f} tx/s)"
+    )
+    log(
+        f"[BENCH] rows: runs {len(runs):,} | non-zero daily {held_days:,} | "
+        f"dense daily (05 SQL) {keys * days:,}"
+    )
+
+    t0 = time.perf_counter()
+    holdings = positions_as_of(runs, as_of - pd.Timedelta(days=365))
+    log(
+        f"[BENCH] as-of lookup: {len(holdings):,} holdings in "
+        f"{time.perf_counter() - t0:.3f}s"
+    )
+
+    t0 = time.perf_counter()
+    month = sum(
+        len(c) for c in expand_daily(runs, as_of - pd.Timedelta(days=30), as_of)
+    )
+    log(
+        f"[BENCH] expand last 31 days: {month:,} rows in "
+        f"{time.perf_counter() - t0:.2f}s"
+    )
+
+    t0 = time.perf_counter()
+    replay_incremental(tx, 1, as_of)
+    log(f"[BENCH] cutoff replay + 1 incremental day: {time.perf_counter() - t0:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Replay Snowflake query history through the profiler's aggregation and
+regression flags (src/pipeline/utils/query_profile.py).
+
+    python -m src.pipeline.bench.query_profile                      # synthetic
+    python -m src.pipeline.bench.query_profile --history export.csv
+
+An export is the result of jobs/profile_queries.py's HISTORY_SQL saved as CSV
+or JSON records. Without one, a synthetic history of daily runs is generated
+with untagged and foreign-tagged queries, mapped task instances and one task
+made three times as expensive in the last run; the check fails unless exactly
+that task is flagged.
+"""
+
+import argparse
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from ..utils.logging import log
+from ..utils.query_profile import APP, aggregate_by_task, flag_regressions
+
+TASKS = {
+    # task_id: (map instances, queries per instance, seconds, GB scanned)
+    "incremental_load": (3, 6, 4.0, 0.2),
+    "build_fact_prices": (1, 5, 12.0, 1.5),
+    "build_positions_daily": (1, 8, 20.0, 2.0),
+    "build_portfolio_metrics": (1, 4, 9.0, 0.8),
+}
+REGRESSED = "build_portfolio_metrics"
+
+
+def _tag(task, run, map_index=None, app=APP):
+    tag = {"app": app, "dag": "etl_uk_portfolio_health", "task": task, "run": run}
+    if map_index is not None:
+        tag["map_index"] = map_index
+    return json.dumps(tag, separators=(",", ":"))
+
+
+def synthetic_history(runs: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    rows = []
+    for r in range(runs):
+        run = f"scheduled__2025-09-{r + 1:02d}T06:00:00+00:00"
+        start = pd.Timestamp("2025-09-01 06:00") + pd.Timedelta(days=r)
+        for task, (instances, queries, seconds, gb) in TASKS.items():
+            scale = 3.0 if (task == REGRESSED and r == runs - 1) else 1.0
+            for m in range(instances):
+                for _ in range(queries):
+                    jitter = rng.uniform(0.9, 1.1)
+                    elapsed = seconds / queries * scale * jitter * 1000
+                    rows.append(
+                        {
+                            "QUERY_ID": f"q{len(rows)}",
+                            "QUERY_TAG": _tag(task, run, m if instances > 1 else None),
+                            "START_TIME": start,
+                            "END_TIME": start + pd.Timedelta(milliseconds=elapsed),
+                            "TOTAL_ELAPSED_TIME": elapsed,
+                            "EXECUTION_TIME": elapsed * 0.9,
+                            "QUEUED_OVERLOAD_TIME": 0,
+                            "BYTES_SCANNED": int(gb / queries * scale * jitter * 2**30),
+                            "PARTITIONS_SCANNED": int(40 * scale * jitter),
+                            "PARTITIONS_TOTAL": 400,
+                            "BYTES_SPILLED_TO_LOCAL_STORAGE": 0,
+                            "BYTES_SPILLED_TO_REMOTE_STORAGE": 0,
+                            "ROWS_PRODUCED": 1000,
+                        }
+                    )
+                    start += pd.Timedelta(milliseconds=elapsed)
+        # Not ours: ad-hoc queries and another application's tags
+        for tag in ("", "adhoc analysis", _tag("build_fact_prices", run, app="other")):
+            rows.append({**rows[-1], "QUERY_ID": f"q{len(rows)}", "QUERY_TAG": tag})
+    return pd.DataFrame(rows)
+
+
+def load_history(path: str) -> pd.DataFrame:
+    path = Path(path)
+    if path.suffix == ".json":
+        return pd.DataFrame(json.loads(path.read_text()))
+    return pd.read_csv(path)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--history", help="recorded QUERY_HISTORY export (CSV or JSON)")
+    ap.add_argument("--runs", type=int, default=15)
+    ap.add_argument("--threshold", type=float, default=1.5)
+    ap.add_argument("--trailing", type=int, default=10)
+    args = ap.parse_args()
+
+    history = (
+        load_history(args.history) if args.history else synthetic_history(args.runs)
+    )
+    profile = aggregate_by_task(history)
+    flagged = flag_regressions(profile, args.threshold, args.trailing)
+    log(f"[BENCH] {len(history)} queries -> {len(profile)} run/task profiles")
+
+    latest = flagged.sort_values("RUN_START").groupby("TASK_ID").tail(1)
+    for row in latest.sort_values("TASK_ID").itertuples():
+        log(
+            f"[BENCH] {row.TASK_ID:<24} {row.QUERIES:>3} queries {row.ELAPSED_S:>7.1f}s "
+            f"x{row.ELAPSED_RATIO:.2f} elapsed, x{row.BYTES_RATIO:.2f} bytes"
+            + (f"  <-- {row.REGRESSION}" if pd.notna(row.REGRESSION) else "")
+        )
+    if args.history:
+        return
+
+    if set(profile["TASK_ID"]) != set(TASKS) or len(profile) != args.runs * len(TASKS):
+        raise AssertionError("untagged or foreign queries were attributed")
+    mapped = profile[profile["TASK_ID"] == "incremental_load"]["QUERIES"]
+    if not (
+        mapped == TASKS["incremental_load"][0] * TASKS["incremental_load"][1]
+    ).all():
+        raise AssertionError("mapped task instances were not summed")
+    regressed = set(flagged.loc[flagged["REGRESSION"].notna(), "TASK_ID"])
+    if regressed != {REGRESSED}:
+        raise AssertionError(f"expected only {REGRESSED} flagged, got {regressed}")
+    log(f"[PARITY] only {REGRESSED} flagged in the last run")
+
+
+if __name__ == "__main__":
+    main()
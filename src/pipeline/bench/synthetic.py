@@ -0,0 +1,103 @@
+"""
+Synthetic market data shared by the benchmarks: business-day calendars ending on
+END, random-walk equity bars, FX fixes and portfolio return series.
+"""
+
+import numpy as np
+import pandas as pd
+
+END = "2025-09-30"
+
+
+def business_days(n_days: int) -> pd.DatetimeIndex:
+    return pd.bdate_range(end=END, periods=n_days)
+
+
+def equity_bars(
+    symbols: int,
+    n_days: int,
+    seed: int = 0,
+    gaps: float = 0.0,
+    null_closes: float = 0.0,
+) -> pd.DataFrame:
+    """
+    EQUITY_DAILY-shaped rows for symbols S0000.., with a `gaps` share of rows
+    dropped and a `null_closes` share of closes NULL.
+    """
+    rng = np.random.default_rng(seed)
+    days = business_days(n_days)
+    n = symbols * len(days)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    close[rng.random(n) < null_closes] = np.nan
+    bars = pd.DataFrame(
+        {
+            "SYMBOL": np.repeat([f"S{i:04d}" for i in range(symbols)], len(days)),
+            "DATE": np.tile(days.values, symbols),
+            "OPEN": close,
+            "HIGH": close * 1.01,
+            "LOW": close * 0.99,
+            "CLOSE": close,
+            "VOLUME": rng.integers(1_000, 1_000_000, n),
+            "SOURCE": "alphavantage",
+        }
+    )
+    if gaps:
+        bars = bars[rng.random(n) > gaps].reset_index(drop=True)
+    return bars
+
+
+def fx_rates(
+    pairs: dict, days: pd.DatetimeIndex, seed: int = 0, gaps: float = 0.03
+) -> pd.DataFrame:
+    """FX_DAILY rows: a random walk from each pair's level, missing `gaps` of days."""
+    rng = np.random.default_rng(seed)
+    parts = []
+    for pair, level in pairs.items():
+        rate = level * np.exp(np.cumsum(rng.normal(0, 0.004, len(days))))
+        keep = rng.random(len(days)) > gaps  # holidays on either side of the pair
+        parts.append(
+            pd.DataFrame({"PAIR": pair, "DATE": days[keep], "RATE": rate[keep]})
+        )
+    return pd.concat(parts, ignore_index=True)
+
+
+def portfolio_returns(portfolios: int, years: int, seed: int = 0):
+    """
+    VIEW_PORTFOLIO_METRICS-shaped rows plus a FACT_BENCHMARK series. Portfolios start
+    on different days, some returns are NULL, the benchmark skips a few dates, one
+    portfolio has a flat stretch and one has non-positive values.
+    """
+    rng = np.random.default_rng(seed)
+    days = business_days(252 * years)
+    n_days = len(days)
+
+    rets = rng.normal(0.0004, 0.01, size=(portfolios, n_days))
+    rets[rng.random(rets.shape) < 0.02] = np.nan
+    rets[:, 0] = np.nan
+    rets[0, :45] = 0.0
+    values = 10_000 * np.cumprod(1 + np.nan_to_num(rets), axis=1)
+    values[rng.random(values.shape) < 0.005] = np.nan
+    if portfolios > 1:
+        values[1] = -values[1]
+
+    first_day = rng.integers(0, n_days // 4, size=portfolios)
+    keep = np.arange(n_days)[None, :] >= first_day[:, None]
+    ids = np.array([f"P{i:05d}" for i in range(portfolios)], dtype=object)
+    base = pd.DataFrame(
+        {
+            "PORTFOLIO_ID": np.repeat(ids, n_days)[keep.ravel()],
+            "DATE": np.tile(days.values, portfolios)[keep.ravel()],
+            "WEIGHTED_DAILY_RETURN": rets[keep],
+            "TOTAL_VALUE_GBP": values[keep],
+        }
+    )
+
+    bench_days = days[rng.random(n_days) > 0.03]
+    benchmark = pd.DataFrame(
+        {
+            "SYMBOL": "SPY",
+            "DATE": bench_days,
+            "CLOSE": 400 * np.cumprod(1 + rng.normal(0.0003, 0.011, len(bench_days))),
+        }
+    )
+    return base, benchmark
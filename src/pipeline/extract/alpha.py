@@ -1,87 +1,190 @@
 import os
+import threading
 import time
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
 
+import numpy as np
 import pandas as pd
 import requests
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+
+from ..utils.instrument import instrument
+from .cache import ResponseCache
+from .parsing import BENCHMARK_FIELDS, EQUITY_FIELDS, FX_FIELDS, parse_time_series
+from .rate_limit import AlphaVantageLimiter
 
 BASE = "https://www.alphavantage.co/query"
 BENCHMARK_SYMBOL = "SPY"
+# outputsize=compact returns the latest 100 data points; keep a few spare for safety
+COMPACT_POINTS = 100
+COMPACT_SAFETY = 5
+
+_session_local = threading.local()
+_limiter = None
+_limiter_lock = threading.Lock()
+_cache = None
+_cache_loaded = False
+
+
+def _base_url() -> str:
+    return os.getenv("ALPHAVANTAGE_BASE_URL", BASE)
+
+
+def _session() -> requests.Session:
+    """
+    One keep-alive HTTP session per worker thread, so concurrent fetches reuse
+    TCP/TLS connections without sharing a Session across threads.
+    """
+    sess = getattr(_session_local, "session", None)
+    if sess is None:
+        sess = requests.Session()
+        sess.headers["User-Agent"] = "uk-portfolio-health/1.0"
+        sess.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=1))
+        sess.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=1))
+        _session_local.session = sess
+    return sess
+
+
+def default_limiter() -> AlphaVantageLimiter:
+    """Process-wide limiter so every caller shares the API key's quota."""
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = AlphaVantageLimiter.from_env()
+        return _limiter
+
+
+def default_cache():
+    """Process-wide raw response cache (None when ALPHAVANTAGE_CACHE=0)."""
+    global _cache, _cache_loaded
+    with _limiter_lock:
+        if not _cache_loaded:
+            _cache = ResponseCache.from_env()
+            _cache_loaded = True
+        return _cache
 
 
-def _alpha_get(params, max_retries=5, backoff=2):
-    headers = {"User-Agent": "uk-portfolio-health/1.0"}
+def _alpha_get(
+    params, max_retries=5, backoff=2, limiter=None, cache=None, allow_empty=False
+):
+    cache = cache or default_cache()
+    if cache is not None:
+        cached = cache.get(params)
+        if cached is not None:
+            return cached
+
+    limiter = limiter or default_limiter()
+    sess = _session()
     for attempt in range(max_retries):
-        resp = requests.get(BASE, headers=headers, params=params, timeout=30)
+        limiter.acquire()
+        resp = sess.get(_base_url(), params=params, timeout=30)
         if resp.status_code == 200:
             data = resp.json()
-            if not data or "Note" in data or "Error Message" in data:
+            if (
+                (not data and not allow_empty)
+                or "Note" in data
+                or "Error Message" in data
+            ):
                 # API limit hit or invalid request
                 if attempt < max_retries - 1:
                     time.sleep(backoff * (attempt + 1))
                     continue
                 raise RuntimeError(f"Alpha Vantage error: {data}")
+            if cache is not None:
+                cache.put(params, data)
             return data
         time.sleep(backoff * (attempt + 1))
     resp.raise_for_status()
 
 
-def fetch_symbol_daily(sym: str, start_date: str) -> pd.DataFrame:
+def choose_outputsize(last_loaded, today=None) -> str:
+    """
+    Pick "compact" when the weekdays since `last_loaded` fit in the compact window,
+    "full" on cold start (no watermark) or when the gap is too big.
+    """
+    if not last_loaded:
+        return "full"
+    last = pd.to_datetime(last_loaded).date()
+    today = today or date.today()
+    if last >= today:
+        return "compact"
+    gap = int(np.busday_count(last, today)) + 1
+    return "compact" if gap <= COMPACT_POINTS - COMPACT_SAFETY else "full"
+
+
+def _fetch_series(params, series_key, last_loaded=None, limiter=None):
+    """
+    Fetch the time-series mapping, sizing the request from `last_loaded`.
+    If a compact response does not reach back to the watermark, retry with full.
+    """
+    params = {**params, "outputsize": choose_outputsize(last_loaded)}
+    data = _alpha_get(params, limiter=limiter)
+    series = data.get(series_key)
+    if (
+        params["outputsize"] == "compact"
+        and series
+        and min(series) > pd.to_datetime(last_loaded).strftime("%Y-%m-%d")
+    ):
+        return _fetch_series(params, series_key, last_loaded=None, limiter=limiter)
+    return data
+
+
+def fetch_symbol_daily(
+    sym: str, start_date: str, limiter=None, last_loaded=None
+) -> pd.DataFrame:
     load_dotenv()
     API_KEY = os.getenv("ALPHAVANTAGE_API_KEY")
 
     params = {
         "function": "TIME_SERIES_DAILY_ADJUSTED",
         "symbol": sym.upper(),
-        "outputsize": "full",
         "apikey": API_KEY,
     }
 
-    data = _alpha_get(params)
+    data = _fetch_series(params, "Time Series (Daily)", last_loaded, limiter)
     if "Time Series (Daily)" not in data:
         raise RuntimeError(f"Unexpected Alpha Vantage response for {sym}: {data}")
 
-    records = []
-    for date_str, values in data["Time Series (Daily)"].items():
-        date_obj = datetime.strptime(date_str, "%Y-%m-%d").date()
-        if sym == BENCHMARK_SYMBOL:
-            records.append(
-                {
-                    "symbol": sym.upper(),
-                    "date": date_obj,
-                    "close": float(values["4. close"]),
-                }
-            )
-        else:
-            records.append(
-                {
-                    "symbol": sym.upper(),
-                    "date": date_obj,
-                    "open": float(values["1. open"]),
-                    "high": float(values["2. high"]),
-                    "low": float(values["3. low"]),
-                    "close": float(values["4. close"]),
-                    "volume": int(values["6. volume"]),
-                    "source": "alphavantage",
-                }
-            )
-
-    df = pd.DataFrame(records)
-
-    # Filter by start_date
-    sd = pd.to_datetime(start_date).date()
-    df = df[df["date"] >= sd].reset_index(drop=True)
+    benchmark = sym == BENCHMARK_SYMBOL
+    df = parse_time_series(
+        data["Time Series (Daily)"],
+        BENCHMARK_FIELDS if benchmark else EQUITY_FIELDS,
+        start_date=start_date,
+    )
+    df.insert(0, "symbol", sym.upper())
+    if not benchmark:
+        df["source"] = "alphavantage"
 
     return (
         df[["symbol", "date", "close"]]
-        if sym == BENCHMARK_SYMBOL
+        if benchmark
         else df[["symbol", "date", "open", "high", "low", "close", "volume", "source"]]
     )
 
 
-def fetch_equities(symbols, start_date, last_loaded=None):
-    parts = [fetch_symbol_daily(s, start_date) for s in symbols]
+@instrument("extract.equities")
+def fetch_equities(
+    symbols, start_date, last_loaded=None, max_workers=None, limiter=None
+):
+    """
+    Fetch daily bars for all symbols concurrently.
+    Requests are paced by the shared token-bucket limiter, so `max_workers`
+    (env FETCH_CONCURRENCY) only controls how many calls may be in flight at once.
+    `last_loaded` also decides between compact and full history requests.
+    """
+    if max_workers is None:
+        max_workers = int(os.getenv("FETCH_CONCURRENCY", "4"))
+    limiter = limiter or default_limiter()
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        # map() keeps results in symbol order, same as the sequential version
+        parts = list(
+            pool.map(
+                lambda s: fetch_symbol_daily(s, start_date, limiter, last_loaded),
+                symbols,
+            )
+        )
     df = pd.concat(parts, ignore_index=True).drop_duplicates(subset=["symbol", "date"])
 
     if last_loaded:
@@ -90,7 +193,9 @@ def fetch_equities(symbols, start_date, last_loaded=None):
     return df
 
 
-def fetch_fx_pair(pair: str, start_date: str) -> pd.DataFrame:
+def fetch_fx_pair(
+    pair: str, start_date: str, limiter=None, last_loaded=None
+) -> pd.DataFrame:
     load_dotenv()
     API_KEY = os.getenv("ALPHAVANTAGE_API_KEY")
     pair = pair.strip().upper()
@@ -103,29 +208,78 @@ def fetch_fx_pair(pair: str, start_date: str) -> pd.DataFrame:
         "function": "FX_DAILY",
         "from_symbol": from_curr,
         "to_symbol": to_curr,
-        "outputsize": "full",
         "apikey": API_KEY,
     }
 
-    data = _alpha_get(params)
+    data = _fetch_series(params, "Time Series FX (Daily)", last_loaded, limiter)
     if "Time Series FX (Daily)" not in data:
         raise RuntimeError(f"Unexpected Alpha Vantage FX response for {pair}: {data}")
 
-    records = []
-    for date_str, values in data["Time Series FX (Daily)"].items():
-        date_obj = datetime.strptime(date_str, "%Y-%m-%d").date()
-        records.append(
-            {
-                "pair": pair,
-                "date": date_obj,
-                "rate": float(values["4. close"]),  # use close price as standard
-                "source": "alphavantage",
-            }
-        )
+    df = parse_time_series(
+        data["Time Series FX (Daily)"], FX_FIELDS, start_date=start_date
+    )
+    df.insert(0, "pair", pair)
+    df["source"] = "alphavantage"
 
-    df = pd.DataFrame(records)
+    return df[["pair", "date", "rate", "source"]]
 
-    sd = pd.to_datetime(start_date).date()
-    df = df[df["date"] >= sd].reset_index(drop=True)
 
-    return df[["pair", "date", "rate", "source"]]
+def fetch_symbol_overview(sym: str, limiter=None) -> dict:
+    """
+    Company name and listing currency from the OVERVIEW endpoint. ETFs and
+    unknown symbols get an empty response, which leaves both fields None.
+    """
+    load_dotenv()
+    params = {
+        "function": "OVERVIEW",
+        "symbol": sym.upper(),
+        "apikey": os.getenv("ALPHAVANTAGE_API_KEY"),
+    }
+    data = _alpha_get(params, limiter=limiter, allow_empty=True)
+    currency = (data.get("Currency") or "").strip().upper()
+    return {
+        "symbol": sym.upper(),
+        "company_name": data.get("Name") or None,
+        "currency": currency if currency and currency != "NONE" else None,
+    }
+
+
+@instrument("extract.overview")
+def fetch_overviews(symbols, max_workers=None, limiter=None) -> pd.DataFrame:
+    """Fetch OVERVIEW for several symbols concurrently, paced like fetch_equities."""
+    if max_workers is None:
+        max_workers = int(os.getenv("FETCH_CONCURRENCY", "4"))
+    limiter = limiter or default_limiter()
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        rows = list(pool.map(lambda s: fetch_symbol_overview(s, limiter), symbols))
+    return pd.DataFrame(rows, columns=["symbol", "company_name", "currency"])
+
+
+@instrument("extract.fx")
+def fetch_fx_pairs(
+    pairs, start_date, last_loaded=None, max_workers=None, limiter=None
+) -> pd.DataFrame:
+    """
+    Fetch several FX pairs concurrently, paced by the shared limiter like
+    fetch_equities. `last_loaded` is one date for all pairs or a {pair: date} dict;
+    rows on or before a pair's date are dropped.
+    """
+    if max_workers is None:
+        max_workers = int(os.getenv("FETCH_CONCURRENCY", "4"))
+    limiter = limiter or default_limiter()
+    pairs = [p.strip().upper() for p in pairs]
+    if not isinstance(last_loaded, dict):
+        last_loaded = {p: last_loaded for p in pairs}
+
+    def _fetch(pair):
+        last = last_loaded.get(pair)
+        df = fetch_fx_pair(pair, start_date, limiter, last)
+        if last:
+            df = df[df["date"] > pd.to_datetime(last).date()]
+        return df
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        parts = list(pool.map(_fetch, pairs))
+    if not parts:
+        return pd.DataFrame(columns=["pair", "date", "rate", "source"])
+    return pd.concat(parts, ignore_index=True)
@@ -0,0 +1,154 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+from ..utils.io import raw_dir
+
+HOUR = 3600
+# Daily bars only change once per trading day; replaying within a run's retry
+# window (DAG retries every 5 minutes, twice) is always safe.
+DEFAULT_TTLS = {
+    "TIME_SERIES_DAILY_ADJUSTED": 6 * HOUR,
+    "FX_DAILY": 6 * HOUR,
+    # Company name and listing currency practically never change
+    "OVERVIEW": 7 * 24 * HOUR,
+}
+DEFAULT_TTL = 1 * HOUR
+
+
+class ResponseCache:
+    """
+    On-disk cache of raw Alpha Vantage JSON responses.
+
+    Entries are keyed by a SHA-256 of the request params (minus the apikey),
+    stored gzip-compressed with the payload's own SHA-256 so corrupted files are
+    treated as misses. Each API function has its own TTL, and the directory is
+    kept under `max_bytes` by evicting least recently used entries.
+    """
+
+    def __init__(
+        self,
+        root: Optional[Path] = None,
+        max_bytes: int = 512 * 1024 * 1024,
+        ttls: Optional[dict] = None,
+        default_ttl: int = DEFAULT_TTL,
+        clock=time.time,
+    ):
+        self.root = Path(root) if root else raw_dir() / "alpha_cache"
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self.default_ttl = default_ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._size = None
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(params: dict) -> str:
+        clean = {k: v for k, v in params.items() if k.lower() != "apikey"}
+        blob = json.dumps(clean, sort_keys=True, default=str).encode()
+        return hashlib.sha256(blob).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.json.gz"
+
+    def _count(self, hit: bool):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, params: dict) -> Optional[dict]:
+        path = self._path(self.key(params))
+        try:
+            with gzip.open(path, "rb") as f:
+                entry = json.loads(f.read())
+            body = entry["payload"].encode()
+            if hashlib.sha256(body).hexdigest() != entry["sha256"]:
+                raise ValueError("content hash mismatch")
+        except FileNotFoundError:
+            self._count(hit=False)
+            return None
+        except (OSError, ValueError, KeyError):
+            path.unlink(missing_ok=True)
+            self._count(hit=False)
+            return None
+
+        ttl = self.ttls.get(params.get("function"), self.default_ttl)
+        if self._clock() - entry["fetched_at"] > ttl:
+            path.unlink(missing_ok=True)
+            self._count(hit=False)
+            return None
+
+        os.utime(path)  # mtime doubles as the LRU clock
+        self._count(hit=True)
+        return json.loads(body)
+
+    def put(self, params: dict, data: dict):
+        body = json.dumps(data)
+        entry = {
+            "fetched_at": self._clock(),
+            "function": params.get("function"),
+            "sha256": hashlib.sha256(body.encode()).hexdigest(),
+            "payload": body,
+        }
+        path = self._path(self.key(params))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{threading.get_ident()}.tmp")
+        with gzip.open(tmp, "wb", compresslevel=6) as f:
+            f.write(json.dumps(entry).encode())
+        os.replace(tmp, path)
+
+        with self._lock:
+            if self._size is None:
+                self._size = sum(p.stat().st_size for p in self.root.rglob("*.json.gz"))
+            else:
+                self._size += path.stat().st_size
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        files = []
+        for p in self.root.rglob("*.json.gz"):
+            try:
+                st = p.stat()
+            except FileNotFoundError:
+                continue
+            files.append((st.st_mtime, st.st_size, p))
+        files.sort()
+        total = sum(size for _, size, _ in files)
+        for _, size, p in files:
+            if total <= self.max_bytes:
+                break
+            p.unlink(missing_ok=True)
+            total -= size
+        self._size = total
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+    @classmethod
+    def from_env(cls) -> Optional["ResponseCache"]:
+        if os.getenv("ALPHAVANTAGE_CACHE", "1") == "0":
+            return None
+        ttl = os.getenv("ALPHAVANTAGE_CACHE_TTL")
+        ttls = {fn: int(ttl) for fn in DEFAULT_TTLS} if ttl else None
+        return cls(
+            max_bytes=int(os.getenv("ALPHAVANTAGE_CACHE_MAX_MB", "512")) * 1024 * 1024,
+            ttls=ttls,
+            default_ttl=int(ttl) if ttl else DEFAULT_TTL,
+        )
@@ -0,0 +1,47 @@
+from operator import itemgetter
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+# output column -> (Alpha Vantage field, dtype)
+EQUITY_FIELDS = {
+    "open": ("1. open", "float64"),
+    "high": ("2. high", "float64"),
+    "low": ("3. low", "float64"),
+    "close": ("4. close", "float64"),
+    "volume": ("6. volume", "int64"),
+}
+BENCHMARK_FIELDS = {"close": ("4. close", "float64")}
+FX_FIELDS = {"rate": ("4. close", "float64")}  # use close price as standard
+
+
+def parse_time_series(
+    series: dict, fields: dict, start_date: Optional[str] = None
+) -> pd.DataFrame:
+    """
+    Columnar parse of an Alpha Vantage time-series mapping ({"YYYY-MM-DD": {...}}).
+
+    The start-date cutoff is applied on the ISO date keys before any row is
+    materialised, then each field is pulled out as one column and converted
+    in bulk. Returns a "date" column of datetime.date plus one column per field,
+    in the payload's row order.
+    """
+    keys = list(series)
+    if start_date is not None:
+        cutoff = pd.to_datetime(start_date).strftime("%Y-%m-%d")
+        keys = [k for k in keys if k >= cutoff]
+
+    names = list(fields)
+    av_fields = [f for f, _ in fields.values()]
+    if len(av_fields) == 1:
+        f = av_fields[0]
+        columns = [[series[k][f] for k in keys]]
+    else:
+        getter = itemgetter(*av_fields)
+        columns = list(zip(*(getter(series[k]) for k in keys))) or [()] * len(names)
+
+    frame = {"date": np.array(keys, dtype="datetime64[D]").astype(object)}
+    for name, col in zip(names, columns):
+        frame[name] = np.array(col, dtype=object).astype(fields[name][1])
+    return pd.DataFrame(frame)
@@ -0,0 +1,84 @@
+import os
+import threading
+import time
+from typing import Optional
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket.
+    `rate` tokens are added per second up to `capacity`; each call consumes one.
+    """
+
+    def __init__(
+        self, rate: float, capacity: float, clock=time.monotonic, sleep=time.sleep
+    ):
+        if rate <= 0 or capacity <= 0:
+            raise ValueError("TokenBucket rate and capacity must be positive")
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = float(capacity)
+        self._last = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def reserve(self) -> float:
+        """
+        Take a token and return how many seconds the caller must wait before using it.
+        Tokens may go negative so that concurrent callers queue up fairly.
+        """
+        with self._lock:
+            self._refill(self._clock())
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def acquire(self):
+        wait = self.reserve()
+        if wait > 0:
+            self._sleep(wait)
+
+    def try_acquire(self) -> bool:
+        """Take a token only if one is available right now."""
+        with self._lock:
+            self._refill(self._clock())
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+class AlphaVantageLimiter:
+    """
+    Combines the API key's per-minute quota (blocking) and per-day quota (fail fast:
+    waiting hours for the next token is never what a DAG task wants).
+    """
+
+    def __init__(
+        self, calls_per_minute: float = 5, calls_per_day: Optional[int] = None
+    ):
+        self.minute = TokenBucket(
+            rate=calls_per_minute / 60.0, capacity=calls_per_minute
+        )
+        self.day = (
+            TokenBucket(rate=calls_per_day / 86400.0, capacity=calls_per_day)
+            if calls_per_day
+            else None
+        )
+
+    def acquire(self):
+        if self.day is not None and not self.day.try_acquire():
+            raise RuntimeError("Alpha Vantage daily request quota exhausted")
+        self.minute.acquire()
+
+    @classmethod
+    def from_env(cls) -> "AlphaVantageLimiter":
+        per_day = os.getenv("ALPHAVANTAGE_CALLS_PER_DAY")
+        return cls(
+            calls_per_minute=float(os.getenv("ALPHAVANTAGE_CALLS_PER_MINUTE", "5")),
+            calls_per_day=int(per_day) if per_day else None,
+        )
@@ -0,0 +1,104 @@
+import os
+from typing import Optional
+
+from dotenv import load_dotenv
+
+from ..load.snowflake_loader import sf_conn, upsert_df
+from ..transform.advanced_metrics import compute_incremental
+from ..utils.instrument import task_span
+from ..utils.last_loaded_metadata import (
+    get_last_loaded_date,
+    update_last_loaded_date,
+)
+from ..utils.logging import log
+
+BASE_SQL = """
+    SELECT PORTFOLIO_ID, DATE, WEIGHTED_DAILY_RETURN, TOTAL_VALUE_GBP
+    FROM PORTFOLIO.ANALYTICS.VIEW_PORTFOLIO_METRICS
+"""
+# Only the look-back each portfolio's windows need; everything for new portfolios
+INCREMENTAL_BASE_SQL = """
+    SELECT v.PORTFOLIO_ID, v.DATE, v.WEIGHTED_DAILY_RETURN, v.TOTAL_VALUE_GBP
+    FROM PORTFOLIO.ANALYTICS.VIEW_PORTFOLIO_METRICS v
+    LEFT JOIN PORTFOLIO.ANALYTICS.ADV_METRICS_STATE s
+      ON s.PORTFOLIO_ID = v.PORTFOLIO_ID
+    WHERE s.CONTEXT_FROM IS NULL OR v.DATE >= s.CONTEXT_FROM
+"""
+STATE_SQL = """
+    SELECT PORTFOLIO_ID, CONTEXT_FROM, PEAK_BEFORE
+    FROM PORTFOLIO.ANALYTICS.ADV_METRICS_STATE
+"""
+BENCHMARK_SQL = "SELECT SYMBOL, DATE, CLOSE FROM PORTFOLIO.RAW.FACT_BENCHMARK"
+
+
+def build_advanced_metrics(full_rebuild: Optional[bool] = None):
+    """
+    Compute FACT_PORTFOLIO_ADV_METRICS locally (same definitions as
+    06_advanced_metrics.sql) and MERGE the result into Snowflake.
+
+    Incremental by default: reads the 'advanced_metrics' watermark, pulls only the
+    look-back context recorded in ADV_METRICS_STATE and merges only dates after the
+    watermark. `full_rebuild` (env ADV_METRICS_FULL_REBUILD=1) recomputes all history,
+    e.g. after a backfill.
+    """
+    load_dotenv()
+    if full_rebuild is None:
+        full_rebuild = os.getenv("ADV_METRICS_FULL_REBUILD", "0") == "1"
+
+    with sf_conn() as conn:
+        cur = conn.cursor()
+        watermark = None
+        if not full_rebuild:
+            watermark = get_last_loaded_date(conn, "advanced_metrics")
+        log(f"Last advanced metrics date: {watermark}")
+
+        if watermark is None:
+            state = None
+            base = cur.execute(BASE_SQL).fetch_pandas_all()
+        else:
+            state = cur.execute(STATE_SQL).fetch_pandas_all()
+            base = cur.execute(INCREMENTAL_BASE_SQL).fetch_pandas_all()
+        benchmark = cur.execute(BENCHMARK_SQL).fetch_pandas_all()
+        log(f"[ADV] {len(base)} portfolio rows, {len(benchmark)} benchmark rows")
+        if len(base) == 0:
+            log("No portfolio metrics to process.")
+            return
+
+        metrics, next_state = compute_incremental(base, benchmark, state)
+        if watermark is not None:
+            # Context rows were only read to fill the windows; portfolios without
+            # state yet get their whole history
+            known = set(state["PORTFOLIO_ID"]) if len(state) else set()
+            new = metrics["DATE"].astype(str) > watermark
+            metrics = metrics[new | ~metrics["PORTFOLIO_ID"].isin(known)]
+
+        upsert_df(
+            conn,
+            metrics,
+            table="FACT_PORTFOLIO_ADV_METRICS",
+            keys=["DATE", "PORTFOLIO_ID"],
+            schema="PORTFOLIO.ANALYTICS",
+        )
+        # Watermark before state: if the state write fails, the next run reads the
+        # older, wider context again, which is still correct
+        max_date = str(base["DATE"].max())
+        update_last_loaded_date(conn, "advanced_metrics", max_date)
+        upsert_df(
+            conn,
+            next_state,
+            table="ADV_METRICS_STATE",
+            keys=["PORTFOLIO_ID"],
+            schema="PORTFOLIO.ANALYTICS",
+        )
+        log(f"Advanced metrics loaded through {max_date} ({len(metrics)} rows)")
+
+
+@task_span("build_advanced_metrics")
+def main():
+    log("Starting advanced metrics job")
+    build_advanced_metrics()
+    log("Advanced metrics job completed")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,93 +1,88 @@
+"""
+Data quality checks after incremental_load: one aggregate query per table for its
+whole rule suite (src/pipeline/utils/dq.py), tables checked concurrently, and all
+results written to PIPELINE_MONITORING in one batch.
+"""
+
 import datetime
-import uuid
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
 
 from ..load.snowflake_loader import sf_conn
 from ..utils.alerts import send_slack_alert
+from ..utils.dq import DQ_SUITES, compile_suite, evaluate_suite
+from ..utils.instrument import current_span, run_id, span, task_span
 from ..utils.logging import log
 
+RESULT_SQL = """
+    INSERT INTO PORTFOLIO.ANALYTICS.PIPELINE_MONITORING
+        (run_id, run_date, task_name, status, record_count, error_message)
+    VALUES (%s, %s, %s, %s, %s, %s)
+"""
 
-def dq_check():
-    run_id = str(uuid.uuid4())
-    run_date = datetime.date.today()
 
-    def log_result(cur, task_name, status, count=None, error_message=None):
-        """Insert data quality check results into the monitoring table."""
-        cur.execute(
-            """
-            INSERT INTO PORTFOLIO.ANALYTICS.PIPELINE_MONITORING
-                (run_id, run_date, task_name, status, record_count, error_message)
-            VALUES (%s, %s, %s, %s, %s, %s)
-            """,
-            (
-                run_id,
-                run_date,
-                task_name,
-                status,
-                count,
-                error_message,
-            ),
-        )
+def load_suites() -> dict:
+    """DQ_SUITES, with tables replaced or added from DQ_SUITES_FILE (same JSON shape)."""
+    suites = dict(DQ_SUITES)
+    path = os.getenv("DQ_SUITES_FILE")
+    if path:
+        with open(path) as f:
+            suites.update(json.load(f))
+    return suites
+
 
-    try:
+def check_table(table: str, suite: dict, parent=None) -> list[dict]:
+    """Every rule of the suite in one scan of the table, on its own connection."""
+    with span("dq.table", parent, table=table, rules=len(suite["rules"])) as s:
         with sf_conn() as conn:
-            cur = conn.cursor()
+            values = conn.cursor().execute(compile_suite(table, suite)).fetchone()
+        s.add(rows_out=len(suite["rules"]))
+    return evaluate_suite(table, suite, values)
 
-            # FX CHECK
-            cur.execute(
-                "SELECT COUNT(*) FROM PORTFOLIO.RAW.FX_DAILY WHERE DATE = CURRENT_DATE"
-            )
-            fx_missing = cur.fetchone()[0]
 
-            # if fx_missing == 0:
-            #     msg = f"No FX data for today ({run_date})!"
-            #     send_slack_alert(msg)
-            #     log_result(
-            #         cur,
-            #         "FX_DAILY_TODAY_CHECK",
-            #         "FAIL",
-            #         count=fx_missing,
-            #         error_message=msg,
-            #     )
-            #     raise ValueError(msg)
-            # else:
-            #     log_result(cur, "FX_DAILY_TODAY_CHECK", "PASS", count=fx_missing)
+@task_span("dq_check")
+def dq_check():
+    """
+    Run each table's rule suite (DQ_CONCURRENCY tables at a time), record every
+    result, and fail the task if an error-severity rule failed.
+    """
+    load_dotenv()
+    suites = load_suites()
+    workers = max(1, int(os.getenv("DQ_CONCURRENCY", "4")))
+    parent = current_span()
 
-            # EQUITY CHECK
-            cur.execute(
-                "SELECT COUNT(*) FROM PORTFOLIO.RAW.EQUITY_DAILY WHERE DATE = CURRENT_DATE"
+    with ThreadPoolExecutor(max_workers=min(workers, len(suites))) as pool:
+        results = [
+            r
+            for table_results in pool.map(
+                lambda item: check_table(item[0], item[1], parent), suites.items()
             )
-            eq_missing = cur.fetchone()[0]
-
-            # if eq_missing == 0:
-            #     msg = f"No equities data for today ({run_date})!"
-            #     send_slack_alert(msg)
-            #     log_result(
-            #         cur,
-            #         "EQUITY_DAILY_TODAY_CHECK",
-            #         "FAIL",
-            #         count=eq_missing,
-            #         error_message=msg,
-            #     )
-            #     raise ValueError(msg)
-            # else:
-            #     log_result(cur, "EQUITY_DAILY_TODAY_CHECK", "PASS", count=eq_missing)
+            for r in table_results
+        ]
 
-            # POSITIONS CHECK
-            cur.execute("SELECT COUNT(*) FROM PORTFOLIO.RAW.PORTFOLIO_POSITIONS")
-            pos_count = cur.fetchone()[0]
+    run, run_date = run_id(), datetime.date.today()
+    with sf_conn() as conn:
+        conn.cursor().executemany(
+            RESULT_SQL,
+            [
+                (run, run_date, r["rule"], r["status"], r["value"], r["message"])
+                for r in results
+            ],
+        )  # fmt: skip
 
-            if pos_count == 0:
-                msg = "No positions found in PORTFOLIO.RAW.PORTFOLIO_POSITIONS!"
-                send_slack_alert(msg)
-                log_result(
-                    cur, "POSITIONS_CHECK", "FAIL", count=pos_count, error_message=msg
-                )
-                raise ValueError(msg)
-            else:
-                log_result(cur, "POSITIONS_CHECK", "PASS", count=pos_count)
+    for r in results:
+        if r["status"] != "PASS":
+            log(f"[DQ] {r['status']} {r['message']}")
+    failed = [r for r in results if r["status"] == "FAIL"]
+    if failed:
+        msg = "Data quality checks failed:\n" + "\n".join(r["message"] for r in failed)
+        send_slack_alert(msg)
+        raise ValueError(msg)
+    log(f"All {len(results)} data quality checks passed ({len(suites)} tables).")
 
-        log("All checks passed successfully.")
 
-    except Exception as e:
-        log(f"[ERROR] {e}")
-        raise
+if __name__ == "__main__":
+    dq_check()
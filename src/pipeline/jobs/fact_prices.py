@@ -0,0 +1,207 @@
+import datetime
+import os
+from typing import Optional
+
+import pandas as pd
+from dotenv import load_dotenv
+
+from ..load.snowflake_loader import sf_conn, upsert_df
+from ..transform.fx import convert_to_gbp, rate_matrix
+from ..transform.prices import CONTEXT_ROWS, compute_fact_prices
+from ..utils.instrument import task_span
+from ..utils.last_loaded_metadata import (
+    get_last_loaded_date,
+    update_last_loaded_date,
+)
+from ..utils.logging import log
+from .incremental_load import configured_symbols
+
+# Each symbol has its own build watermark (fact_prices:<SYMBOL>), not one global
+# date: equities load per symbol, so a symbol whose load failed arrives on a later
+# run with dates other symbols have already passed
+WATERMARKS_SQL = """
+    SELECT SPLIT_PART(source, ':', 2) AS SYMBOL, last_loaded_date AS BUILT_TO
+    FROM PORTFOLIO.RAW.LOAD_METADATA
+    WHERE SPLIT_PART(source, ':', 1) = 'fact_prices'
+      AND SPLIT_PART(source, ':', 2) <> ''
+"""
+# One-off seed for builds from before per-symbol watermarks
+SEED_SQL = """
+    SELECT SYMBOL, MAX(DATE) AS BUILT_TO
+    FROM PORTFOLIO.ANALYTICS.FACT_PRICES
+    GROUP BY SYMBOL
+"""
+# Equity bars with their listing currency; {filter} bounds each symbol's dates, so
+# the scan prunes on EQUITY_DAILY's (SYMBOL, DATE) clustering
+BARS_SQL = """
+    SELECT
+        e.SYMBOL, e.DATE, s.COMPANY_NAME, s.CURRENCY,
+        e.OPEN, e.HIGH, e.LOW, e.CLOSE, e.VOLUME
+    FROM PORTFOLIO.RAW.EQUITY_DAILY e
+    LEFT JOIN PORTFOLIO.ANALYTICS.DIM_SYMBOL s
+      ON e.SYMBOL = s.SYMBOL
+    WHERE {filter}
+"""
+# Every pair's fixes over the new dates, plus its last fix before them to carry forward
+FX_SQL = """
+    SELECT PAIR, DATE, RATE
+    FROM PORTFOLIO.RAW.FX_DAILY
+    WHERE DATE >= %s AND DATE <= %s
+    UNION ALL
+    SELECT PAIR, DATE, RATE
+    FROM PORTFOLIO.RAW.FX_DAILY
+    WHERE DATE < %s
+    QUALIFY ROW_NUMBER() OVER (PARTITION BY PAIR ORDER BY DATE DESC) = 1
+"""
+# Window look-back: the last CONTEXT_ROWS rows per symbol up to its watermark
+CONTEXT_SQL = f"""
+    SELECT e.SYMBOL, e.DATE, e.CLOSE
+    FROM PORTFOLIO.RAW.EQUITY_DAILY e
+    WHERE {{filter}}
+    QUALIFY ROW_NUMBER() OVER (PARTITION BY e.SYMBOL ORDER BY e.DATE DESC) <= {CONTEXT_ROWS}
+"""
+# 29 trading days are ~41 calendar days; the margin covers holidays and halts
+CONTEXT_DAYS = 90
+RUN_START_SQL = "SELECT CURRENT_TIMESTAMP()::TIMESTAMP_NTZ"
+
+
+def build_watermark(symbol: str) -> str:
+    return f"fact_prices:{symbol.upper()}"
+
+
+def _any_of(term: str, rows) -> tuple[str, list]:
+    """`term` OR-ed once per row of parameters, for BARS_SQL / CONTEXT_SQL filters."""
+    rows = list(rows)
+    return " OR ".join([term] * len(rows)), [p for row in rows for p in row]
+
+
+def _bars_filter(symbols, built: dict) -> tuple[str, list]:
+    """Each built symbol's bars after its watermark, all bars of the others."""
+    after, params = _any_of(
+        "(e.SYMBOL = %s AND e.DATE > %s)",
+        [(s, built[s]) for s in symbols if s in built],
+    )
+    terms = [after] if after else []
+    new = [s for s in symbols if s not in built]
+    if new:
+        terms.append(f"e.SYMBOL IN ({', '.join(['%s'] * len(new))})")
+        params += new
+    return " OR ".join(terms) or "FALSE", params
+
+
+def _context(cur, built: dict) -> pd.DataFrame:
+    """
+    CONTEXT_SQL for the `built` symbols, searched within CONTEXT_DAYS of each
+    watermark so the scan does not grow with history. Symbols with fewer than
+    CONTEXT_ROWS rows there (long gaps, recent listings) are re-read without the
+    lower bound.
+    """
+    since = {
+        s: str(datetime.date.fromisoformat(to) - datetime.timedelta(days=CONTEXT_DAYS))
+        for s, to in built.items()
+    }
+    bounded, params = _any_of(
+        "(e.SYMBOL = %s AND e.DATE > %s AND e.DATE <= %s)",
+        [(s, since[s], to) for s, to in built.items()],
+    )
+    context = cur.execute(CONTEXT_SQL.format(filter=bounded), params).fetch_pandas_all()
+    counts = context["SYMBOL"].value_counts()
+    short = {s: to for s, to in built.items() if counts.get(s, 0) < CONTEXT_ROWS}
+    if not short:
+        return context
+    unbounded, params = _any_of("(e.SYMBOL = %s AND e.DATE <= %s)", short.items())
+    rest = cur.execute(CONTEXT_SQL.format(filter=unbounded), params).fetch_pandas_all()
+    context = context[~context["SYMBOL"].isin(list(short))]
+    return pd.concat([context, rest], ignore_index=True)
+
+
+def _watermarks(conn, cur) -> dict:
+    """Build watermark per symbol; seeded once from FACT_PRICES for older builds."""
+    rows = cur.execute(WATERMARKS_SQL).fetch_pandas_all()
+    seeded = len(rows) == 0
+    if seeded:
+        rows = cur.execute(SEED_SQL).fetch_pandas_all()
+    built = {
+        s: str(pd.Timestamp(d).date()) for s, d in zip(rows["SYMBOL"], rows["BUILT_TO"])
+    }
+    if seeded:
+        for symbol, date in built.items():
+            update_last_loaded_date(conn, build_watermark(symbol), date)
+    return built
+
+
+def build_fact_prices(full_rebuild: Optional[bool] = None):
+    """
+    Upsert FACT_PRICES rows for EQUITY_DAILY dates after each symbol's build
+    watermark (SYMBOLS without one are built from their first bar). Prices are
+    converted to GBP with the as-of rate of each symbol's DIM_SYMBOL currency;
+    returns and rolling windows are computed locally with the previous CONTEXT_ROWS
+    rows per symbol as context, so the result matches a full recompute while each
+    run reads only the new dates plus a fixed look-back.
+    `full_rebuild` (env FACT_PRICES_FULL_REBUILD=1) recomputes all dates.
+    """
+    load_dotenv()
+    if full_rebuild is None:
+        full_rebuild = os.getenv("FACT_PRICES_FULL_REBUILD", "0") == "1"
+
+    with sf_conn() as conn:
+        cur = conn.cursor()
+        loaded_at = cur.execute(RUN_START_SQL).fetchone()[0]
+        watermark = get_last_loaded_date(conn, "fact_prices")
+        log(f"Last FACT_PRICES date: {watermark}")
+
+        built, where, params = {}, "TRUE", []
+        if not full_rebuild:
+            built = _watermarks(conn, cur)
+            symbols = sorted(set(configured_symbols()) | set(built))
+            where, params = _bars_filter(symbols, built)
+        bars = cur.execute(BARS_SQL.format(filter=where), params).fetch_pandas_all()
+        if len(bars) == 0:
+            log("No new prices to load.")
+            return
+        context = None
+        pending = {s: built[s] for s in bars["SYMBOL"].unique() if s in built}
+        if pending:
+            context = _context(cur, pending)
+            log(f"Window context: {len(context)} rows")
+
+        days = pd.to_datetime(bars["DATE"])
+        first, last = str(days.min().date()), str(days.max().date())
+        fx = cur.execute(FX_SQL, (first, last, first)).fetch_pandas_all()
+        bars = convert_to_gbp(bars, rate_matrix(fx))
+        missing = int(bars["FX_TO_GBP"].isna().sum())
+        if missing:
+            log(f"[FX] {missing} price rows have no rate to GBP")
+
+        # Tells the portfolio metrics build which dates this run wrote; passed as
+        # text, which the load casts to the TIMESTAMP_NTZ column
+        prices = compute_fact_prices(bars, context).assign(_LOADED_AT=str(loaded_at))
+        upsert_df(
+            conn,
+            prices,
+            table="FACT_PRICES",
+            keys=["SYMBOL", "DATE"],
+            schema="PORTFOLIO.ANALYTICS",
+        )
+        for symbol, date in prices.groupby("SYMBOL")["DATE"].max().items():
+            update_last_loaded_date(
+                conn, build_watermark(symbol), str(pd.Timestamp(date).date())
+            )
+        # Kept as the latest date built (and as an API cache version bump); late
+        # symbols must not move it back
+        max_date = str(prices["DATE"].max())
+        if watermark and not full_rebuild:
+            max_date = max(max_date, watermark)
+        update_last_loaded_date(conn, "fact_prices", max_date)
+        log(f"FACT_PRICES loaded through {max_date} ({len(prices)} rows)")
+
+
+@task_span("build_fact_prices")
+def main():
+    log("Starting FACT_PRICES job")
+    build_fact_prices()
+    log("FACT_PRICES job completed")
+
+
+if __name__ == "__main__":
+    main()
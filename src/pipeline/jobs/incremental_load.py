@@ -1,15 +1,38 @@
+"""
+Incremental market-data load, one callable per source so each can run (and retry)
+as its own task:
+
+    load_source("equities", symbols=["AAPL", "MSFT"])   # one symbol batch
+    load_source("fx")
+    load_source("spy")
+
+Every source keeps its own watermarks in RAW.LOAD_METADATA: one per symbol
+(equities:<SYMBOL>) so batches never move each other's watermark, one per FX
+pair (fx:<PAIR>, pairs from FX_PAIRS) and spy.
+source_tasks() lists the calls for a run; the DAG returns it from a task at run time
+and maps incremental_load over that XCom.
+"""
+
 import os
+from typing import Optional
 
 import pandas as pd
 from dotenv import load_dotenv
 
-from ..extract.alpha import fetch_equities, fetch_fx_pair
-from ..load.local import write_partitioned
+from ..extract.alpha import (
+    default_cache,
+    fetch_equities,
+    fetch_fx_pairs,
+    fetch_overviews,
+)
+from ..load.local import compact_partitions, write_partitioned
 from ..load.snowflake_loader import (
     sf_conn,
-    write_df,
+    upsert_df,
 )
 from ..transform.cleaning import clean_equities
+from ..transform.fx import fx_pairs
+from ..utils.instrument import task_span
 from ..utils.last_loaded_metadata import (
     get_last_loaded_date,
     update_last_loaded_date,
@@ -17,62 +40,186 @@ from ..utils.last_loaded_metadata import (
 from ..utils.logging import log
 
 BENCHMARK_SYMBOL = "SPY"
+SOURCES = ("equities", "fx", "spy")
+# Watermarks shared by all symbols / pairs before they were tracked one by one
+LEGACY_EQUITIES_SOURCE = "equities"
+LEGACY_FX_SOURCE = "fx"
 
 
-def run_incremental():
-    load_dotenv()
-    symbols = [
+def configured_symbols() -> list[str]:
+    """SYMBOLS: the equities every run loads."""
+    return [
         s.strip()
         for s in os.getenv("SYMBOLS", "AAPL,MSFT,GOOGL").split(",")
         if s.strip()
     ]
-    start = os.getenv("START_DATE", "2025-01-01")
 
-    with sf_conn() as conn:
-        # -----Equities-----
-        last_eq_date = get_last_loaded_date(conn, "equities")
-        log(f"Last equities load date: {last_eq_date}")
-        eq_df = clean_equities(fetch_equities(symbols, start, last_loaded=last_eq_date))
-        if len(eq_df) == 0:
-            log("No new equities to load.")
-        else:
-            write_partitioned(eq_df, "equity_daily", ["SYMBOL", "DATE"])
-            write_df(conn, eq_df, table="EQUITY_DAILY", schema="PORTFOLIO.RAW")
-            max_date = eq_df["DATE"].max().strftime("%Y-%m-%d")
-            update_last_loaded_date(conn, "equities", max_date)
-            log(f"Equities loaded through {max_date}")
-
-        # -------FX-------
-        # Let's track only USD/GBP for now
-        last_fx = get_last_loaded_date(conn, "fx")
-        log(f"Last FX load date: {last_fx}")
-        fx_df = fetch_fx_pair("usdgbp", start)
-
-        if last_fx:
-            fx_df = fx_df[fx_df["date"] > pd.to_datetime(last_fx).date()]
-
-        if len(fx_df) == 0:
-            log("No new FX data to load.")
-        else:
-            write_partitioned(fx_df, "fx_daily", ["pair", "date"])
-            write_df(conn, fx_df, table="FX_DAILY", schema="PORTFOLIO.RAW")
-            max_date_fx = fx_df["date"].max().strftime("%Y-%m-%d")
-            update_last_loaded_date(conn, "fx", max_date_fx)
-            log(f"FX loaded through {max_date_fx}")
-        # -------S&P500-------
-        last_spy = get_last_loaded_date(conn, "spy")
-        log(f"Last SPY load date: {last_spy}")
-
-        spy_df = clean_equities(
-            fetch_equities([BENCHMARK_SYMBOL], start, last_loaded=last_spy), True
+
+def symbol_batches(
+    symbols: Optional[list[str]] = None, batch_size: Optional[int] = None
+) -> list[list[str]]:
+    """SYMBOLS in batches of `batch_size` (env INCREMENTAL_SYMBOL_BATCH; 0 = one batch)."""
+    symbols = configured_symbols() if symbols is None else symbols
+    if batch_size is None:
+        batch_size = int(os.getenv("INCREMENTAL_SYMBOL_BATCH", "0"))
+    if batch_size <= 0:
+        return [symbols] if symbols else []
+    return [symbols[i : i + batch_size] for i in range(0, len(symbols), batch_size)]
+
+
+def source_tasks() -> list[dict]:
+    """Keyword arguments of every load_source call for one run."""
+    tasks = [{"source": "equities", "symbols": batch} for batch in symbol_batches()]
+    return tasks + [{"source": "fx"}, {"source": "spy"}]
+
+
+def equity_watermark(symbol: str) -> str:
+    return f"equities:{symbol.upper()}"
+
+
+def load_equities(conn, symbols: list[str], start: str):
+    if not symbols:
+        return
+    # Symbols sharing a watermark (usually all of them) are fetched together
+    by_watermark = {}
+    for symbol in symbols:
+        last = get_last_loaded_date(conn, equity_watermark(symbol))
+        if last is None:
+            last = get_last_loaded_date(conn, LEGACY_EQUITIES_SOURCE)
+        by_watermark.setdefault(last, []).append(symbol)
+    log(f"Last equities load dates: {by_watermark}")
+
+    parts = [
+        fetch_equities(group, start, last_loaded=last)
+        for last, group in by_watermark.items()
+    ]
+    eq_df = clean_equities(pd.concat(parts, ignore_index=True))
+    if len(eq_df) == 0:
+        log(f"No new equities to load for {symbols}.")
+        return
+    write_partitioned(
+        eq_df, "equity_daily", ["SYMBOL", "DATE"], keys=["SYMBOL", "DATE"]
+    )
+    compact_partitions("equity_daily")
+    upsert_df(
+        conn,
+        eq_df,
+        table="EQUITY_DAILY",
+        keys=["SYMBOL", "DATE"],
+        schema="PORTFOLIO.RAW",
+    )
+    for symbol, max_date in eq_df.groupby("SYMBOL")["DATE"].max().items():
+        update_last_loaded_date(
+            conn, equity_watermark(symbol), max_date.strftime("%Y-%m-%d")
         )
-        if len(spy_df) == 0:
-            log("No new equities to load.")
+    log(f"Equities loaded through {eq_df['DATE'].max():%Y-%m-%d} for {symbols}")
+
+
+def load_dim_symbol(conn, symbols: list[str]):
+    """
+    Fill DIM_SYMBOL (company name, listing currency) from OVERVIEW for symbols
+    that are missing or have no currency yet, so FX conversion knows GBX/EUR
+    listings. Symbols OVERVIEW does not cover (e.g. ETFs) stay NULL and are
+    retried on later runs.
+    """
+    cur = conn.cursor()
+    known = {
+        row[0]
+        for row in cur.execute(
+            "SELECT SYMBOL FROM PORTFOLIO.ANALYTICS.DIM_SYMBOL WHERE CURRENCY IS NOT NULL"
+        ).fetchall()
+    }
+    missing = [s.upper() for s in symbols if s.upper() not in known]
+    if not missing:
+        return
+    dim = fetch_overviews(missing)
+    dim.columns = [c.upper() for c in dim.columns]
+    upsert_df(
+        conn, dim, table="DIM_SYMBOL", keys=["SYMBOL"], schema="PORTFOLIO.ANALYTICS"
+    )
+    log(f"DIM_SYMBOL currencies: {dict(zip(dim['SYMBOL'], dim['CURRENCY']))}")
+
+
+def fx_watermark(pair: str) -> str:
+    return f"fx:{pair.upper()}"
+
+
+def load_fx(conn, start: str):
+    pairs = fx_pairs()
+    last_fx = {}
+    for pair in pairs:
+        last = get_last_loaded_date(conn, fx_watermark(pair))
+        if last is None:
+            last = get_last_loaded_date(conn, LEGACY_FX_SOURCE)
+        last_fx[pair] = last
+    log(f"Last FX load dates: {last_fx}")
+    fx_df = fetch_fx_pairs(pairs, start, last_loaded=last_fx)
+
+    if len(fx_df) == 0:
+        log("No new FX data to load.")
+        return
+    write_partitioned(fx_df, "fx_daily", ["pair", "date"], keys=["pair", "date"])
+    compact_partitions("fx_daily")
+    upsert_df(
+        conn,
+        fx_df,
+        table="FX_DAILY",
+        keys=["pair", "date"],
+        schema="PORTFOLIO.RAW",
+    )
+    for pair, max_date in fx_df.groupby("pair")["date"].max().items():
+        update_last_loaded_date(conn, fx_watermark(pair), max_date.strftime("%Y-%m-%d"))
+    log(f"FX loaded through {fx_df['date'].max():%Y-%m-%d} for {pairs}")
+
+
+def load_spy(conn, start: str):
+    last_spy = get_last_loaded_date(conn, "spy")
+    log(f"Last SPY load date: {last_spy}")
+
+    spy_df = clean_equities(
+        fetch_equities([BENCHMARK_SYMBOL], start, last_loaded=last_spy), True
+    )
+    if len(spy_df) == 0:
+        log("No new benchmark data to load.")
+        return
+    upsert_df(
+        conn,
+        spy_df,
+        table="FACT_BENCHMARK",
+        keys=["DATE", "SYMBOL"],
+        schema="PORTFOLIO.RAW",
+    )
+    max_date = spy_df["DATE"].max().strftime("%Y-%m-%d")
+    update_last_loaded_date(conn, "spy", max_date)
+    log(f"Benchmark loaded through {max_date}")
+
+
+def load_source(source: str, symbols: Optional[list[str]] = None):
+    """Load one source (and, for equities, one symbol batch) on its own connection."""
+    load_dotenv()
+    if source not in SOURCES:
+        raise ValueError(f"Unknown incremental source: {source}")
+    start = os.getenv("START_DATE", "2025-01-01")
+
+    with task_span(f"incremental_load.{source}", symbols=symbols), sf_conn() as conn:
+        if source == "equities":
+            symbols = symbols if symbols is not None else configured_symbols()
+            load_equities(conn, symbols, start)
+            load_dim_symbol(conn, symbols)
+        elif source == "fx":
+            load_fx(conn, start)
         else:
-            write_df(conn, spy_df, table="FACT_BENCHMARK", schema="PORTFOLIO.RAW")
-            max_date = spy_df["DATE"].max().strftime("%Y-%m-%d")
-            update_last_loaded_date(conn, "spy", max_date)
-            log(f"Equities loaded through {max_date}")
+            load_spy(conn, start)
+
+    cache = default_cache()
+    if cache is not None:
+        log(f"Alpha Vantage response cache: {cache.stats()}")
+
+
+def run_incremental():
+    load_dotenv()
+    for kwargs in source_tasks():
+        load_source(**kwargs)
 
 
 def main():
@@ -1,14 +1,43 @@
+import collections
+import csv
+import itertools
+import json
 import os
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import Optional
 
+import numpy as np
 import pandas as pd
 from dotenv import load_dotenv
 
-from ..load.snowflake_loader import sf_conn, write_df
+from ..load.delta import RowHashIndex, file_fingerprint, row_hashes
+from ..load.snowflake_loader import merge_stage_into_target, sf_conn, write_df
+from ..utils.instrument import peak_rss_mb, span, task_span
+from ..utils.io import raw_dir
 from ..utils.logging import log
 
 CSV_PATH = "data/raw/portfolio_transactions.csv"
 STAGE_TABLE = "PORTFOLIO.RAW.PORTFOLIO_TRANSACTIONS_STAGE"
 TARGET_TABLE = "PORTFOLIO.RAW.PORTFOLIO_TRANSACTIONS"
+COLUMNS = [
+    "transaction_id",
+    "portfolio_id",
+    "symbol",
+    "quantity_delta",
+    "transaction_date",
+    "transaction_type",
+]
+# Compact in-memory types: the id columns repeat heavily, so categoricals keep a
+# chunk at a fraction of the object-dtype size
+DTYPES = {
+    "transaction_id": "string",
+    "portfolio_id": "category",
+    "symbol": "category",
+    "quantity_delta": "float64",
+    "transaction_type": "category",
+}
 
 
 def _ensure_stage_table(cur):
@@ -27,21 +56,9 @@ def _ensure_stage_table(cur):
 
 
 def _merge_stage_into_target(cur):
-    sql = f"""
-    MERGE INTO {TARGET_TABLE} t
-    USING {STAGE_TABLE} s
-    ON t.TRANSACTION_ID = s.TRANSACTION_ID
-    WHEN MATCHED THEN UPDATE SET
-        PORTFOLIO_ID = s.PORTFOLIO_ID,
-        SYMBOL = s.SYMBOL,
-        QUANTITY_DELTA = s.QUANTITY_DELTA ,
-        TRANSACTION_DATE = s.TRANSACTION_DATE,
-        TRANSACTION_TYPE = s.TRANSACTION_TYPE
-    WHEN NOT MATCHED THEN INSERT (TRANSACTION_ID,PORTFOLIO_ID ,SYMBOL ,QUANTITY_DELTA,TRANSACTION_DATE ,TRANSACTION_TYPE)
-    VALUES ( s.TRANSACTION_ID,s.PORTFOLIO_ID,s.SYMBOL,s.QUANTITY_DELTA ,s.TRANSACTION_DATE,s.TRANSACTION_TYPE)
-    """
-
-    cur.execute(sql)
+    merge_stage_into_target(
+        cur, STAGE_TABLE, TARGET_TABLE, keys=["transaction_id"], columns=COLUMNS
+    )
 
 
 def _truncate_stage(cur):
@@ -53,34 +70,211 @@ def _verify_truncate(cur):
     print(f"Stage row count after truncate: {result}")
 
 
+def _stage_row_count(cur) -> int:
+    return int(cur.execute(f"SELECT COUNT(*) FROM {STAGE_TABLE}").fetchone()[0])
+
+
+def finish_load(cur, index: Optional[RowHashIndex], fingerprint: dict) -> int:
+    """
+    MERGE whatever the stage holds into the target, then commit the row index and
+    drop the checkpoint. The stage is counted rather than trusting this attempt's
+    uploads: a resumed run may have nothing left to stage while chunks from the
+    interrupted attempt still wait there. The index is only committed once the
+    MERGE has succeeded. Returns the stage row count.
+    """
+    staged = _stage_row_count(cur)
+    if staged:
+        with span("load.merge_stage"):
+            _merge_stage_into_target(cur)
+    if index is not None:
+        index.commit(fingerprint)
+    _checkpoint_path().unlink(missing_ok=True)
+    return staged
+
+
+def _checkpoint_path() -> Path:
+    return raw_dir() / "transactions_load.json"
+
+
+def _file_id(path: str) -> dict:
+    st = os.stat(path)
+    return {"path": str(Path(path).resolve()), "size": st.st_size, "mtime": st.st_mtime}
+
+
+def _read_checkpoint(file_id: dict, chunk_rows: int) -> int:
+    """Chunks already staged by an interrupted load of this same file, else 0."""
+    try:
+        state = json.loads(_checkpoint_path().read_text())
+    except (OSError, ValueError):
+        return 0
+    if state.get("file") != file_id or state.get("chunk_rows") != chunk_rows:
+        return 0
+    return int(state.get("chunks_done", 0))
+
+
+def _write_checkpoint(file_id: dict, chunk_rows: int, chunks_done: int):
+    path = _checkpoint_path()
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(
+        json.dumps(
+            {"file": file_id, "chunk_rows": chunk_rows, "chunks_done": chunks_done}
+        )
+    )
+    tmp.replace(path)
+
+
+def read_chunks(path: str, chunk_rows: int, skip_chunks: int = 0):
+    """Yield (first_line, chunk) with explicit dtypes; earlier chunks are skipped unparsed."""
+    header = pd.read_csv(path, nrows=0).columns
+    missing = set(COLUMNS) - set(header)
+    if missing:
+        raise ValueError(f"Missing columns in CSV: {missing}")
+    skip = skip_chunks * chunk_rows
+    with open(path, newline="", encoding="utf-8") as f:
+        # Stream past the header and the chunks already staged, counting CSV records
+        # rather than lines (a quoted field may span lines); pandas' skiprows (int or
+        # range) holds every skipped row number in a set
+        collections.deque(itertools.islice(csv.reader(f), skip + 1), maxlen=0)
+        reader = pd.read_csv(
+            f,
+            header=None,
+            names=list(header),
+            usecols=COLUMNS,
+            dtype=DTYPES,
+            parse_dates=["transaction_date"],
+            chunksize=chunk_rows,
+        )
+        line = skip + 2  # 1-based record number of the chunk's first row, header first
+        with reader:
+            for chunk in reader:
+                yield line, chunk
+                line += len(chunk)
+
+
+def validate_chunk(df: pd.DataFrame, first_line: int) -> pd.DataFrame:
+    """Raise ValueError naming the first bad CSV line; return the chunk with parsed dates."""
+    dates = pd.to_datetime(df["transaction_date"], errors="coerce")
+    problems = {
+        "missing transaction_id, portfolio_id or symbol": df[
+            ["transaction_id", "portfolio_id", "symbol"]
+        ]
+        .isna()
+        .any(axis=1),
+        "unparseable transaction_date": dates.isna(),
+        "missing or infinite quantity_delta": ~np.isfinite(df["quantity_delta"]),
+    }
+    for problem, bad in problems.items():
+        if bad.any():
+            pos = int(bad.to_numpy().argmax())
+            raise ValueError(f"{problem} at CSV line {first_line + pos}")
+    return df.assign(transaction_date=dates)
+
+
+def stream_csv(
+    path: str,
+    upload: Callable[[pd.DataFrame], None],
+    chunk_rows: int,
+    resume: bool = True,
+    on_fresh_start: Optional[Callable[[], None]] = None,
+    index: Optional[RowHashIndex] = None,
+) -> dict:
+    """
+    Read, validate and upload `path` one chunk at a time. After each uploaded chunk
+    a local checkpoint records progress, so a retry of the same file resumes after
+    the last completed chunk; `on_fresh_start` runs (e.g. to empty the stage) only
+    when there is nothing to resume. With an `index`, only rows that are new or
+    changed since the indexed load are uploaded, and every row's hashes are kept
+    as pending for `index.commit`.
+    Returns rows read and staged, seconds, rows/sec and peak RSS.
+    """
+    file_id = _file_id(path)
+    done = _read_checkpoint(file_id, chunk_rows) if resume else 0
+    if done:
+        log(f"Resuming {path} after chunk {done} ({done * chunk_rows} rows staged)")
+    else:
+        if index is not None:
+            index.reset_pending()
+        if on_fresh_start is not None:
+            on_fresh_start()
+
+    rows, staged, t0 = 0, 0, time.perf_counter()
+    for first_line, chunk in read_chunks(path, chunk_rows, skip_chunks=done):
+        rows += len(chunk)
+        chunk = validate_chunk(chunk, first_line)
+        if index is not None:
+            keys, hashes = row_hashes(chunk, "transaction_id", COLUMNS)
+            chunk = chunk[index.changed(keys, hashes)]
+        if len(chunk):
+            # DATE, not the TIMESTAMP_NTZ write_pandas infers from datetime64
+            upload(chunk.assign(transaction_date=chunk["transaction_date"].dt.date))
+            staged += len(chunk)
+        if index is not None:
+            index.add_pending(done, keys, hashes)
+        done += 1
+        _write_checkpoint(file_id, chunk_rows, done)
+        elapsed = time.perf_counter() - t0
+        log(
+            f"[CSV] chunk {done}: {rows} rows read, {staged} staged, "
+            f"{rows / elapsed:,.0f} rows/s, peak RSS {peak_rss_mb():.0f} MB"
+        )
+
+    elapsed = time.perf_counter() - t0
+    return {
+        "rows": rows,
+        "staged": staged,
+        "chunks": done,
+        "seconds": round(elapsed, 3),
+        "rows_per_sec": round(rows / elapsed) if elapsed else 0,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+@task_span("load_transactions_csv")
 def main():
     load_dotenv()
     if not os.path.exists(CSV_PATH):
         raise FileNotFoundError(f"CSV not found: {CSV_PATH}")
+    chunk_rows = int(os.getenv("TRANSACTIONS_CHUNK_ROWS", "250000"))
+    index = RowHashIndex(raw_dir() / "transactions_index")
+    fingerprint = file_fingerprint(CSV_PATH, previous=index.fingerprint)
+    if os.getenv("TRANSACTIONS_DELTA", "1") == "0":
+        # Stage every row, and rebuild the index from this load
+        index.clear()
+    elif index.unchanged(fingerprint):
+        log(f"{CSV_PATH} unchanged since the last load; skipping")
+        return
+
     with sf_conn() as conn:
         cur = conn.cursor()
 
         _ensure_stage_table(cur)
 
-        df = pd.read_csv(CSV_PATH)
-        # basic validation
-        required = {
-            "transaction_id",
-            "portfolio_id",
-            "symbol",
-            "quantity_delta",
-            "transaction_date",
-            "transaction_type",
-        }
-        missing = required - set(df.columns)
-        if missing:
-            raise ValueError(f"Missing columns in CSV: {missing}")
-
-        _truncate_stage(cur)
-        _verify_truncate(cur)
-        write_df(conn, df, table="PORTFOLIO_TRANSACTIONS_STAGE", schema="RAW")
-        _merge_stage_into_target(cur)
-        log(f"Loaded {len(df)} transactions from {CSV_PATH}")
+        def fresh_start():
+            _truncate_stage(cur)
+            _verify_truncate(cur)
+
+        with span("extract.csv", path=CSV_PATH) as s:
+            stats = stream_csv(
+                CSV_PATH,
+                upload=lambda chunk: write_df(
+                    conn, chunk, table="PORTFOLIO_TRANSACTIONS_STAGE", schema="RAW"
+                ),
+                chunk_rows=chunk_rows,
+                on_fresh_start=fresh_start,
+                index=index,
+            )
+            s.add(
+                rows_in=stats["rows"],
+                rows_out=stats["staged"],
+                bytes=os.path.getsize(CSV_PATH),
+            )
+        merged = finish_load(cur, index, fingerprint)
+        log(
+            f"Merged {merged} new or changed transactions from {CSV_PATH} "
+            f"({stats['staged']} of {stats['rows']} rows staged by this attempt, "
+            f"{stats['chunks']} chunks, {stats['rows_per_sec']:,} rows/s, "
+            f"peak RSS {stats['peak_rss_mb']} MB)"
+        )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,177 @@
+import os
+from typing import Optional
+
+import pandas as pd
+from dotenv import load_dotenv
+
+from ..load.snowflake_loader import sf_conn, upsert_df
+from ..transform.portfolio_metrics import VOL_WINDOW, compute_portfolio_metrics
+from ..utils.instrument import task_span
+from ..utils.last_loaded_metadata import (
+    get_last_loaded_date,
+    update_last_loaded_date,
+)
+from ..utils.logging import log
+
+RUN_START_SQL = "SELECT CURRENT_TIMESTAMP()::TIMESTAMP_NTZ"
+STATE_SQL = """
+    SELECT PORTFOLIO_ID, LOADED_THROUGH
+    FROM PORTFOLIO.ANALYTICS.PORTFOLIO_METRICS_STATE
+"""
+# Each portfolio's earliest date whose inputs were loaded after its state: prices
+# (re)written by FACT_PRICES builds, e.g. a symbol whose load failed arriving days
+# late, and position rows (new portfolios, rebuilt positions after back-dated
+# transactions). The first two parameters bound the scan to what was loaded since
+# the oldest state, the last two to the run start. Portfolios without state count
+# as new.
+CHANGED_CTE = """
+    WITH state AS (
+        SELECT PORTFOLIO_ID, LOADED_THROUGH
+        FROM PORTFOLIO.ANALYTICS.PORTFOLIO_METRICS_STATE
+    ),
+    changes AS (
+        SELECT pos.PORTFOLIO_ID, pos.DATE
+        FROM PORTFOLIO.ANALYTICS.FACT_PRICES fp
+        JOIN PORTFOLIO.ANALYTICS.PORTFOLIO_POSITIONS_DAILY pos
+          ON fp.SYMBOL = pos.SYMBOL
+         AND fp.DATE = pos.DATE
+        LEFT JOIN state s
+          ON s.PORTFOLIO_ID = pos.PORTFOLIO_ID
+        WHERE fp._LOADED_AT > %s AND fp._LOADED_AT <= %s
+          AND (s.LOADED_THROUGH IS NULL OR fp._LOADED_AT > s.LOADED_THROUGH)
+        UNION ALL
+        SELECT pos.PORTFOLIO_ID, pos.DATE
+        FROM PORTFOLIO.ANALYTICS.PORTFOLIO_POSITIONS_DAILY pos
+        LEFT JOIN state s
+          ON s.PORTFOLIO_ID = pos.PORTFOLIO_ID
+        WHERE pos._CREATED_AT > %s AND pos._CREATED_AT <= %s
+          AND (s.LOADED_THROUGH IS NULL OR pos._CREATED_AT > s.LOADED_THROUGH)
+    ),
+    changed AS (
+        SELECT PORTFOLIO_ID, MIN(DATE) AS CHANGED_FROM
+        FROM changes
+        GROUP BY PORTFOLIO_ID
+    )
+"""
+# Daily portfolio value and value-weighted return
+DAILY_SELECT = """
+    SELECT
+        pos.PORTFOLIO_ID,
+        fp.DATE,
+        SUM(fp.CLOSE_GBP * pos.QUANTITY) AS TOTAL_VALUE_GBP,
+        SUM(fp.DAILY_RETURN * fp.CLOSE_GBP * pos.QUANTITY)
+            / NULLIF(SUM(fp.CLOSE_GBP * pos.QUANTITY), 0) AS WEIGHTED_DAILY_RETURN
+    FROM PORTFOLIO.ANALYTICS.FACT_PRICES fp
+    JOIN PORTFOLIO.ANALYTICS.PORTFOLIO_POSITIONS_DAILY pos
+      ON fp.SYMBOL = pos.SYMBOL
+     AND fp.DATE = pos.DATE
+"""
+FULL_DAILY_SQL = f"""{DAILY_SELECT}
+    GROUP BY pos.PORTFOLIO_ID, fp.DATE
+"""
+# Only changed portfolios, from their earliest changed date; the scalar bound lets
+# the scan prune FACT_PRICES micro-partitions before the join
+DAILY_SQL = f"""{CHANGED_CTE}{DAILY_SELECT}
+    JOIN changed c
+      ON c.PORTFOLIO_ID = pos.PORTFOLIO_ID
+     AND fp.DATE >= c.CHANGED_FROM
+    WHERE fp.DATE >= (SELECT MIN(CHANGED_FROM) FROM changed)
+    GROUP BY pos.PORTFOLIO_ID, fp.DATE
+"""
+# Look-back for the rolling windows: the materialized rows before each changed date
+CONTEXT_SQL = f"""{CHANGED_CTE}
+    SELECT f.PORTFOLIO_ID, f.DATE, f.TOTAL_VALUE_GBP, f.WEIGHTED_DAILY_RETURN
+    FROM PORTFOLIO.ANALYTICS.FACT_PORTFOLIO_DAILY f
+    JOIN changed c
+      ON c.PORTFOLIO_ID = f.PORTFOLIO_ID
+     AND f.DATE < c.CHANGED_FROM
+    QUALIFY ROW_NUMBER() OVER (PARTITION BY f.PORTFOLIO_ID ORDER BY f.DATE DESC) < {VOL_WINDOW}
+"""
+
+
+def _inputs(cur, since, until):
+    """
+    (daily, context) for compute_portfolio_metrics: every date when `since` is None,
+    else the changed portfolios' rows loaded in (since, until] plus their look-back.
+    """
+    if since is None:
+        return cur.execute(FULL_DAILY_SQL).fetch_pandas_all(), None
+    params = (since, until, since, until)
+    daily = cur.execute(DAILY_SQL, params).fetch_pandas_all()
+    if len(daily) == 0:
+        return daily, None
+    return daily, cur.execute(CONTEXT_SQL, params).fetch_pandas_all()
+
+
+def _next_state(state: pd.DataFrame, daily: pd.DataFrame, until) -> pd.DataFrame:
+    """All known and newly built portfolios are now current through `until`."""
+    ids = pd.concat([state["PORTFOLIO_ID"], daily["PORTFOLIO_ID"]]).unique()
+    return pd.DataFrame({"PORTFOLIO_ID": ids, "LOADED_THROUGH": str(until)})
+
+
+def build_portfolio_metrics(full_rebuild: Optional[bool] = None):
+    """
+    Recompute FACT_PORTFOLIO_DAILY from each portfolio's earliest changed date: prices
+    and positions loaded since PORTFOLIO_METRICS_STATE are aggregated in Snowflake,
+    then rolling volatility and 30-day VaR are computed locally with the previous
+    rows as context. Late prices, new portfolios and rebuilt positions are picked up
+    below the latest date already built.
+    `full_rebuild` (env PORTFOLIO_METRICS_FULL_REBUILD=1) recomputes all dates; so
+    does a run without state.
+    """
+    load_dotenv()
+    if full_rebuild is None:
+        full_rebuild = os.getenv("PORTFOLIO_METRICS_FULL_REBUILD", "0") == "1"
+
+    with sf_conn() as conn:
+        cur = conn.cursor()
+        until = cur.execute(RUN_START_SQL).fetchone()[0]
+        state = cur.execute(STATE_SQL).fetch_pandas_all()
+        since = None
+        if not full_rebuild and len(state):
+            since = state["LOADED_THROUGH"].min()
+        log(f"Portfolio metrics inputs loaded after: {since}")
+
+        daily, context = _inputs(cur, since, until)
+        if len(daily):
+            metrics = compute_portfolio_metrics(daily, context)
+            upsert_df(
+                conn,
+                metrics,
+                table="FACT_PORTFOLIO_DAILY",
+                keys=["PORTFOLIO_ID", "DATE"],
+                schema="PORTFOLIO.ANALYTICS",
+            )
+        upsert_df(
+            conn,
+            _next_state(state, daily, until),
+            table="PORTFOLIO_METRICS_STATE",
+            keys=["PORTFOLIO_ID"],
+            schema="PORTFOLIO.ANALYTICS",
+        )
+        if len(daily) == 0:
+            log("No changed portfolio dates to load.")
+            return
+
+        # Kept as the latest date built (and as an API cache version bump);
+        # recomputing earlier dates must not move it back
+        watermark = get_last_loaded_date(conn, "portfolio_metrics")
+        max_date = str(metrics["DATE"].max())
+        if watermark and since is not None:
+            max_date = max(max_date, watermark)
+        update_last_loaded_date(conn, "portfolio_metrics", max_date)
+        log(
+            f"Portfolio metrics: {metrics['PORTFOLIO_ID'].nunique()} portfolios "
+            f"recomputed through {max_date} ({len(metrics)} rows)"
+        )
+
+
+@task_span("build_portfolio_metrics")
+def main():
+    log("Starting portfolio metrics job")
+    build_portfolio_metrics()
+    log("Portfolio metrics job completed")
+
+
+if __name__ == "__main__":
+    main()
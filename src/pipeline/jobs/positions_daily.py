@@ -0,0 +1,129 @@
+import os
+from typing import Optional
+
+import pandas as pd
+from dotenv import load_dotenv
+
+from ..load.snowflake_loader import sf_conn, upsert_df, write_df
+from ..transform.positions import RUN_COLUMNS, expand_daily, position_runs
+from ..utils.instrument import task_span
+from ..utils.last_loaded_metadata import (
+    get_last_loaded_date,
+    update_last_loaded_date,
+)
+from ..utils.logging import log
+
+SCHEMA = "PORTFOLIO.ANALYTICS"
+TRANSACTIONS_SQL = """
+    SELECT PORTFOLIO_ID, SYMBOL, TRANSACTION_DATE, QUANTITY_DELTA
+    FROM PORTFOLIO.RAW.PORTFOLIO_TRANSACTIONS
+    WHERE TRANSACTION_DATE > %s
+      AND TRANSACTION_DATE <= %s
+"""
+OPEN_RUNS_SQL = f"""
+    SELECT {", ".join(RUN_COLUMNS)}
+    FROM PORTFOLIO.ANALYTICS.PORTFOLIO_POSITION_RUNS
+    WHERE VALID_TO IS NULL
+"""
+
+
+def _as_dates(df: pd.DataFrame, columns: list[str]) -> pd.DataFrame:
+    # DATE columns, not the TIMESTAMP_NTZ write_pandas infers from datetime64
+    return df.assign(**{c: pd.to_datetime(df[c]).dt.date for c in columns})
+
+
+def _daily_rows(conn, runs: pd.DataFrame, start, end, full_rebuild: bool) -> int:
+    """Expand runs into PORTFOLIO_POSITIONS_DAILY a month at a time."""
+    loaded = 0
+    for chunk in expand_daily(runs, start, end):
+        chunk = _as_dates(chunk, ["DATE"])
+        if full_rebuild:
+            loaded += write_df(conn, chunk, "PORTFOLIO_POSITIONS_DAILY", schema=SCHEMA)
+        else:
+            upsert_df(
+                conn,
+                chunk,
+                table="PORTFOLIO_POSITIONS_DAILY",
+                keys=["PORTFOLIO_ID", "SYMBOL", "DATE"],
+                schema=SCHEMA,
+            )
+            loaded += len(chunk)
+    return loaded
+
+
+def build_positions_daily(full_rebuild: Optional[bool] = None):
+    """
+    Replay PORTFOLIO_TRANSACTIONS into PORTFOLIO_POSITION_RUNS (one row per stretch
+    of constant non-zero quantity) and expand the new dates into
+    PORTFOLIO_POSITIONS_DAILY. Incremental runs continue the open runs with the
+    transactions after the 'positions_daily' watermark; days with a zero quantity
+    are no longer written. `full_rebuild` (env POSITIONS_FULL_REBUILD=1) replays
+    all transactions and rewrites both tables.
+    """
+    load_dotenv()
+    if full_rebuild is None:
+        full_rebuild = os.getenv("POSITIONS_FULL_REBUILD", "0") == "1"
+
+    with sf_conn() as conn:
+        cur = conn.cursor()
+        today = cur.execute("SELECT CURRENT_DATE()").fetchone()[0]
+        watermark = None
+        if not full_rebuild:
+            watermark = get_last_loaded_date(conn, "positions_daily")
+        full_rebuild = watermark is None
+        log(f"Last positions date: {watermark}")
+
+        tx = cur.execute(
+            TRANSACTIONS_SQL, (watermark or "1900-01-01", today)
+        ).fetch_pandas_all()
+
+        if full_rebuild:
+            if len(tx) == 0:
+                log("No transactions to replay.")
+                return
+            runs = position_runs(tx, as_of=today)
+            start = pd.to_datetime(tx["TRANSACTION_DATE"]).min()
+            cur.execute(f"TRUNCATE TABLE {SCHEMA}.PORTFOLIO_POSITION_RUNS")
+            cur.execute(f"TRUNCATE TABLE {SCHEMA}.PORTFOLIO_POSITIONS_DAILY")
+            write_df(
+                conn,
+                _as_dates(runs, ["VALID_FROM", "VALID_TO"]),
+                "PORTFOLIO_POSITION_RUNS",
+                schema=SCHEMA,
+            )
+            live = runs
+        else:
+            open_runs = cur.execute(OPEN_RUNS_SQL).fetch_pandas_all()
+            touched = pd.MultiIndex.from_frame(tx[["PORTFOLIO_ID", "SYMBOL"]])
+            is_touched = pd.MultiIndex.from_frame(
+                open_runs[["PORTFOLIO_ID", "SYMBOL"]]
+            ).isin(touched)
+            # Only positions with new transactions change; the rest stay open as-is
+            changed = position_runs(tx, opening=open_runs[is_touched], as_of=today)
+            upsert_df(
+                conn,
+                _as_dates(changed, ["VALID_FROM", "VALID_TO"]),
+                table="PORTFOLIO_POSITION_RUNS",
+                keys=["PORTFOLIO_ID", "SYMBOL", "VALID_FROM"],
+                schema=SCHEMA,
+            )
+            live = pd.concat([open_runs[~is_touched], changed], ignore_index=True)
+            start = pd.Timestamp(watermark) + pd.Timedelta(days=1)
+
+        rows = _daily_rows(conn, live, start, today, full_rebuild)
+        update_last_loaded_date(conn, "positions_daily", str(today))
+        log(
+            f"Positions loaded through {today}: {len(live)} runs, "
+            f"{rows} daily rows from {start.date()}"
+        )
+
+
+@task_span("build_positions_daily")
+def main():
+    log("Starting positions job")
+    build_positions_daily()
+    log("Positions job completed")
+
+
+if __name__ == "__main__":
+    main()
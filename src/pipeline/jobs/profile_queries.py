@@ -1,55 +1,109 @@
-from ..load.snowflake_loader import sf_conn
+import os
+
+import pandas as pd
+from dotenv import load_dotenv
+
+from ..load.snowflake_loader import sf_conn, upsert_df
+from ..utils.alerts import send_slack_alert
+from ..utils.instrument import run_id, task_span
 from ..utils.logging import log
+from ..utils.query_profile import (
+    APP,
+    PROFILE_COLUMNS,
+    aggregate_by_task,
+    completed_runs,
+    flag_regressions,
+    new_regressions,
+)
 
+# ACCOUNT_USAGE rather than INFORMATION_SCHEMA: it has partition and spill
+# counters, but lags by up to ~45 minutes, so only runs that finished longer ago
+# than PROFILE_SETTLE_MINUTES are profiled (the current run is picked up next time)
+HISTORY_SQL = """
+    SELECT
+        QUERY_ID, QUERY_TAG, START_TIME, END_TIME,
+        TOTAL_ELAPSED_TIME, EXECUTION_TIME, QUEUED_OVERLOAD_TIME,
+        BYTES_SCANNED, PARTITIONS_SCANNED, PARTITIONS_TOTAL,
+        BYTES_SPILLED_TO_LOCAL_STORAGE, BYTES_SPILLED_TO_REMOTE_STORAGE,
+        ROWS_PRODUCED
+    FROM SNOWFLAKE.ACCOUNT_USAGE.QUERY_HISTORY
+    WHERE START_TIME >= DATEADD('day', -%s, CURRENT_TIMESTAMP())
+      AND QUERY_TAG LIKE %s
+"""
+# Earlier profiles, as the baseline for the trailing medians
+PROFILES_SQL = """
+    SELECT *
+    FROM PORTFOLIO.ANALYTICS.QUERY_PROFILE_HISTORY
+    WHERE RUN_START >= DATEADD('day', -%s, CURRENT_TIMESTAMP())
+"""
 
+
+@task_span("profile_queries")
 def profile_snowflake_queries():
     """
-    Run multiple profiling queries against Snowflake query history
-    and log the results.
+    Aggregate the pipeline's tagged queries from the last PROFILE_LOOKBACK_DAYS
+    into one QUERY_PROFILE_HISTORY row per run and task (elapsed time, bytes and
+    partitions scanned, spill), and flag tasks whose cost grew more than
+    PROFILE_REGRESSION_THRESHOLD times their median over the previous
+    PROFILE_TRAILING_RUNS runs. Only completed earlier runs are profiled, and
+    each regression is alerted once.
     """
-
-    queries = {
-        "recent_queries": """
-            SELECT QUERY_ID, TOTAL_ELAPSED_TIME, ROWS_PRODUCED, BYTES_SCANNED
-            FROM TABLE(INFORMATION_SCHEMA.QUERY_HISTORY(
-                END_TIME_RANGE_START => DATEADD('hour', -1, CURRENT_TIMESTAMP())
-            ))
-            ORDER BY START_TIME DESC
-            LIMIT 20
-        """,
-        "top_expensive": """
-            SELECT
-                QUERY_ID,
-                USER_NAME,
-                WAREHOUSE_NAME,
-                DATABASE_NAME,
-                SCHEMA_NAME,
-                TOTAL_ELAPSED_TIME / 1000 AS ELAPSED_SECONDS,
-                ROWS_PRODUCED,
-                BYTES_SCANNED / 1024 / 1024 / 1024 AS SCANNED_GB,
-                QUERY_TEXT
-            FROM TABLE(INFORMATION_SCHEMA.QUERY_HISTORY(
-                END_TIME_RANGE_START => DATEADD('hour', -1, CURRENT_TIMESTAMP())
-            ))
-            WHERE QUERY_TYPE = 'SELECT'
-            ORDER BY BYTES_SCANNED DESC, ELAPSED_SECONDS DESC
-            LIMIT 10
-        """,
-    }
+    load_dotenv()
+    lookback = int(os.getenv("PROFILE_LOOKBACK_DAYS", "2"))
+    threshold = float(os.getenv("PROFILE_REGRESSION_THRESHOLD", "1.5"))
+    trailing = int(os.getenv("PROFILE_TRAILING_RUNS", "10"))
+    settle = float(os.getenv("PROFILE_SETTLE_MINUTES", "45"))
 
     with sf_conn() as conn:
-        with conn.cursor() as cur:
-            for name, sql in queries.items():
-                cur.execute(sql)
+        cur = conn.cursor()
+        history = cur.execute(
+            HISTORY_SQL, (lookback, f'%"app":"{APP}"%')
+        ).fetch_pandas_all()
+        profile = completed_runs(
+            aggregate_by_task(history), current_run=run_id(), settle_minutes=settle
+        )
+        if len(profile) == 0:
+            log(f"No completed pipeline runs in the last {lookback} days.")
+            return
+        log(f"{len(history)} tagged queries -> {len(profile)} task profiles")
 
-                # Extract column names
-                columns = [desc[0] for desc in cur.description]
-                rows = cur.fetchall()
+        stored = cur.execute(PROFILES_SQL, (lookback + 90,)).fetch_pandas_all()
+        keys = ["RUN_ID", "TASK_ID"]
+        previous = stored
+        if len(stored):
+            fresh = stored.merge(profile[keys], on=keys, how="left", indicator=True)
+            previous = stored[(fresh["_merge"] == "left_only").to_numpy()]
+        combined = pd.concat(
+            [previous.drop(columns=["_PROFILED_AT"], errors="ignore"), profile],
+            ignore_index=True,
+        )
+        flagged = flag_regressions(combined, threshold=threshold, trailing=trailing)
+        flagged = flagged.merge(profile[keys], on=keys)
 
-                # Log results nicely
-                for row in rows:
-                    row_dict = dict(zip(columns, row))
-                    log(" | ".join(f"{col}={val}" for col, val in row_dict.items()))
+        upsert_df(
+            conn,
+            flagged[PROFILE_COLUMNS],
+            table="QUERY_PROFILE_HISTORY",
+            keys=keys,
+            schema="PORTFOLIO.ANALYTICS",
+        )
 
-                if not rows:
-                    log(f" No results for {name}")
+    for row in flagged.sort_values(["RUN_START", "TASK_ID"]).itertuples():
+        log(
+            f"[PROFILE] {row.RUN_ID} {row.TASK_ID:<24} {row.QUERIES:>4} queries "
+            f"{row.ELAPSED_S:>8.1f}s {row.BYTES_SCANNED / 2**30:>7.2f} GB scanned "
+            f"{row.PARTITIONS_SCANNED:.0f}/{row.PARTITIONS_TOTAL:.0f} partitions "
+            f"{row.BYTES_SPILLED / 2**20:.0f} MB spilled"
+            + (f"  <-- {row.REGRESSION}" if pd.notna(row.REGRESSION) else "")
+        )
+    # Runs stay in the lookback window for several days; alert each one once
+    regressed = new_regressions(flagged, stored)
+    if len(regressed):
+        lines = [
+            f"`{r.TASK_ID}` ({r.RUN_ID}): {r.REGRESSION}, elapsed x{r.ELAPSED_RATIO:.1f}"
+            for r in regressed.itertuples()
+        ]
+        send_slack_alert(
+            f"Snowflake cost regressions (>{threshold}x trailing median):\n"
+            + "\n".join(lines)
+        )
@@ -4,10 +4,11 @@ from typing import List
 
 from dotenv import load_dotenv
 
-from ..extract.alpha import fetch_equities, fetch_fx_pair
+from ..extract.alpha import fetch_equities, fetch_fx_pairs
 from ..load.local import write_parquet
 from ..transform.cleaning import clean_equities, clean_fx
-from ..utils.dq import dq_report
+from ..transform.fx import fx_pairs
+from ..utils.dq import DQ_SUITES, dq_report, evaluate_suite, suite_values
 from ..utils.logging import log
 
 
@@ -26,7 +27,7 @@ def main():
     eq_p = write_parquet(eqc, "equity_daily")
 
     log("fetching fx from Alphavantage")
-    fx = fetch_fx_pair()
+    fx = fetch_fx_pairs(fx_pairs(), start)
     fxc = clean_fx(fx)
     fx_p = write_parquet(fxc, "fx_daily")
 
@@ -34,6 +35,10 @@ def main():
         f"DQ equities: {json.dumps(dq_report(eqc, pk_cols=['SYMBOL', 'DATE']), indent=2)}"
     )
     log(f"DQ fx: {json.dumps(dq_report(fxc, pk_cols=['PAIR', 'DATE']), indent=2)}")
+    for table, df in (("EQUITY_DAILY", eqc), ("FX_DAILY", fxc)):
+        suite = DQ_SUITES[f"PORTFOLIO.RAW.{table}"]
+        for r in evaluate_suite(table, suite, suite_values(df, suite)):
+            log(f"DQ {r['rule']}: {r['status']} ({r['value']})")
     log(f"Parquet written: {eq_p} and {fx_p}")
 
 
@@ -0,0 +1,122 @@
+"""
+Change detection for full-file exports that are reloaded on every run.
+
+A file fingerprint (size, mtime, content hash) lets an unchanged file be skipped
+outright. Otherwise each row is hashed and compared with a locally persisted
+index of the last loaded version, so only inserted or changed keys are staged.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from ..utils.logging import log
+
+
+def file_fingerprint(path: str, previous: Optional[dict] = None) -> dict:
+    """
+    Size, mtime and SHA-256 of `path`. When size and mtime match `previous`, its
+    hash is reused instead of reading the file again.
+    """
+    st = os.stat(path)
+    fp = {"size": st.st_size, "mtime": st.st_mtime}
+    if previous and all(previous.get(k) == v for k, v in fp.items()):
+        return {**fp, "sha256": previous.get("sha256")}
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(8 * 1024 * 1024), b""):
+            digest.update(block)
+    return {**fp, "sha256": digest.hexdigest()}
+
+
+def row_hashes(df: pd.DataFrame, key: str, columns: list[str]):
+    """(key hash, row hash) per row, both uint64."""
+    keys = pd.util.hash_pandas_object(df[key], index=False).to_numpy()
+    rows = pd.util.hash_pandas_object(df[columns], index=False).to_numpy()
+    return keys, rows
+
+
+class RowHashIndex:
+    """
+    Key hash -> row hash of the last successfully loaded file, kept as two sorted
+    uint64 arrays (16 bytes per row) under `root`, with that file's fingerprint.
+
+    Hashes of the rows seen by an in-progress load go to per-chunk pending files,
+    so an interrupted load can resume; `commit` swaps them in once the target
+    table has been merged.
+    """
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._pending = self.root / "pending"
+        self._keys = np.empty(0, dtype=np.uint64)
+        self._rows = np.empty(0, dtype=np.uint64)
+        try:
+            with np.load(self.root / "index.npz") as saved:
+                self._keys, self._rows = saved["keys"], saved["rows"]
+        except (OSError, KeyError, ValueError):
+            pass
+
+    def __len__(self):
+        return len(self._keys)
+
+    @property
+    def fingerprint(self) -> Optional[dict]:
+        try:
+            return json.loads((self.root / "fingerprint.json").read_text())
+        except (OSError, ValueError):
+            return None
+
+    def unchanged(self, fingerprint: dict) -> bool:
+        previous = self.fingerprint
+        return bool(previous) and previous.get("sha256") == fingerprint["sha256"]
+
+    def clear(self):
+        """Forget the indexed load (in memory only): every row counts as changed."""
+        self._keys = np.empty(0, dtype=np.uint64)
+        self._rows = np.empty(0, dtype=np.uint64)
+
+    def changed(self, keys: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        """Mask of rows whose key is new or whose content differs from the index."""
+        if len(self._keys) == 0:
+            return np.ones(len(keys), dtype=bool)
+        pos = np.searchsorted(self._keys, keys).clip(max=len(self._keys) - 1)
+        return (self._keys[pos] != keys) | (self._rows[pos] != rows)
+
+    def reset_pending(self):
+        shutil.rmtree(self._pending, ignore_errors=True)
+
+    def add_pending(self, chunk: int, keys: np.ndarray, rows: np.ndarray):
+        self._pending.mkdir(exist_ok=True)
+        tmp = self._pending / f"tmp_{chunk:06d}.npz"
+        np.savez(tmp, keys=keys, rows=rows)
+        tmp.replace(self._pending / f"{chunk:06d}.npz")
+
+    def commit(self, fingerprint: dict):
+        """The pending hashes become the index of the file just loaded."""
+        parts = (
+            sorted(self._pending.glob("[0-9]*.npz")) if self._pending.exists() else []
+        )
+        keys, rows = [], []
+        for part in parts:
+            with np.load(part) as saved:
+                keys.append(saved["keys"])
+                rows.append(saved["rows"])
+        keys = np.concatenate(keys) if keys else np.empty(0, dtype=np.uint64)
+        rows = np.concatenate(rows) if rows else np.empty(0, dtype=np.uint64)
+        order = np.argsort(keys, kind="stable")
+        self._keys, self._rows = keys[order], rows[order]
+
+        tmp = self.root / "index.tmp.npz"
+        np.savez(tmp, keys=self._keys, rows=self._rows)
+        tmp.replace(self.root / "index.npz")
+        (self.root / "fingerprint.json").write_text(json.dumps(fingerprint))
+        self.reset_pending()
+        log(f"[DELTA] index of {len(self._keys)} rows saved to {self.root}")
@@ -0,0 +1,245 @@
+"""
+Read side of the local Parquet lake written by write_partitioned.
+
+    table, stats = scan("equity_daily", symbols=["AAPL"], start="2024-01-01",
+                        columns=["DATE", "CLOSE"])
+    prices = read_prices(["AAPL", "MSFT"], "2024-01-01", "2024-06-30")
+
+Pruning happens in three steps: files whose partition (symbol, date bucket) cannot
+match are skipped using the manifest alone, row groups whose DATE min/max
+statistics fall outside the range are never read, and only the requested
+columns are decoded.
+
+A retried load appends a second copy of its rows until compact_partitions runs,
+so within a partition of several files only the newest row per manifest key is
+returned. Partition columns must be derived from the keys (e.g. SYMBOL, DATE ->
+SYMBOL=/DATE_YEAR=), so copies of a key always share a partition.
+"""
+
+import datetime
+import functools
+import operator
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from ..utils.io import processed_dir
+from .local import GRANULARITIES, read_manifest
+
+
+def _partition(path: str) -> dict:
+    """{'SYMBOL': 'AAPL', 'DATE_YEAR': '2024'} from a hive-style relative path."""
+    return dict(seg.split("=", 1) for seg in Path(path).parent.parts if "=" in seg)
+
+
+def _layout(manifest: dict):
+    """(symbol partition column, date column, date bucket column) of a dataset."""
+    suffix = f"_{manifest['granularity']}"
+    date_part = next(
+        (c for c in manifest["partitioning"] if c.lower().endswith(suffix)), None
+    )
+    date_col = date_part[: -len(suffix)] if date_part else None
+    symbol_col = next((c for c in manifest["partitioning"] if c != date_part), None)
+    return symbol_col, date_col, date_part
+
+
+def _bound(value: pd.Timestamp, type_: pa.DataType):
+    if pa.types.is_date(type_):
+        return pa.scalar(value.date(), type_)
+    return pa.scalar(value.to_pydatetime(), pa.timestamp("us"))
+
+
+def _stat(value) -> pd.Timestamp:
+    if isinstance(value, datetime.date) and not isinstance(value, datetime.datetime):
+        return pd.Timestamp(value)
+    return pd.Timestamp(value).tz_localize(None)
+
+
+def _read_file(path, partition, date_col, start, end, columns):
+    """Row groups of one file overlapping [start, end], only `columns`."""
+    pf = pq.ParquetFile(path)
+    meta = pf.metadata
+    names = pf.schema_arrow.names
+    keep = list(range(meta.num_row_groups))
+    if date_col in names and (start is not None or end is not None):
+        i = names.index(date_col)
+        keep = []
+        for rg in range(meta.num_row_groups):
+            st = meta.row_group(rg).column(i).statistics
+            if st is None or not st.has_min_max:
+                keep.append(rg)
+                continue
+            lo, hi = _stat(st.min), _stat(st.max)
+            if (start is None or hi >= start) and (end is None or lo <= end):
+                keep.append(rg)
+
+    file_cols = [c for c in columns if c in names] if columns else names
+    read_cols = list(
+        dict.fromkeys(file_cols + ([date_col] if date_col in names else []))
+    )
+    table = pf.read_row_groups(keep, columns=read_cols) if keep else None
+    stats = {"row_groups": len(keep), "row_groups_total": meta.num_row_groups}
+    if table is None:
+        return None, stats
+
+    if date_col in names and (start is not None or end is not None):
+        dates = table[date_col]
+        mask = None
+        if start is not None:
+            mask = pc.greater_equal(dates, _bound(start, dates.type))
+        if end is not None:
+            upper = pc.less_equal(dates, _bound(end, dates.type))
+            mask = upper if mask is None else pc.and_(mask, upper)
+        table = table.filter(mask)
+    table = table.select(file_cols)
+    for col, value in partition.items():
+        if columns is None or col in columns:
+            table = table.append_column(
+                col, pa.array([value] * table.num_rows, pa.string())
+            )
+    return table, stats
+
+
+def _latest_rows(table: pa.Table, keys: list[str]) -> pa.Table:
+    """Last row per key, in table order (a partition's files concatenated oldest first)."""
+    rows = pa.array(np.arange(table.num_rows))
+    last = (
+        table.select(keys)
+        .append_column("_row", rows)
+        .group_by(keys, use_threads=False)
+        .aggregate([("_row", "max")])
+    )
+    return table.take(np.sort(last["_row_max"].to_numpy()))
+
+
+def scan(
+    base_name: str,
+    symbols: Optional[Iterable[str]] = None,
+    start=None,
+    end=None,
+    columns: Optional[list[str]] = None,
+    threads: int = 4,
+    root: Optional[Path] = None,
+):
+    """
+    Rows of processed/<base_name> for `symbols` (values of the dataset's non-date
+    partition column, e.g. SYMBOL or pair) with the date column within [start,
+    end], inclusive. `columns=None` reads every column.
+    Returns (pyarrow.Table, stats) where stats counts files and row groups read
+    against the totals, and rows dropped as older copies of a key.
+    """
+    base = Path(root) if root else processed_dir() / base_name
+    start = pd.Timestamp(start) if start is not None else None
+    end = pd.Timestamp(end) if end is not None else None
+    symbols = set(symbols) if symbols is not None else None
+
+    manifest = read_manifest(base)
+    if manifest is None:
+        return _scan_unmanaged(base, symbols, start, end, columns)
+
+    symbol_col, date_col, date_part = _layout(manifest)
+    fmt = GRANULARITIES[manifest["granularity"]]
+    lo = start.strftime(fmt) if start is not None else None
+    hi = end.strftime(fmt) if end is not None else None
+
+    keys = manifest.get("keys") or []
+    # Keys are read even when not requested, to drop older copies of a row
+    read_cols = list(dict.fromkeys(columns + keys)) if columns else None
+
+    files = []
+    by_seq = sorted(manifest["files"].items(), key=lambda f: (f[1].get("seq", 0), f[0]))
+    for name, _ in by_seq:
+        part = _partition(name)
+        if symbols is not None and part.get(symbol_col) not in symbols:
+            continue
+        bucket = part.get(date_part)
+        # Bucket strings (%Y, %Y-%m, %Y-%m-%d) sort like the dates they cover
+        if bucket is not None and (
+            (lo is not None and bucket < lo) or (hi is not None and bucket > hi)
+        ):
+            continue
+        files.append((base / name, {k: v for k, v in part.items() if k != date_part}))
+
+    with ThreadPoolExecutor(max_workers=max(1, threads)) as pool:
+        results = list(
+            pool.map(
+                lambda f: _read_file(f[0], f[1], date_col, start, end, read_cols),
+                files,
+            )
+        )
+    by_partition = {}
+    for (path, _), (t, _) in zip(files, results):
+        if t is not None and t.num_rows:
+            by_partition.setdefault(path.parent, []).append(t)
+    tables, duplicates = [], 0
+    for parts in by_partition.values():
+        t = pa.concat_tables(parts, promote_options="default")
+        if len(parts) > 1 and keys and set(keys) <= set(t.column_names):
+            latest = _latest_rows(t, keys)
+            duplicates += t.num_rows - latest.num_rows
+            t = latest
+        tables.append(t)
+    table = pa.concat_tables(tables, promote_options="default") if tables else None
+    if table is None:
+        table = pa.table({c: pa.array([], pa.null()) for c in columns or []})
+    elif columns:
+        extra = [k for k in keys if k not in columns and k in table.column_names]
+        table = table.drop_columns(extra)
+    stats = {
+        "files": len(files),
+        "files_total": len(manifest["files"]),
+        "row_groups": sum(s["row_groups"] for _, s in results),
+        "row_groups_total": sum(
+            f.get("row_groups", 1) for f in manifest["files"].values()
+        ),
+        "rows": table.num_rows,
+        "duplicates": duplicates,
+    }
+    return table, stats
+
+
+def _scan_unmanaged(base: Path, symbols, start, end, columns):
+    """Datasets without a manifest (or a single Parquet file): pyarrow's own pushdown."""
+    if not base.exists() and base.with_suffix(".parquet").exists():
+        base = base.with_suffix(".parquet")
+    dataset = ds.dataset(base, format="parquet", partitioning="hive")
+    names = dataset.schema.names
+    symbol_col = next(
+        (c for c in ("SYMBOL", "symbol", "PAIR", "pair") if c in names), None
+    )
+    date_col = next((c for c in ("DATE", "date") if c in names), None)
+    conditions = []
+    if symbols is not None and symbol_col:
+        conditions.append(ds.field(symbol_col).isin(list(symbols)))
+    if date_col:
+        date_type = dataset.schema.field(date_col).type
+        if start is not None:
+            conditions.append(ds.field(date_col) >= _bound(start, date_type))
+        if end is not None:
+            conditions.append(ds.field(date_col) <= _bound(end, date_type))
+    expr = functools.reduce(operator.and_, conditions) if conditions else None
+    table = dataset.to_table(columns=columns, filter=expr)
+    files = len(dataset.files)
+    return table, {"files": files, "files_total": files, "rows": table.num_rows}
+
+
+def read_prices(
+    symbols: Optional[Iterable[str]] = None,
+    start=None,
+    end=None,
+    columns: Optional[list[str]] = None,
+    base_name: str = "equity_daily",
+) -> pd.DataFrame:
+    """EQUITY_DAILY bars from the local lake as a DataFrame sorted by SYMBOL, DATE."""
+    table, _ = scan(base_name, symbols, start, end, columns)
+    df = table.to_pandas()
+    order = [c for c in ("SYMBOL", "DATE") if c in df.columns]
+    return df.sort_values(order, ignore_index=True) if order else df
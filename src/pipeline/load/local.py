@@ -1,6 +1,27 @@
+import contextlib
+import datetime
+import fcntl
+import json
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional
+
 import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from pandas.api.types import is_datetime64_any_dtype
 
+from ..utils.instrument import current_span, instrument
 from ..utils.io import processed_dir
+from ..utils.logging import log
+
+# Leading underscore: pyarrow dataset discovery skips it
+MANIFEST = "_manifest.json"
+GRANULARITIES = {"day": "%Y-%m-%d", "month": "%Y-%m", "year": "%Y"}
+ROWS_PER_GROUP = 64 * 1024
 
 
 def write_parquet(df: pd.DataFrame, name: str):
@@ -9,17 +30,253 @@ def write_parquet(df: pd.DataFrame, name: str):
     return path
 
 
-def write_partitioned(df: pd.DataFrame, base_name: str, partition_cols: list[str]):
+def _partition_columns(df: pd.DataFrame, partition_cols: list[str], granularity: str):
+    """Directory keys: date columns bucketed to `granularity`, others as-is."""
+    fmt = GRANULARITIES[granularity]
+    names, derived = [], {}
+    for col in partition_cols:
+        values = df[col]
+        if is_datetime64_any_dtype(values) or (
+            values.dtype == object and isinstance(values.iloc[0], datetime.date)
+        ):
+            name = f"{col}_{granularity}"
+            name = name.upper() if col.isupper() else name
+            # Format each distinct day once; strftime per row dominates otherwise
+            dates = pd.to_datetime(values)
+            days = dates.drop_duplicates()
+            derived[name] = dates.map(dict(zip(days, days.dt.strftime(fmt))))
+            names.append(name)
+        else:
+            names.append(col)
+    return names, derived
+
+
+def read_manifest(base: Path) -> Optional[dict]:
+    try:
+        return json.loads((Path(base) / MANIFEST).read_text())
+    except (OSError, ValueError):
+        return None
+
+
+@contextlib.contextmanager
+def _manifest_lock(base: Path):
+    """
+    Exclusive lock on a dataset's manifest, so parallel loads (e.g. mapped
+    incremental_load tasks on one worker) don't overwrite each other's entries.
+    """
+    with open(base / f"{MANIFEST}.lock", "w") as fh:
+        fcntl.flock(fh, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+def _save_manifest(base: Path, manifest: dict):
+    partitions = {}
+    for name, info in manifest["files"].items():
+        part = partitions.setdefault(
+            str(Path(name).parent), {"files": 0, "rows": 0, "bytes": 0}
+        )
+        part["files"] += 1
+        part["rows"] += info["rows"]
+        part["bytes"] += info["bytes"]
+    manifest["partitions"] = dict(sorted(partitions.items()))
+    manifest["rows"] = sum(p["rows"] for p in partitions.values())
+    manifest["bytes"] = sum(p["bytes"] for p in partitions.values())
+    tmp = base / f"{MANIFEST}.tmp"
+    tmp.write_text(json.dumps(manifest, indent=1, sort_keys=True))
+    tmp.replace(base / MANIFEST)
+
+
+def _write_dataset(
+    table: pa.Table, base: Path, names: list[str], partitions: int, compression: str
+):
+    """Hive-partitioned write; returns {relative path: file stats} of the new files."""
+    written = {}
+
+    def _visit(f):
+        meta = f.metadata
+        written[str(Path(f.path).relative_to(base))] = {
+            "rows": meta.num_rows,
+            "bytes": f.size,
+            "row_groups": meta.num_row_groups,
+        }
+
+    fmt = ds.ParquetFileFormat()
+    ds.write_dataset(
+        table,
+        base,
+        format=fmt,
+        file_options=fmt.make_write_options(
+            compression=compression,
+            coerce_timestamps="us",
+            allow_truncated_timestamps=True,
+        ),
+        partitioning=names,
+        partitioning_flavor="hive",
+        # A new name per call: existing partition files are never rewritten
+        basename_template=f"part-{uuid.uuid4().hex[:12]}-{{i}}.parquet",
+        existing_data_behavior="overwrite_or_ignore",
+        # Rows arrive sorted by partition: keep every partition's file open until
+        # the end instead of closing and reopening files past pyarrow's defaults
+        max_partitions=max(1024, partitions),
+        max_open_files=max(1024, partitions),
+        max_rows_per_group=ROWS_PER_GROUP,
+        use_threads=True,
+        file_visitor=_visit,
+    )
+    return written
+
+
+@instrument("lake.write")
+def write_partitioned(
+    df: pd.DataFrame,
+    base_name: str,
+    partition_cols: list[str],
+    granularity: Optional[str] = None,
+    keys: Optional[list[str]] = None,
+    compression: str = "zstd",
+) -> Path:
     """
-    Write DataFrame to a partitioned directory tree based on partition_cols.
+    Append df to a hive-partitioned Parquet dataset under processed/<base_name>.
+
+    Date columns in partition_cols are bucketed to `granularity` ("day", "month"
+    or "year"; env LAKE_PARTITION_GRANULARITY, default year), e.g.
+    SYMBOL=AAPL/DATE_YEAR=2024/, so a symbol's history is a few files rather
+    than one per day. Each call adds new files next to the existing ones; partitions
+    are written in parallel by pyarrow. `keys` is recorded in the manifest so
+    compact_partitions can drop rows re-written by retried loads.
+    _manifest.json lists every file with its rows and bytes, plus per-partition totals.
     """
+    granularity = granularity or os.getenv("LAKE_PARTITION_GRANULARITY", "year")
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"Unknown partition granularity: {granularity}")
     base = processed_dir() / base_name
-    # combo, group : (key, sub-DataFrame) , combo: ("AAPL", 2024)
-    # combo is tuple of values for the partition columns
-    for combo, group in df.groupby(partition_cols):
-        parts = [f"{col}={val}" for col, val in zip(partition_cols, combo)]
-        path = base.joinpath(*parts)
-        path.mkdir(parents=True, exist_ok=True)
-        filename = f"{base_name}.parquet"
-        group.to_parquet(path / filename, index=False)
+    base.mkdir(parents=True, exist_ok=True)
+    if len(df) == 0:
+        return base
+
+    names, derived = _partition_columns(df, partition_cols, granularity)
+    with _manifest_lock(base):
+        manifest = read_manifest(base) or {
+            "partitioning": names,
+            "granularity": granularity,
+            "keys": keys or [],
+            "files": {},
+            "seq": 0,
+        }
+        if manifest["partitioning"] != names:
+            raise ValueError(
+                f"{base} is partitioned by {manifest['partitioning']}, not {names}"
+            )
+
+        df = df.assign(**derived).sort_values(partition_cols, kind="stable")
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        partitions = len(df[names].drop_duplicates())
+        written = _write_dataset(table, base, names, partitions, compression)
+
+        manifest["seq"] += 1
+        for info in written.values():
+            info["seq"] = manifest["seq"]
+        manifest["files"].update(written)
+        _save_manifest(base, manifest)
+    nbytes = sum(f["bytes"] for f in written.values())
+    current_span().add(rows_out=len(df), bytes=nbytes)
+    log(
+        f"[LAKE] {len(df)} rows into {len(written)} files under {base} ({nbytes} bytes)"
+    )
     return base
+
+
+@instrument("lake.compact")
+def compact_partitions(base_name: str, min_files: int = 8, compression: str = "zstd"):
+    """
+    Rewrite partitions that have accumulated `min_files` or more appended files as
+    one file each, keeping the latest row per manifest key. Returns the partitions
+    compacted.
+    """
+    base = processed_dir() / base_name
+    if not base.exists():
+        return []
+    with _manifest_lock(base):
+        manifest = read_manifest(base)
+        if manifest is None:
+            return []
+        by_partition = {}
+        for name, info in manifest["files"].items():
+            by_partition.setdefault(str(Path(name).parent), []).append(
+                (info["seq"], name)
+            )
+
+        compacted = []
+        for part, files in sorted(by_partition.items()):
+            if len(files) < min_files:
+                continue
+            names = [name for _, name in sorted(files)]
+            df = pd.concat(
+                [pq.read_table(base / n).to_pandas() for n in names], ignore_index=True
+            )
+            # Partition columns live in the path, so a key may be absent from the files
+            keys = [k for k in manifest["keys"] if k in df.columns]
+            if keys:
+                df = df.drop_duplicates(subset=keys, keep="last")
+            out = base / part / f"part-{uuid.uuid4().hex[:12]}-c.parquet"
+            pq.write_table(
+                pa.Table.from_pandas(df, preserve_index=False),
+                out,
+                compression=compression,
+                row_group_size=ROWS_PER_GROUP,
+                coerce_timestamps="us",
+                allow_truncated_timestamps=True,
+            )
+            for n in names:
+                del manifest["files"][n]
+            meta = pq.read_metadata(out)
+            manifest["files"][str(out.relative_to(base))] = {
+                "rows": meta.num_rows,
+                "bytes": out.stat().st_size,
+                "row_groups": meta.num_row_groups,
+                "seq": max(seq for seq, _ in files),
+            }
+            # Readers go through the manifest, so the old files can go once it is saved
+            _save_manifest(base, manifest)
+            for n in names:
+                (base / n).unlink(missing_ok=True)
+            compacted.append(part)
+        if compacted:
+            log(f"[LAKE] compacted {len(compacted)} partitions under {base}")
+        return compacted
+
+
+def write_parquet_files(
+    df: pd.DataFrame,
+    out_dir: Path,
+    rows_per_file: int,
+    threads: int = 4,
+    compression: str = "zstd",
+    prefix: str = "part",
+) -> list[Path]:
+    """
+    Split df into compressed Parquet files of at most rows_per_file rows,
+    written concurrently (pyarrow releases the GIL while encoding).
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    rows_per_file = max(1, int(rows_per_file))
+    starts = range(0, max(len(df), 1), rows_per_file)
+
+    def _write(i, start):
+        chunk = df.iloc[start : start + rows_per_file]
+        path = out_dir / f"{prefix}_{i:05d}.parquet"
+        pq.write_table(
+            pa.Table.from_pandas(chunk, preserve_index=False),
+            path,
+            compression=compression,
+            coerce_timestamps="us",  # Snowflake reads ns timestamps as NUMBER
+            allow_truncated_timestamps=True,
+        )
+        return path
+
+    with ThreadPoolExecutor(max_workers=max(1, threads)) as pool:
+        return list(pool.map(_write, range(len(starts)), starts))
@@ -1,16 +1,28 @@
 import os
+import tempfile
+import time
+import uuid
+from pathlib import Path
+from typing import Optional
 
 import pandas as pd
 import snowflake.connector
 from dotenv import load_dotenv
 from snowflake.connector.pandas_tools import write_pandas
 
+from ..utils.instrument import span, task_name
 from ..utils.logging import log
+from ..utils.query_profile import query_tag
+from .local import write_parquet_files
 
 load_dotenv("/opt/airflow/.env")
 
 
-def sf_conn():
+def sf_conn(task: Optional[str] = None):
+    """
+    Pipeline connection. Its queries carry a QUERY_TAG with the dag, task (Airflow's,
+    else `task` or the running task span) and run id, for profile_queries.
+    """
     return snowflake.connector.connect(
         user=os.getenv("SNOWFLAKE_USER"),
         password=os.getenv("SNOWFLAKE_PASSWORD"),
@@ -19,21 +31,160 @@ def sf_conn():
         database=os.getenv("SNOWFLAKE_DATABASE", "PORTFOLIO"),
         schema=os.getenv("SNOWFLAKE_SCHEMA_RAW", "RAW"),
         role=os.getenv("SNOWFLAKE_ROLE", "ACCOUNTADMIN"),
+        session_parameters={"QUERY_TAG": query_tag(task or task_name())},
     )
 
 
-def write_df(conn, df: pd.DataFrame, table: str, schema: str = "PORTFOLIO.RAW") -> int:
+def write_df(
+    conn, df: pd.DataFrame, table: str, schema: str = "PORTFOLIO.RAW", mode=None
+) -> int:
     """
     Load a Pandas DataFrame into a Snowflake table.
+    mode (env SNOWFLAKE_LOAD_MODE): "write_pandas" (default) or "copy" for write_df_bulk.
+    """
+    mode = mode or os.getenv("SNOWFLAKE_LOAD_MODE", "write_pandas")
+    with span("load.write_df", table=f"{schema}.{table}", mode=mode) as s:
+        s.add(rows_in=len(df), bytes=df.memory_usage(index=False, deep=True).sum())
+        if mode == "copy":
+            nrows = write_df_bulk(conn, df, table=table, schema=schema)["rows"]
+        else:
+            success, nchunks, nrows, _ = write_pandas(
+                conn,
+                df,
+                table_name=table,
+                schema=schema,
+                quote_identifiers=False,  # use uppercase cols without quotes
+            )
+            log(f"[LOAD] {nrows} rows into {schema}.{table} (success={success})")
+        s.add(rows_out=nrows)
+    return nrows
+
+
+def _rows_per_file(df: pd.DataFrame, file_mb: float) -> int:
+    # In-memory size is a conservative upper bound for the compressed file size
+    bytes_per_row = max(
+        1, df.memory_usage(index=False, deep=True).sum() // max(len(df), 1)
+    )
+    return max(1, int(file_mb * 1024 * 1024 // bytes_per_row))
+
+
+def _copy_rows_loaded(cur) -> int:
+    cols = [d[0].lower() for d in cur.description or []]
+    rows = cur.fetchall()
+    if "rows_loaded" not in cols:
+        return 0
+    i = cols.index("rows_loaded")
+    return sum(int(r[i] or 0) for r in rows)
+
+
+def write_df_bulk(
+    conn,
+    df: pd.DataFrame,
+    table: str,
+    schema: str = "PORTFOLIO.RAW",
+    file_mb: Optional[float] = None,
+    threads: Optional[int] = None,
+) -> dict:
+    """
+    Bulk-load a DataFrame: compressed Parquet files written locally in parallel,
+    one PUT to the table stage (PARALLEL=threads) and a single COPY INTO.
 
+    file_mb (env SNOWFLAKE_BULK_FILE_MB) caps the uncompressed data per file and
+    threads (env SNOWFLAKE_BULK_THREADS) drives both file writing and the upload.
+    Returns per-table stats: rows, files, bytes and seconds per phase.
     """
+    file_mb = file_mb or float(os.getenv("SNOWFLAKE_BULK_FILE_MB", "128"))
+    threads = threads or int(os.getenv("SNOWFLAKE_BULK_THREADS", "4"))
+    stage = f"@{schema}.%{table}/bulk_{uuid.uuid4().hex}"
+    stats = {"table": f"{schema}.{table}", "rows": 0, "files": 0, "bytes": 0}
+    if len(df) == 0:
+        return stats
 
-    success, nchunks, nrows, _ = write_pandas(
-        conn,
-        df,
-        table_name=table,
-        schema=schema,
-        quote_identifiers=False,  # use uppercase cols without quotes
+    cur = conn.cursor()
+    with tempfile.TemporaryDirectory(prefix=f"{table.lower()}_") as tmp:
+        t0 = time.perf_counter()
+        files = write_parquet_files(df, Path(tmp), _rows_per_file(df, file_mb), threads)
+        t1 = time.perf_counter()
+        cur.execute(
+            f"PUT 'file://{Path(tmp).as_posix()}/*.parquet' {stage} "
+            f"AUTO_COMPRESS=FALSE PARALLEL={threads} OVERWRITE=TRUE"
+        )
+        t2 = time.perf_counter()
+        cur.execute(
+            f"COPY INTO {schema}.{table} FROM {stage}/ "
+            "FILE_FORMAT=(TYPE=PARQUET) MATCH_BY_COLUMN_NAME=CASE_INSENSITIVE PURGE=TRUE"
+        )
+        rows = _copy_rows_loaded(cur)
+        t3 = time.perf_counter()
+        stats.update(
+            rows=rows,
+            files=len(files),
+            bytes=sum(p.stat().st_size for p in files),
+            write_s=round(t1 - t0, 3),
+            put_s=round(t2 - t1, 3),
+            copy_s=round(t3 - t2, 3),
+        )
+
+    log(
+        f"[LOAD] {stats['rows']} rows into {schema}.{table} via COPY "
+        f"({stats['files']} files, {stats['bytes'] / 1e6:.1f} MB, "
+        f"write={stats['write_s']}s put={stats['put_s']}s copy={stats['copy_s']}s)"
     )
-    log(f"[LOAD] {nrows} rows into {schema}.{table} (success={success})")
-    return nrows
+    return stats
+
+
+def merge_stage_into_target(
+    cur, stage: str, target: str, keys: list[str], columns: list[str]
+):
+    """
+    Set-based upsert of `stage` into `target` on the primary key `keys`.
+    Matched rows are only rewritten when a non-key column actually changed,
+    so replaying the same stage is a no-op MERGE.
+    Returns (rows_inserted, rows_updated).
+    """
+    keys = [k.upper() for k in keys]
+    columns = [c.upper() for c in columns]
+    values = [c for c in columns if c not in keys]
+    on = " AND ".join(f"t.{k} = s.{k}" for k in keys)
+    changed = " OR ".join(f"t.{c} IS DISTINCT FROM s.{c}" for c in values)
+    updates = ", ".join(f"{c} = s.{c}" for c in values)
+
+    sql = f"MERGE INTO {target} t USING {stage} s ON {on}"
+    if values:
+        sql += f" WHEN MATCHED AND ({changed}) THEN UPDATE SET {updates}"
+    sql += (
+        f" WHEN NOT MATCHED THEN INSERT ({', '.join(columns)})"
+        f" VALUES ({', '.join(f's.{c}' for c in columns)})"
+    )
+    cur.execute(sql)
+    row = cur.fetchone()
+    inserted = int(row[0]) if row else 0
+    updated = int(row[1]) if row and len(row) > 1 and values else 0
+    return inserted, updated
+
+
+def upsert_df(
+    conn, df: pd.DataFrame, table: str, keys: list[str], schema: str = "PORTFOLIO.RAW"
+) -> int:
+    """
+    Idempotent load: write df to a temporary copy of the target table, then MERGE it
+    on `keys`. Safe to re-run after a partial failure; retries never add duplicates.
+    """
+    if len(df) == 0:
+        return 0
+    with span("load.upsert", table=f"{schema}.{table}") as s:
+        s.add(rows_in=len(df))
+        df = df.drop_duplicates(subset=keys, keep="last")
+        stage = f"{table}_STAGE_{uuid.uuid4().hex[:8].upper()}"
+        cur = conn.cursor()
+        cur.execute(f"CREATE TEMPORARY TABLE {schema}.{stage} LIKE {schema}.{table}")
+        try:
+            write_df(conn, df, table=stage, schema=schema)
+            inserted, updated = merge_stage_into_target(
+                cur, f"{schema}.{stage}", f"{schema}.{table}", keys, list(df.columns)
+            )
+        finally:
+            cur.execute(f"DROP TABLE IF EXISTS {schema}.{stage}")
+        s.add(rows_out=inserted + updated)
+    log(f"[MERGE] {schema}.{table}: {inserted} inserted, {updated} updated")
+    return inserted + updated
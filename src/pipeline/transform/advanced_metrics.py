@@ -0,0 +1,279 @@
+"""
+NumPy implementation of airflow/sql/06_advanced_metrics.sql.
+
+Rows are kept flat and sorted by (PORTFOLIO_ID, DATE), so each
+"ROWS BETWEEN 29 PRECEDING AND CURRENT ROW" window is the slice [start, i] of
+its own portfolio. Window sums come from one cumulative sum per input, so every
+metric is O(n) over all portfolios at once instead of one window pass per column.
+NULL handling follows the SQL: aggregates skip NULLs, COUNT(*) counts rows.
+"""
+
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from ..utils.instrument import instrument
+
+WINDOW = 30
+OUTPUT_COLUMNS = [
+    "DATE",
+    "PORTFOLIO_ID",
+    "SHARPE_RATIO",
+    "SORTINO_RATIO",
+    "MAX_DRAWDOWN",
+    "BETA",
+    "ALPHA",
+]
+STATE_COLUMNS = ["PORTFOLIO_ID", "CONTEXT_FROM", "PEAK_BEFORE"]
+# Below this ratio of variance to mean square the cumulative-sum variance has
+# lost too many digits; those windows are recomputed directly (two-pass)
+VAR_RECHECK = 1e-3
+# Benchmark variances this small relative to the mean square are rounding noise
+# (a flat benchmark), which the warehouse reports as exactly 0
+VAR_EPS = 1e-10
+
+
+class RollingWindows:
+    """
+    Trailing `window`-row frames over rows sorted by group, i.e.
+    OVER (PARTITION BY group ORDER BY date ROWS BETWEEN window-1 PRECEDING AND CURRENT ROW).
+
+    Values are scattered into a dense (group x row rank) grid, so cumulative sums,
+    running maxima and block minima run along axis 1 and restart at every group.
+    """
+
+    def __init__(self, groups: np.ndarray, window: int = WINDOW):
+        n = len(groups)
+        idx = np.arange(n)
+        new_group = np.ones(n, dtype=bool)
+        new_group[1:] = groups[1:] != groups[:-1]
+        self.window = window
+        self.group = np.cumsum(new_group) - 1
+        self.rank = idx - np.maximum.accumulate(np.where(new_group, idx, 0))
+        self.starts = idx - np.minimum(self.rank, window - 1)
+        self.rows = (idx - self.starts + 1).astype(np.float64)  # COUNT(*)
+        n_groups = int(self.group[-1]) + 1 if n else 0
+        longest = int(self.rank.max()) + 1 if n else 0
+        # Pad the rank axis to whole blocks of `window` for min()
+        self.shape = (n_groups, -(-longest // window) * window)
+        # Flat grid position of every row, and of the row `window` places earlier
+        self._cell = self.group * self.shape[1] + self.rank
+        self._has_prev = np.flatnonzero(self.rank >= window)
+        self._prev_cell = self._cell[self._has_prev] - window
+
+    def _grid(self, values: np.ndarray, fill: float) -> np.ndarray:
+        grid = np.full(self.shape, fill, dtype=np.float64)
+        grid.ravel()[self._cell] = values
+        return grid
+
+    def _rolling(self, values: np.ndarray) -> np.ndarray:
+        # Cumulative sums restart at every group, so rounding error stays at the
+        # scale of one portfolio's history
+        csum = np.cumsum(self._grid(values, 0.0), axis=1).ravel()
+        out = csum[self._cell]
+        out[self._has_prev] -= csum[self._prev_cell]
+        return out
+
+    def count(self, values: np.ndarray) -> np.ndarray:
+        """COUNT(values): non-NULL rows in each window."""
+        return self._rolling(~np.isnan(values))
+
+    def _sum(self, values: np.ndarray, n: np.ndarray) -> np.ndarray:
+        sums = self._rolling(np.where(np.isnan(values), 0.0, values))
+        return np.where(n > 0, sums, np.nan)
+
+    def sum(self, values: np.ndarray) -> np.ndarray:
+        """SUM(values); NULL when the window has no non-NULL value."""
+        return self._sum(values, self.count(values))
+
+    def avg(self, values: np.ndarray) -> np.ndarray:
+        n = self.count(values)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(n > 0, self._sum(values, n) / n, np.nan)
+
+    def _direct_var(
+        self, values: np.ndarray, rows: np.ndarray, chunk: int = 1_000_000
+    ) -> np.ndarray:
+        """Two-pass sample variance of the windows ending at `rows`, NULLs skipped."""
+        out = np.empty(len(rows))
+        for lo in range(0, len(rows), chunk):
+            part = rows[lo : lo + chunk]
+            idx = part[:, None] - np.arange(self.window)[None, :]
+            inside = idx >= self.starts[part][:, None]
+            win = np.where(inside, values[np.maximum(idx, 0)], np.nan)
+            out[lo : lo + chunk] = np.nanvar(win, axis=1, ddof=1)
+        return out
+
+    def stddev_samp(self, values: np.ndarray) -> np.ndarray:
+        """STDDEV_SAMP(values); NULL with fewer than two non-NULL values."""
+        n = self.count(values)
+        s = self._sum(values, n)
+        ss = self._sum(values * values, n)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            var = np.where(n > 1, (ss - s * s / n) / (n - 1), np.nan)
+            recheck = np.flatnonzero((n > 1) & ~(var > VAR_RECHECK * ss / n))
+        if len(recheck):
+            var[recheck] = self._direct_var(values, recheck)
+        return np.sqrt(var)
+
+    def min(self, values: np.ndarray) -> np.ndarray:
+        """
+        MIN(values) in O(n) (van Herk / Gil-Werman). Each group's rows are cut into
+        blocks of `window`; a window is then a block prefix, or a block suffix plus
+        the next block's prefix.
+        """
+        grid = self._grid(np.where(np.isnan(values), np.inf, values), np.inf)
+        blocks = grid.reshape(self.shape[0], -1, self.window)
+        prefix = np.minimum.accumulate(blocks, axis=2).reshape(self.shape)
+        suffix = np.minimum.accumulate(blocks[:, :, ::-1], axis=2)[:, :, ::-1]
+        suffix = suffix.reshape(self.shape)
+        offset = np.minimum(self.rank, self.window - 1)
+        out = prefix.ravel()[self._cell]
+        crosses = (self.rank - offset) % self.window != 0
+        out[crosses] = np.minimum(
+            out[crosses], suffix.ravel()[self._cell[crosses] - offset[crosses]]
+        )
+        return np.where(np.isinf(out), np.nan, out)
+
+    def running_max(self, values: np.ndarray) -> np.ndarray:
+        """MAX(values) OVER (PARTITION BY group ORDER BY date), NULLs skipped."""
+        grid = self._grid(np.where(np.isnan(values), -np.inf, values), -np.inf)
+        peak = np.maximum.accumulate(grid, axis=1).ravel()[self._cell]
+        return np.where(np.isneginf(peak), np.nan, peak)
+
+
+def benchmark_returns(benchmark: pd.DataFrame):
+    """(dates, daily returns) of the benchmark, sorted by date; the first return is NULL."""
+    bench = benchmark.rename(columns=str.upper)
+    if bench["SYMBOL"].nunique() > 1:
+        raise ValueError("compute_advanced_metrics expects a single benchmark symbol")
+    bench = bench.sort_values("DATE")
+    dates = pd.to_datetime(bench["DATE"]).to_numpy("datetime64[D]")
+    close = bench["CLOSE"].to_numpy(dtype=np.float64)
+    rets = np.full(len(close), np.nan)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rets[1:] = close[1:] / close[:-1] - 1
+    return dates, rets
+
+
+@instrument("transform.advanced_metrics")
+def compute_incremental(
+    base: pd.DataFrame,
+    benchmark: pd.DataFrame,
+    state: Optional[pd.DataFrame] = None,
+    window: int = WINDOW,
+):
+    """
+    Metrics for every `base` row, plus the state the next incremental run starts from.
+
+    `base` must hold each portfolio's rows from its state CONTEXT_FROM onwards (all rows
+    for portfolios without state). PEAK_BEFORE seeds the running peak with the rows
+    before CONTEXT_FROM, so drawdowns match a full recompute without re-reading history.
+    The new CONTEXT_FROM is the earliest of the last window-1 rows and the last window-1
+    benchmark-joined rows: exactly the look-back the next run's windows need.
+    Returns (metrics, state).
+    """
+    base = base.rename(columns=str.upper)
+    codes, portfolios = pd.factorize(base["PORTFOLIO_ID"])
+    dates = pd.to_datetime(base["DATE"]).to_numpy("datetime64[D]")
+    order = np.lexsort((dates, codes))
+    base = base.iloc[order].reset_index(drop=True)
+    groups, dates = codes[order], dates[order]
+    r = base["WEIGHTED_DAILY_RETURN"].to_numpy(dtype=np.float64, na_value=np.nan)
+    tv = base["TOTAL_VALUE_GBP"].to_numpy(dtype=np.float64, na_value=np.nan)
+
+    seed = np.full(len(portfolios), np.nan)
+    if state is not None and len(state):
+        state = state.rename(columns=str.upper).set_index("PORTFOLIO_ID")
+        seed = (
+            state["PEAK_BEFORE"]
+            .reindex(portfolios)
+            .to_numpy(np.float64, na_value=np.nan)
+        )
+
+    frames = RollingWindows(groups, window)
+
+    # Sharpe / Sortino over the portfolio's own rows
+    avg = frames.avg(r)
+    vol = frames.stddev_samp(r)
+    down_vol = frames.stddev_samp(np.where(r < 0, r, np.nan))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        sharpe = np.where(vol > 0, avg / vol, 0.0)
+        sortino = np.where(down_vol > 0, avg / down_vol, 0.0)
+
+    # Drawdown from the running peak, worst of the last `window` rows
+    peak = np.fmax(frames.running_max(tv), seed[groups])
+    with np.errstate(invalid="ignore", divide="ignore"):
+        drawdown = np.where(peak > 0, (tv - peak) / peak, 0.0)
+    max_drawdown = frames.min(drawdown)
+
+    # Beta / alpha: windows run over the rows that join to a benchmark date
+    bench_dates, bench_rets = benchmark_returns(benchmark)
+    pos = np.searchsorted(bench_dates, dates)
+    hit = pos < len(bench_dates)
+    hit[hit] = bench_dates[pos[hit]] == dates[hit]
+    joined = np.flatnonzero(hit)
+    rp, rb = r[joined], bench_rets[pos[joined]]
+    jf = RollingWindows(groups[joined], window)
+    n = jf.rows
+    s_p, s_b, s_bb = jf.sum(rp), jf.sum(rb), jf.sum(rb * rb)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cov = np.where(n > 1, (jf.sum(rp * rb) - s_p * s_b / n) / (n - 1), np.nan)
+        var = np.where(n > 1, (s_bb - s_b * s_b / n) / (n - 1), np.nan)
+        var = np.where(var > VAR_EPS * s_bb / n, var, np.where(np.isnan(var), var, 0))
+        j_beta = np.where(var > 0, cov / var, np.nan)
+        j_alpha = jf.avg(rp) - j_beta * jf.avg(rb)
+    beta = np.full(len(r), np.nan)
+    alpha = np.full(len(r), np.nan)
+    beta[joined] = j_beta
+    alpha[joined] = j_alpha
+
+    metrics = pd.DataFrame(
+        {
+            "DATE": base["DATE"].to_numpy(),
+            "PORTFOLIO_ID": base["PORTFOLIO_ID"].to_numpy(),
+            "SHARPE_RATIO": sharpe,
+            "SORTINO_RATIO": sortino,
+            "MAX_DRAWDOWN": max_drawdown,
+            "BETA": beta,
+            "ALPHA": alpha,
+        },
+        columns=OUTPUT_COLUMNS,
+    )
+
+    # Next run's context: last window-1 rows, and last window-1 joined rows
+    if len(groups) == 0:
+        return metrics, pd.DataFrame(columns=STATE_COLUMNS)
+    first = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]])
+    last = np.r_[first[1:], len(groups)] - 1
+    context_from = dates[np.maximum(last - (window - 2), first)]
+    if len(joined):
+        jg = groups[joined]
+        j_first = np.flatnonzero(np.r_[True, jg[1:] != jg[:-1]])
+        j_last = np.r_[j_first[1:], len(jg)] - 1
+        j_from = dates[joined[np.maximum(j_last - (window - 2), j_first)]]
+        context_from[jg[j_first]] = np.minimum(context_from[jg[j_first]], j_from)
+    before = np.where((dates < context_from[groups]) & ~np.isnan(tv), tv, -np.inf)
+    peak_before = np.fmax(np.maximum.reduceat(before, first), seed)
+
+    next_state = pd.DataFrame(
+        {
+            "PORTFOLIO_ID": np.asarray(portfolios, dtype=object),
+            "CONTEXT_FROM": context_from.astype(object),
+            "PEAK_BEFORE": np.where(np.isneginf(peak_before), np.nan, peak_before),
+        },
+        columns=STATE_COLUMNS,
+    )
+    return metrics, next_state
+
+
+def compute_advanced_metrics(
+    base: pd.DataFrame, benchmark: pd.DataFrame, window: int = WINDOW
+) -> pd.DataFrame:
+    """
+    `base`: PORTFOLIO_ID, DATE, WEIGHTED_DAILY_RETURN, TOTAL_VALUE_GBP (VIEW_PORTFOLIO_METRICS).
+    `benchmark`: SYMBOL, DATE, CLOSE (RAW.FACT_BENCHMARK) for one symbol.
+    Returns one FACT_PORTFOLIO_ADV_METRICS row per base row.
+    """
+    return compute_incremental(base, benchmark, window=window)[0]
@@ -0,0 +1,181 @@
+"""
+FX conversion for any listing currency.
+
+FX_DAILY rows (PAIR like 'USDGBP' meaning 1 USD = RATE GBP) become a dense
+calendar-day x currency matrix of values in BASE_CURRENCY: each pair's rate is
+carried forward over days without a fix (weekends, UK/US holidays), and
+currencies quoted only against each other are triangulated through the base.
+Converting prices is then one integer gather per row, an as-of join on the date.
+
+    matrix = rate_matrix(fx_rows)
+    bars["FX_TO_GBP"] = matrix.factors(bars["CURRENCY"], bars["DATE"], "GBP")
+"""
+
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+
+from ..utils.instrument import instrument
+
+BASE_CURRENCY = "USD"
+DEFAULT_CURRENCY = "USD"  # listings without a DIM_SYMBOL currency
+# Quote units priced in a fraction of another currency, e.g. LSE pence
+MINOR_UNITS = {"GBX": ("GBP", 0.01), "GBp": ("GBP", 0.01)}
+
+
+def fx_pairs() -> list[str]:
+    """Pairs to load (env FX_PAIRS, default USDGBP), upper-cased 6-letter codes."""
+    return [
+        p.strip().upper()
+        for p in os.getenv("FX_PAIRS", "USDGBP").split(",")
+        if p.strip()
+    ]
+
+
+def split_pair(pair: str) -> tuple[str, str]:
+    pair = pair.strip().upper()
+    if len(pair) != 6:
+        raise ValueError(f"Invalid FX pair format: {pair}, expected like 'USDGBP'")
+    return pair[:3], pair[3:]
+
+
+class RateMatrix:
+    """
+    Value of one unit of each currency in `base`, for every calendar day from the
+    first to the last FX date. Days before a currency's first fix are NaN; dates
+    after the last day use the last day's values.
+    """
+
+    def __init__(self, fx: pd.DataFrame, base: str = BASE_CURRENCY):
+        fx = fx.rename(columns=str.upper)
+        fx = fx.dropna(subset=["PAIR", "DATE", "RATE"])
+        self.base = base
+        if len(fx) == 0:
+            self.start = np.datetime64("NaT", "D")
+            self.currencies = {base: 0}
+            self.values = np.ones((1, 1))
+            self._factors = {}
+            return
+
+        days = pd.to_datetime(fx["DATE"]).to_numpy("datetime64[D]")
+        self.start = days.min()
+        n_days = int((days.max() - self.start).astype(np.int64)) + 1
+        offset = (days - self.start).astype(np.int64)
+
+        # As-of rate of every pair on every day
+        pair_codes, pairs = pd.factorize(fx["PAIR"].str.upper())
+        quotes = np.full((n_days, len(pairs)), np.nan)
+        quotes[offset, pair_codes] = fx["RATE"].to_numpy(dtype=np.float64)
+        quotes = pd.DataFrame(quotes).ffill().to_numpy()
+
+        legs = [split_pair(p) for p in pairs]
+        names = [base] + sorted({c for leg in legs for c in leg} - {base})
+        self.currencies = {c: i for i, c in enumerate(names)}
+        values = np.full((n_days, len(names)), np.nan)
+        values[:, 0] = 1.0
+        known = {base}
+        # Pairs quoted against the base first, then crosses through known legs
+        pending = list(range(len(legs)))
+        while pending:
+            left = []
+            for j in pending:
+                fr, to = legs[j]
+                if fr in known and to not in known:
+                    values[:, self.currencies[to]] = (
+                        values[:, self.currencies[fr]] / quotes[:, j]
+                    )
+                    known.add(to)
+                elif to in known and fr not in known:
+                    values[:, self.currencies[fr]] = (
+                        quotes[:, j] * values[:, self.currencies[to]]
+                    )
+                    known.add(fr)
+                elif fr not in known:
+                    left.append(j)
+            if len(left) == len(pending):
+                break  # quoted only against currencies with no path to the base
+            pending = left
+        self.values = values
+        self._factors = {}
+
+    def _column(self, currency: str):
+        currency = currency or DEFAULT_CURRENCY
+        scale = 1.0
+        if currency in MINOR_UNITS:
+            currency, scale = MINOR_UNITS[currency]
+        return self.currencies.get(currency), scale
+
+    def to(self, target: str) -> np.ndarray:
+        """(days x currencies) units of `target` per unit of each currency, memoized."""
+        if target not in self._factors:
+            col, scale = self._column(target)
+            if col is None:
+                raise KeyError(f"No FX path from {target} to {self.base}")
+            with np.errstate(invalid="ignore", divide="ignore"):
+                self._factors[target] = self.values / (
+                    self.values[:, col : col + 1] * scale
+                )
+        return self._factors[target]
+
+    def factors(self, currencies, dates, target: str = "GBP") -> np.ndarray:
+        """
+        Units of `target` per unit of each row's currency on (or last fixed before)
+        its date; NaN before the first fix or for currencies without a rate.
+        """
+        out = np.full(len(dates), np.nan)
+        if len(dates) == 0 or np.isnat(self.start):
+            return out
+        grid = self.to(target)
+        day = (pd.to_datetime(dates).to_numpy("datetime64[D]") - self.start).astype(
+            np.int64
+        )
+        in_range = day >= 0
+        day = np.minimum(day, len(grid) - 1)
+
+        codes, uniques = pd.factorize(pd.Series(currencies, dtype=object).fillna(""))
+        cols = np.full(len(uniques), -1)
+        scales = np.ones(len(uniques))
+        for i, currency in enumerate(uniques):
+            col, scale = self._column(currency)
+            if col is not None:
+                cols[i], scales[i] = col, scale
+        col, scale = cols[codes], scales[codes]
+        ok = in_range & (col >= 0)
+        out[ok] = grid[day[ok], col[ok]] * scale[ok]
+        return out
+
+
+_matrices: dict = {}
+
+
+def rate_matrix(fx: pd.DataFrame, base: str = BASE_CURRENCY) -> RateMatrix:
+    """RateMatrix for these FX rows, reused while the same rows come back in a run."""
+    digest = hashlib.sha1(
+        pd.util.hash_pandas_object(fx, index=False).to_numpy().tobytes()
+    ).hexdigest()
+    key = (digest, base)
+    if key not in _matrices:
+        _matrices.clear()
+        _matrices[key] = RateMatrix(fx, base)
+    return _matrices[key]
+
+
+@instrument("transform.fx")
+def convert_to_gbp(
+    bars: pd.DataFrame, matrix: RateMatrix, currency_col: str = "CURRENCY"
+) -> pd.DataFrame:
+    """
+    bars plus USD_TO_GBP and FX_TO_GBP (GBP per unit of the listing currency) as
+    of each row's DATE. Rows without `currency_col` are treated as DEFAULT_CURRENCY.
+    """
+    currencies = bars.get(currency_col)
+    if currencies is None:
+        currencies = pd.Series(DEFAULT_CURRENCY, index=bars.index)
+    return bars.assign(
+        USD_TO_GBP=matrix.factors(
+            np.full(len(bars), "USD", dtype=object), bars["DATE"]
+        ),
+        FX_TO_GBP=matrix.factors(currencies.to_numpy(dtype=object), bars["DATE"]),
+    )
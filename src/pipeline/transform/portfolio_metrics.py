@@ -0,0 +1,125 @@
+"""
+Rolling risk columns of FACT_PORTFOLIO_DAILY, previously computed on every read
+by VIEW_PORTFOLIO_METRICS (airflow/sql/04_portfolio_metrics.sql).
+
+- ROLLING_30D_VOLATILITY: STDDEV_SAMP over the last 30 rows.
+- DAILY_VAR_95: PERCENTILE_CONT(0.05) of the returns dated within the last 30
+  calendar days. The view ran a correlated subquery per row (quadratic per
+  portfolio); here one sorted sliding window per portfolio is updated in O(w)
+  per row (binary search, then a list insert/delete shifting at most w values).
+"""
+
+import bisect
+import math
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from ..utils.instrument import instrument
+from .advanced_metrics import RollingWindows
+
+VOL_WINDOW = 30
+VAR_DAYS = 30  # DATE BETWEEN DATEADD(DAY, -29, DATE) AND DATE
+VAR_QUANTILE = 0.05
+COLUMNS = [
+    "PORTFOLIO_ID",
+    "DATE",
+    "TOTAL_VALUE_GBP",
+    "WEIGHTED_DAILY_RETURN",
+    "ROLLING_30D_VOLATILITY",
+    "DAILY_VAR_95",
+]
+
+
+class SortedWindow:
+    """
+    Sliding multiset of floats kept in sorted order, for windowed order statistics.
+    add/remove are O(w): the position is found by bisection, but the list shifts.
+    """
+
+    def __init__(self):
+        self._values = []
+
+    def __len__(self):
+        return len(self._values)
+
+    def add(self, value: float):
+        bisect.insort(self._values, value)
+
+    def remove(self, value: float):
+        del self._values[bisect.bisect_left(self._values, value)]
+
+    def percentile_cont(self, q: float) -> float:
+        """Linear interpolation between order statistics, as PERCENTILE_CONT does."""
+        n = len(self._values)
+        if n == 0:
+            return math.nan
+        pos = q * (n - 1)
+        lo = int(pos)
+        hi = min(lo + 1, n - 1)
+        return self._values[lo] + (pos - lo) * (self._values[hi] - self._values[lo])
+
+
+def rolling_var(
+    groups: np.ndarray,
+    dates: np.ndarray,
+    returns: np.ndarray,
+    q: float = VAR_QUANTILE,
+    days: int = VAR_DAYS,
+) -> np.ndarray:
+    """
+    PERCENTILE_CONT(q) of each row's non-NULL returns dated in the trailing `days`
+    calendar days (current day included). Rows must be sorted by (group, date).
+    """
+    day = dates.astype("datetime64[D]").astype(np.int64).tolist()
+    rets = returns.tolist()
+    group = groups.tolist()
+    out = np.full(len(rets), np.nan)
+    window = SortedWindow()
+    tail = 0
+    for i, value in enumerate(rets):
+        if i == 0 or group[i] != group[i - 1]:
+            window = SortedWindow()
+            tail = i
+        oldest = day[i] - (days - 1)
+        while day[tail] < oldest:
+            if not math.isnan(rets[tail]):
+                window.remove(rets[tail])
+            tail += 1
+        if not math.isnan(value):
+            window.add(value)
+        out[i] = window.percentile_cont(q)
+    return out
+
+
+@instrument("transform.portfolio_metrics")
+def compute_portfolio_metrics(
+    daily: pd.DataFrame, context: Optional[pd.DataFrame] = None
+) -> pd.DataFrame:
+    """
+    `daily`: PORTFOLIO_ID, DATE, TOTAL_VALUE_GBP, WEIGHTED_DAILY_RETURN for the dates
+    to (re)compute. `context`: the same columns for the rows just before them (the last
+    VOL_WINDOW - 1 rows per portfolio are enough for both windows); only used as input.
+    Returns FACT_PORTFOLIO_DAILY rows for `daily`.
+    """
+    daily = daily.rename(columns=str.upper).assign(_NEW=True)
+    rows = daily
+    if context is not None and len(context):
+        context = context.rename(columns=str.upper)[COLUMNS[:4]].assign(_NEW=False)
+        rows = pd.concat([context, daily], ignore_index=True)
+
+    codes, _ = pd.factorize(rows["PORTFOLIO_ID"])
+    dates = pd.to_datetime(rows["DATE"]).to_numpy("datetime64[D]")
+    order = np.lexsort((dates, codes))
+    rows = rows.iloc[order].reset_index(drop=True)
+    groups, dates = codes[order], dates[order]
+    r = rows["WEIGHTED_DAILY_RETURN"].to_numpy(dtype=np.float64, na_value=np.nan)
+
+    rows["TOTAL_VALUE_GBP"] = rows["TOTAL_VALUE_GBP"].to_numpy(
+        dtype=np.float64, na_value=np.nan
+    )
+    rows["WEIGHTED_DAILY_RETURN"] = r
+    rows["ROLLING_30D_VOLATILITY"] = RollingWindows(groups, VOL_WINDOW).stddev_samp(r)
+    rows["DAILY_VAR_95"] = rolling_var(groups, dates, r)
+    return rows.loc[rows["_NEW"].to_numpy(dtype=bool), COLUMNS].reset_index(drop=True)
@@ -0,0 +1,145 @@
+"""
+Event-sourced positions: PORTFOLIO_TRANSACTIONS replayed into runs of constant,
+non-zero quantity per (portfolio, symbol), instead of one row per day per symbol
+ever traded. Daily rows are expanded only for the date range that needs them.
+"""
+
+from collections.abc import Iterator
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from ..utils.instrument import instrument
+
+# Quantities are NUMBER(18,6): sum them as integer micro-units so a sell-out
+# lands on exactly zero
+SCALE = 1_000_000
+KEYS = ["PORTFOLIO_ID", "SYMBOL"]
+RUN_COLUMNS = ["PORTFOLIO_ID", "SYMBOL", "VALID_FROM", "VALID_TO", "QUANTITY"]
+DAILY_COLUMNS = ["PORTFOLIO_ID", "SYMBOL", "DATE", "QUANTITY"]
+
+
+def _micro(values: pd.Series) -> np.ndarray:
+    return np.rint(values.to_numpy(dtype=np.float64) * SCALE).astype(np.int64)
+
+
+@instrument("transform.position_runs")
+def position_runs(
+    transactions: pd.DataFrame,
+    opening: Optional[pd.DataFrame] = None,
+    as_of=None,
+) -> pd.DataFrame:
+    """
+    `transactions`: PORTFOLIO_ID, SYMBOL, TRANSACTION_DATE, QUANTITY_DELTA.
+    `opening`: open runs (VALID_TO NULL) to continue from, e.g. the last snapshot;
+    each one re-enters as a delta of its quantity on its VALID_FROM.
+    Transactions after `as_of` are ignored, like the SQL's CURRENT_DATE cut-off.
+
+    Returns RUN_COLUMNS: VALID_TO is the run's last day, NaT while still open.
+    Zero-quantity stretches produce no rows.
+    """
+    tx = transactions.rename(columns=str.upper)
+    events = pd.DataFrame(
+        {
+            "PORTFOLIO_ID": tx["PORTFOLIO_ID"].to_numpy(),
+            "SYMBOL": tx["SYMBOL"].to_numpy(),
+            "DATE": pd.to_datetime(tx["TRANSACTION_DATE"]).to_numpy("datetime64[D]"),
+            "DELTA": _micro(tx["QUANTITY_DELTA"]),
+        }
+    )
+    if as_of is not None:
+        events = events[events["DATE"] <= np.datetime64(pd.Timestamp(as_of), "D")]
+    if opening is not None and len(opening):
+        opening = opening.rename(columns=str.upper)
+        carried = pd.DataFrame(
+            {
+                "PORTFOLIO_ID": opening["PORTFOLIO_ID"].to_numpy(),
+                "SYMBOL": opening["SYMBOL"].to_numpy(),
+                "DATE": pd.to_datetime(opening["VALID_FROM"]).to_numpy("datetime64[D]"),
+                "DELTA": _micro(opening["QUANTITY"]),
+            }
+        )
+        events = pd.concat([carried, events], ignore_index=True)
+
+    # One net change per key and day, in (key, date) order
+    changes = events.groupby(KEYS + ["DATE"], sort=True, observed=True)["DELTA"].sum()
+    changes = changes[changes != 0].reset_index()
+    if len(changes) == 0:
+        return pd.DataFrame(columns=RUN_COLUMNS)
+
+    portfolio = changes["PORTFOLIO_ID"].to_numpy()
+    symbol = changes["SYMBOL"].to_numpy()
+    dates = changes["DATE"].to_numpy("datetime64[D]")
+    new_key = np.ones(len(changes), dtype=bool)
+    new_key[1:] = (portfolio[1:] != portfolio[:-1]) | (symbol[1:] != symbol[:-1])
+
+    # Running quantity per key: exact integer cumsum minus the key's offset
+    csum = np.cumsum(changes["DELTA"].to_numpy())
+    key_start = np.maximum.accumulate(np.where(new_key, np.arange(len(csum)), 0))
+    offset = np.where(key_start > 0, csum[key_start - 1], 0)
+    quantity = csum - offset
+
+    # A run lasts until the day before the key's next change
+    valid_to = np.full(len(dates), np.datetime64("NaT"), dtype="datetime64[D]")
+    same_key_next = ~new_key[1:]
+    valid_to[:-1][same_key_next] = dates[1:][same_key_next] - np.timedelta64(1, "D")
+
+    keep = quantity != 0
+    return pd.DataFrame(
+        {
+            "PORTFOLIO_ID": portfolio[keep],
+            "SYMBOL": symbol[keep],
+            "VALID_FROM": dates[keep],
+            "VALID_TO": valid_to[keep],
+            "QUANTITY": quantity[keep] / SCALE,
+        },
+        columns=RUN_COLUMNS,
+    )
+
+
+def positions_as_of(runs: pd.DataFrame, day) -> pd.DataFrame:
+    """Holdings on one day, straight from the runs."""
+    day = np.datetime64(pd.Timestamp(day), "D")
+    valid_from = runs["VALID_FROM"].to_numpy("datetime64[D]")
+    valid_to = runs["VALID_TO"].to_numpy("datetime64[D]")
+    live = (valid_from <= day) & (np.isnat(valid_to) | (valid_to >= day))
+    return runs.loc[live, KEYS + ["QUANTITY"]].reset_index(drop=True)
+
+
+def expand_daily(
+    runs: pd.DataFrame, start, end, chunk_days: int = 31
+) -> Iterator[pd.DataFrame]:
+    """
+    Yield PORTFOLIO_POSITIONS_DAILY rows for [start, end], `chunk_days` at a time,
+    so a long backfill never materialises every day at once.
+    """
+    start = np.datetime64(pd.Timestamp(start), "D")
+    end = np.datetime64(pd.Timestamp(end), "D")
+    valid_from = runs["VALID_FROM"].to_numpy("datetime64[D]")
+    valid_to = runs["VALID_TO"].to_numpy("datetime64[D]")
+    valid_to = np.where(np.isnat(valid_to), end, valid_to)
+    step = np.timedelta64(chunk_days, "D")
+
+    lo_day = start
+    while lo_day <= end:
+        hi_day = min(lo_day + step - np.timedelta64(1, "D"), end)
+        lo = np.maximum(valid_from, lo_day)
+        hi = np.minimum(valid_to, hi_day)
+        live = np.flatnonzero(lo <= hi)
+        if len(live):
+            lengths = (hi[live] - lo[live]).astype(np.int64) + 1
+            rows = np.repeat(live, lengths)
+            # Day offset of each expanded row within its run
+            firsts = np.repeat(np.cumsum(lengths) - lengths, lengths)
+            offsets = np.arange(len(rows)) - firsts
+            yield pd.DataFrame(
+                {
+                    "PORTFOLIO_ID": runs["PORTFOLIO_ID"].to_numpy()[rows],
+                    "SYMBOL": runs["SYMBOL"].to_numpy()[rows],
+                    "DATE": lo[rows] + offsets.astype("timedelta64[D]"),
+                    "QUANTITY": runs["QUANTITY"].to_numpy()[rows],
+                },
+                columns=DAILY_COLUMNS,
+            )
+        lo_day = hi_day + np.timedelta64(1, "D")
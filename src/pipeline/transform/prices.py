@@ -0,0 +1,89 @@
+"""
+Return and rolling columns of FACT_PRICES, previously computed by the MERGE in
+airflow/sql/03_analytics_table.sql over the rows after the watermark only, so
+the first rows of every increment saw truncated windows.
+
+- DAILY_RETURN: CLOSE / LAG(CLOSE) - 1.
+- ROLLING_7D_AVG_CLOSE: AVG(CLOSE) over the last 7 rows.
+- ROLLING_30D_VOLATILITY: STDDEV_SAMP(CLOSE) over the last 30 rows.
+
+Windows run per symbol over EQUITY_DAILY rows, so the last CONTEXT_ROWS rows
+before the new dates are all the history an increment needs. CLOSE_GBP uses
+FX_TO_GBP, the as-of rate of the listing currency (src/pipeline/transform/fx.py),
+so days without an FX fix no longer drop price rows.
+"""
+
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from ..utils.instrument import instrument
+from .advanced_metrics import RollingWindows
+
+AVG_WINDOW = 7
+VOL_WINDOW = 30
+CONTEXT_ROWS = VOL_WINDOW - 1
+COLUMNS = [
+    "SYMBOL",
+    "DATE",
+    "COMPANY_NAME",
+    "CURRENCY",
+    "OPEN",
+    "HIGH",
+    "LOW",
+    "CLOSE",
+    "VOLUME",
+    "USD_TO_GBP",
+    "FX_TO_GBP",
+    "CLOSE_GBP",
+    "DAILY_RETURN",
+    "ROLLING_7D_AVG_CLOSE",
+    "ROLLING_30D_VOLATILITY",
+]
+
+
+def _floats(s: pd.Series) -> np.ndarray:
+    return s.to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+@instrument("transform.fact_prices")
+def compute_fact_prices(
+    bars: pd.DataFrame, context: Optional[pd.DataFrame] = None
+) -> pd.DataFrame:
+    """
+    `bars`: EQUITY_DAILY rows with DIM_SYMBOL's COMPANY_NAME, CURRENCY and the
+    USD_TO_GBP / FX_TO_GBP rates from convert_to_gbp, for the dates to (re)compute.
+    `context`: SYMBOL, DATE, CLOSE of the CONTEXT_ROWS rows per symbol just before
+    them; only used as window input. Returns FACT_PRICES rows for `bars`.
+    """
+    bars = bars.rename(columns=str.upper).assign(_NEW=True)
+    rows = bars
+    if context is not None and len(context):
+        context = context.rename(columns=str.upper)[["SYMBOL", "DATE", "CLOSE"]]
+        rows = pd.concat([context.assign(_NEW=False), bars], ignore_index=True)
+
+    codes, _ = pd.factorize(rows["SYMBOL"])
+    dates = pd.to_datetime(rows["DATE"]).to_numpy("datetime64[D]")
+    order = np.lexsort((dates, codes))
+    rows = rows.iloc[order].reset_index(drop=True)
+    groups = codes[order]
+    close = _floats(rows["CLOSE"])
+
+    prev = np.full(len(close), np.nan)
+    same = np.zeros(len(close), dtype=bool)
+    same[1:] = groups[1:] == groups[:-1]
+    prev[1:] = np.where(same[1:], close[:-1], np.nan)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rows["DAILY_RETURN"] = close / prev - 1
+    rows["ROLLING_7D_AVG_CLOSE"] = RollingWindows(groups, AVG_WINDOW).avg(close)
+    rows["ROLLING_30D_VOLATILITY"] = RollingWindows(groups, VOL_WINDOW).stddev_samp(
+        close
+    )
+
+    new = rows.loc[rows["_NEW"].to_numpy(dtype=bool)].reset_index(drop=True)
+    new["CLOSE_GBP"] = _floats(new["CLOSE"]) * _floats(new["FX_TO_GBP"])
+    for col in ("COMPANY_NAME", "CURRENCY"):
+        if col not in new.columns:
+            new[col] = None
+    return new[COLUMNS]
@@ -1,9 +1,99 @@
-from typing import Dict
+"""
+Data quality checks.
 
+dq_report profiles a local DataFrame. Rule suites are declarative: per table, a
+list of rules that compile into a single aggregate query (one scan of the table
+however many rules it has), or run over a local DataFrame with the same results.
+
+    suite = {
+        "rules": [
+            {"name": "EQUITY_PK", "type": "unique", "columns": ["SYMBOL", "DATE"]},
+            {"name": "EQUITY_FRESH", "type": "freshness", "column": "DATE",
+             "max_age_days": 4, "severity": "warn"},
+        ],
+        "where": "DATE >= '2025-01-01'",   # optional scan scope
+    }
+    sql = compile_suite("PORTFOLIO.RAW.EQUITY_DAILY", suite)
+    results = evaluate_suite("PORTFOLIO.RAW.EQUITY_DAILY", suite, cur.execute(sql).fetchone())
+
+Rule types, each measuring one value:
+- not_null (columns): rows with a NULL in any of the columns
+- unique (columns): rows whose key appears more than once
+- freshness (column, max_age_days): days since the latest value
+- range (column, min and/or max, inclusive=True): rows outside the bounds
+- return_spike (column, partition_by, order_by, max_abs_return): rows whose
+  change from the previous row of the partition exceeds max_abs_return
+- row_count (min=1): rows in scope
+
+Count rules pass while the count is at most `tolerance` (default 0). A failing
+rule is FAIL with severity "error" (the default) and WARN with "warn".
+"""
+
+import datetime
+from typing import Optional
+
+import numpy as np
 import pandas as pd
 
+RULE_TYPES = ("not_null", "unique", "freshness", "range", "return_spike", "row_count")
 
-def dq_report(df: pd.DataFrame, pk_cols=None) -> Dict:
+# Default suites, table -> suite; the dq_check job also reads DQ_SUITES_FILE.
+# The market-data PK rules warn: loads appended before the staged MERGE can have
+# left duplicates; raise them to "error" once those are cleaned up
+DQ_SUITES = {
+    "PORTFOLIO.RAW.EQUITY_DAILY": {
+        "rules": [
+            {"name": "EQUITY_DAILY_NOT_NULL", "type": "not_null",
+             "columns": ["SYMBOL", "DATE", "CLOSE"]},
+            {"name": "EQUITY_DAILY_PK_UNIQUE", "type": "unique",
+             "columns": ["SYMBOL", "DATE"], "severity": "warn"},
+            {"name": "EQUITY_DAILY_FRESHNESS", "type": "freshness", "column": "DATE",
+             "max_age_days": 4, "severity": "warn"},
+            {"name": "EQUITY_DAILY_CLOSE_RANGE", "type": "range", "column": "CLOSE",
+             "min": 0, "inclusive": False},
+            {"name": "EQUITY_DAILY_RETURN_SPIKE", "type": "return_spike",
+             "column": "CLOSE", "partition_by": "SYMBOL", "order_by": "DATE",
+             "max_abs_return": 0.5, "severity": "warn"},
+        ],
+    },
+    "PORTFOLIO.RAW.FX_DAILY": {
+        "rules": [
+            {"name": "FX_DAILY_NOT_NULL", "type": "not_null",
+             "columns": ["PAIR", "DATE", "RATE"]},
+            {"name": "FX_DAILY_PK_UNIQUE", "type": "unique", "columns": ["PAIR", "DATE"],
+             "severity": "warn"},
+            {"name": "FX_DAILY_FRESHNESS", "type": "freshness", "column": "DATE",
+             "max_age_days": 4, "severity": "warn"},
+            {"name": "FX_DAILY_RATE_RANGE", "type": "range", "column": "RATE",
+             "min": 0, "inclusive": False},
+            {"name": "FX_DAILY_RETURN_SPIKE", "type": "return_spike", "column": "RATE",
+             "partition_by": "PAIR", "order_by": "DATE", "max_abs_return": 0.1,
+             "severity": "warn"},
+        ],
+    },
+    "PORTFOLIO.RAW.FACT_BENCHMARK": {
+        "rules": [
+            {"name": "BENCHMARK_PK_UNIQUE", "type": "unique",
+             "columns": ["SYMBOL", "DATE"], "severity": "warn"},
+            {"name": "BENCHMARK_FRESHNESS", "type": "freshness", "column": "DATE",
+             "max_age_days": 4, "severity": "warn"},
+            {"name": "BENCHMARK_CLOSE_RANGE", "type": "range", "column": "CLOSE",
+             "min": 0, "inclusive": False},
+        ],
+    },
+    "PORTFOLIO.RAW.PORTFOLIO_POSITIONS": {
+        "rules": [
+            {"name": "POSITIONS_CHECK", "type": "row_count", "min": 1},
+            {"name": "POSITIONS_PK_UNIQUE", "type": "unique",
+             "columns": ["PORTFOLIO_ID", "SYMBOL"]},
+            {"name": "POSITIONS_NOT_NULL", "type": "not_null",
+             "columns": ["PORTFOLIO_ID", "SYMBOL", "QUANTITY"]},
+        ],
+    },
+}  # fmt: skip
+
+
+def dq_report(df: pd.DataFrame, pk_cols=None) -> dict:
     rep = {
         "rows": len(df),
         "cols": list(df.columns),
@@ -13,3 +103,141 @@ def dq_report(df: pd.DataFrame, pk_cols=None) -> Dict:
     if pk_cols:
         rep["dupe_pk_rows"] = int(df.duplicated(pk_cols).sum())
     return rep
+
+
+def _literal(value) -> str:
+    return repr(float(value))
+
+
+def _range_condition(rule: dict, col: str) -> str:
+    inclusive = rule.get("inclusive", True)
+    conds = []
+    if rule.get("min") is not None:
+        conds.append(f"{col} {'<' if inclusive else '<='} {_literal(rule['min'])}")
+    if rule.get("max") is not None:
+        conds.append(f"{col} {'>' if inclusive else '>='} {_literal(rule['max'])}")
+    if not conds:
+        raise ValueError(f"range rule {rule['name']} needs min or max")
+    return " OR ".join(conds)
+
+
+def _rule_sql(rule: dict):
+    """(window expression the aggregate reads as {w}, or None; aggregate expression)."""
+    kind = rule["type"]
+    if kind == "not_null":
+        return None, "COUNT_IF(" + " OR ".join(
+            f"{c} IS NULL" for c in rule["columns"]
+        ) + ")"
+    if kind == "unique":
+        keys = ", ".join(rule["columns"])
+        return f"COUNT(*) OVER (PARTITION BY {keys})", "COUNT_IF({w} > 1)"
+    if kind == "freshness":
+        return None, f"CURRENT_DATE - MAX({rule['column']})::DATE"
+    if kind == "range":
+        return None, f"COUNT_IF({_range_condition(rule, rule['column'])})"
+    if kind == "return_spike":
+        col = rule["column"]
+        window = f"PARTITION BY {rule['partition_by']} ORDER BY {rule['order_by']}"
+        return f"LAG({col}) OVER ({window})", (
+            f"COUNT_IF(ABS({col} / NULLIF({{w}}, 0) - 1) > "
+            f"{_literal(rule['max_abs_return'])})"
+        )
+    if kind == "row_count":
+        return None, "COUNT(*)"
+    raise ValueError(f"Unknown DQ rule type {kind!r} (expected one of {RULE_TYPES})")
+
+
+def compile_suite(table: str, suite: dict) -> str:
+    """
+    One SELECT returning a single row with one value per rule, in rule order.
+    Rules sharing a window (same keys, same LAG) share its column.
+    """
+    windows, aggregates = {}, []
+    for i, rule in enumerate(suite["rules"]):
+        window, aggregate = _rule_sql(rule)
+        if window:
+            alias = windows.setdefault(window, f"_DQ_{len(windows)}")
+            aggregate = aggregate.format(w=alias)
+        aggregates.append(f"{aggregate} AS R{i}")
+    where = f"\n    WHERE {suite['where']}" if suite.get("where") else ""
+    inner = ", ".join(["*"] + [f"{w} AS {alias}" for w, alias in windows.items()])
+    return (
+        "SELECT\n    " + ",\n    ".join(aggregates) + "\nFROM (\n"
+        f"    SELECT {inner}\n    FROM {table}{where}\n) t"
+    )
+
+
+def _rule_value(rule: dict, df: pd.DataFrame, today: datetime.date, shared: dict):
+    kind = rule["type"]
+    if kind == "not_null":
+        return int(df[rule["columns"]].isna().any(axis=1).sum())
+    if kind == "unique":
+        key = ("unique", tuple(rule["columns"]))
+        if key not in shared:
+            shared[key] = df.duplicated(rule["columns"], keep=False)
+        return int(shared[key].sum())
+    if kind == "freshness":
+        latest = pd.to_datetime(df[rule["column"]]).max()
+        return None if pd.isna(latest) else (today - latest.date()).days
+    if kind == "range":
+        values = pd.to_numeric(df[rule["column"]], errors="coerce")
+        inclusive = rule.get("inclusive", True)
+        out = pd.Series(False, index=df.index)
+        if rule.get("min") is not None:
+            out |= values < rule["min"] if inclusive else values <= rule["min"]
+        if rule.get("max") is not None:
+            out |= values > rule["max"] if inclusive else values >= rule["max"]
+        return int(out.sum())
+    if kind == "return_spike":
+        key = ("lag", rule["column"], rule["partition_by"], rule["order_by"])
+        if key not in shared:
+            ordered = df.sort_values(
+                [rule["partition_by"], rule["order_by"]], kind="stable"
+            )
+            values = pd.to_numeric(ordered[rule["column"]], errors="coerce")
+            prev = values.groupby(ordered[rule["partition_by"]], sort=False).shift(1)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                shared[key] = (values / prev.where(prev != 0) - 1).abs()
+        change = shared[key]
+        return int((change > rule["max_abs_return"]).sum())
+    if kind == "row_count":
+        return len(df)
+    raise ValueError(f"Unknown DQ rule type {kind!r} (expected one of {RULE_TYPES})")
+
+
+def suite_values(
+    df: pd.DataFrame, suite: dict, today: Optional[datetime.date] = None
+) -> tuple:
+    """The values compile_suite's query would return, computed on a local DataFrame."""
+    today = today or datetime.date.today()
+    shared = {}  # sorts and key groupings reused across rules
+    return tuple(_rule_value(rule, df, today, shared) for rule in suite["rules"])
+
+
+def evaluate_suite(table: str, suite: dict, values) -> list[dict]:
+    """PASS / WARN / FAIL for every rule from its measured value."""
+    results = []
+    for rule, value in zip(suite["rules"], values):
+        value = None if value is None or pd.isna(value) else int(value)
+        kind = rule["type"]
+        if kind == "freshness":
+            ok = value is not None and value <= rule["max_age_days"]
+        elif kind == "row_count":
+            ok = (value or 0) >= rule.get("min", 1)
+        else:
+            ok = (value or 0) <= rule.get("tolerance", 0)
+        severity = rule.get("severity", "error")
+        status = "PASS" if ok else ("FAIL" if severity == "error" else "WARN")
+        message = None if ok else f"{table}: {rule['name']} ({kind}) = {value}"
+        results.append(
+            {
+                "table": table,
+                "rule": rule["name"],
+                "type": kind,
+                "severity": severity,
+                "value": value,
+                "status": status,
+                "message": message,
+            }
+        )
+    return results
@@ -0,0 +1,319 @@
+"""
+Per-stage timing and resource spans for pipeline runs.
+
+    @task_span("build_fact_prices")          # root: reported when it exits
+    def main(): ...
+
+    with span("load.write_df", table=table) as s:
+        ...
+        s.add(rows_in=len(df), bytes=df.memory_usage(deep=True).sum())
+
+    @instrument("transform.fact_prices")     # rows in/out from DataFrame arg/result
+    def compute_fact_prices(bars, context=None): ...
+
+Spans nest through a context variable, so extract/transform/load calls made inside
+a task show up as its children. Each records wall time, CPU time (process-wide, so
+it includes pyarrow and fetch threads), RSS growth, the process's peak RSS so far,
+rows in/out and bytes moved. Spans opened in worker threads start their own tree
+unless given `parent=`.
+
+When a task span exits, the finished trees are written to
+DATA_DIR/reports/<run_id>/<task>-<pid>.json and, unless INSTRUMENT_MONITORING=0,
+inserted into PIPELINE_MONITORING as one row per span.
+"""
+
+import contextlib
+import contextvars
+import datetime
+import functools
+import json
+import os
+import re
+import resource
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Optional
+
+import pandas as pd
+from snowflake.connector.errors import Error as SnowflakeError
+
+from .io import reports_dir
+from .logging import log
+
+_current = contextvars.ContextVar("instrument_span", default=None)
+_finished = []
+_finished_lock = threading.Lock()
+_run_id = None
+
+MONITORING_SQL = """
+    INSERT INTO PORTFOLIO.ANALYTICS.PIPELINE_MONITORING
+        (run_id, run_date, task_name, status, record_count, error_message,
+         span_path, started_at, duration_s, cpu_s, peak_rss_mb,
+         rows_in, rows_out, bytes)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+"""
+
+
+def _proc_status_mb(field: str) -> Optional[float]:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def peak_rss_mb() -> float:
+    """Peak resident memory of this process in MB."""
+    # VmHWM starts afresh at exec; ru_maxrss also counts the parent's pre-fork peak
+    peak = _proc_status_mb("VmHWM:")
+    if peak is not None:
+        return peak
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def rss_mb() -> float:
+    """Current resident memory of this process in MB (the peak where unavailable)."""
+    rss = _proc_status_mb("VmRSS:")
+    return rss if rss is not None else peak_rss_mb()
+
+
+def run_id() -> str:
+    """Airflow's dag run id inside a task, otherwise one id per process."""
+    global _run_id
+    airflow_run = os.getenv("AIRFLOW_CTX_DAG_RUN_ID")
+    if airflow_run:
+        return airflow_run
+    if _run_id is None:
+        _run_id = (
+            f"local_{datetime.datetime.now():%Y%m%dT%H%M%S}_{uuid.uuid4().hex[:8]}"
+        )
+    return _run_id
+
+
+class Span:
+    def __init__(self, name: str, parent: Optional["Span"] = None, **attrs):
+        self.name = name
+        self.parent = parent
+        self.attrs = attrs
+        self.children = []
+        self.rows_in = 0
+        self.rows_out = 0
+        self.bytes = 0
+        self.status = "PASS"
+        self.error = None
+
+    @property
+    def path(self) -> str:
+        return f"{self.parent.path}/{self.name}" if self.parent else self.name
+
+    def add(self, rows_in: int = 0, rows_out: int = 0, bytes: int = 0):
+        self.rows_in += int(rows_in)
+        self.rows_out += int(rows_out)
+        self.bytes += int(bytes)
+
+    def _start(self):
+        self.started_at = datetime.datetime.now(datetime.UTC)
+        self._rss0 = rss_mb()
+        self._cpu0 = time.process_time()
+        self._t0 = time.perf_counter()
+
+    def _stop(self, error: Optional[BaseException]):
+        self.wall_s = time.perf_counter() - self._t0
+        self.cpu_s = time.process_time() - self._cpu0
+        self.rss_delta_mb = rss_mb() - self._rss0
+        self.peak_rss_mb = peak_rss_mb()
+        if error is not None:
+            self.status = "FAIL"
+            self.error = f"{type(error).__name__}: {error}"[:1000]
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "path": self.path,
+            "attrs": {k: str(v) for k, v in self.attrs.items()},
+            "started_at": self.started_at.isoformat(),
+            "wall_s": round(self.wall_s, 6),
+            "cpu_s": round(self.cpu_s, 6),
+            "rss_delta_mb": round(self.rss_delta_mb, 1),
+            "peak_rss_mb": round(self.peak_rss_mb, 1),
+            "rows_in": self.rows_in,
+            "rows_out": self.rows_out,
+            "bytes": self.bytes,
+            "status": self.status,
+            "error": self.error,
+            "children": [c.to_dict() for c in self.children],
+        }
+
+
+@contextlib.contextmanager
+def span(name: str, parent: Optional[Span] = None, **attrs):
+    """Time the enclosed block as a child of the current (or `parent`) span."""
+    parent = parent or _current.get()
+    s = Span(name, parent, **attrs)
+    token = _current.set(s)
+    s._start()
+    error = None
+    try:
+        yield s
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        s._stop(error)
+        _current.reset(token)
+        if parent is not None:
+            parent.children.append(s)
+        else:
+            with _finished_lock:
+                _finished.append(s)
+
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+
+def task_name() -> Optional[str]:
+    """Name of the outermost open span, i.e. the running task, if any."""
+    s = _current.get()
+    while s is not None and s.parent is not None:
+        s = s.parent
+    return s.name if s is not None else None
+
+
+def instrument(name: Optional[str] = None):
+    """
+    Decorator form of span(). The first DataFrame argument counts as rows in and a
+    DataFrame result as rows out.
+    """
+
+    def wrap(fn):
+        label = name or f"{fn.__module__.rsplit('.', 1)[-1]}.{fn.__name__}"
+
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            with span(label) as s:
+                frame = next(
+                    (
+                        a
+                        for a in (*args, *kwargs.values())
+                        if isinstance(a, pd.DataFrame)
+                    ),
+                    None,
+                )
+                if frame is not None:
+                    s.add(rows_in=len(frame))
+                result = fn(*args, **kwargs)
+                if isinstance(result, pd.DataFrame):
+                    s.add(rows_out=len(result))
+                return result
+
+        return inner
+
+    return wrap
+
+
+def _flatten(s: Span, depth: int = 0):
+    yield depth, s
+    for child in s.children:
+        yield from _flatten(child, depth + 1)
+
+
+def summary(root: Span) -> str:
+    """Indented one-line-per-span table of a finished tree."""
+    lines = []
+    for depth, s in _flatten(root):
+        label = "  " * depth + s.name
+        lines.append(
+            f"{label:<40} {s.wall_s:>9.3f}s wall {s.cpu_s:>8.3f}s cpu "
+            f"{s.rss_delta_mb:>+8.1f} MB rss (peak {s.peak_rss_mb:.0f}) "
+            f"rows {s.rows_in}->{s.rows_out} bytes {s.bytes} {s.status}"
+        )
+    return "\n".join(lines)
+
+
+def write_report(roots: list[Span], task: str) -> Path:
+    """DATA_DIR/reports/<run_id>/<task>-<pid>.json with the finished span trees."""
+    run = run_id()
+    out_dir = reports_dir() / re.sub(r"[^A-Za-z0-9_.-]", "_", run)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    path = out_dir / f"{re.sub(r'[^A-Za-z0-9_.-]', '_', task)}-{os.getpid()}.json"
+    report = {
+        "run_id": run,
+        "task": task,
+        "written_at": datetime.datetime.now(datetime.UTC).isoformat(),
+        "spans": [r.to_dict() for r in roots],
+    }
+    tmp = path.with_suffix(".json.tmp")
+    tmp.write_text(json.dumps(report, indent=1))
+    tmp.replace(path)
+    return path
+
+
+def record_monitoring(conn, roots: list[Span]) -> int:
+    """One PIPELINE_MONITORING row per span of the finished trees."""
+    run, today = run_id(), datetime.date.today()
+    rows = [
+        (
+            run,
+            today,
+            s.name,
+            s.status,
+            s.rows_out,
+            s.error,
+            s.path,
+            s.started_at.replace(tzinfo=None),
+            s.wall_s,
+            s.cpu_s,
+            s.peak_rss_mb,
+            s.rows_in,
+            s.rows_out,
+            s.bytes,
+        )
+        for root in roots
+        for _, s in _flatten(root)
+    ]
+    if rows:
+        conn.cursor().executemany(MONITORING_SQL, rows)
+    return len(rows)
+
+
+def flush(task: str):
+    """Report every span tree finished so far (local JSON, then PIPELINE_MONITORING)."""
+    with _finished_lock:
+        roots = list(_finished)
+        _finished.clear()
+    if not roots:
+        return None
+    for root in roots:
+        log(f"[PERF] {root.path}\n{summary(root)}")
+    path = write_report(roots, task)
+    log(f"[PERF] report written to {path}")
+    if os.getenv("INSTRUMENT_MONITORING", "1") != "1":
+        return path
+    try:
+        # Imported here: the loader itself is instrumented with this module
+        from ..load.snowflake_loader import sf_conn
+
+        with sf_conn(task) as conn:
+            n = record_monitoring(conn, roots)
+        log(f"[PERF] {n} spans recorded in PIPELINE_MONITORING")
+    except (SnowflakeError, OSError) as e:
+        # Timings must never fail the task they describe: connection, permission and
+        # network errors only cost this run's monitoring rows
+        log(f"[PERF] could not record spans in PIPELINE_MONITORING: {e}")
+    return path
+
+
+@contextlib.contextmanager
+def task_span(name: str, **attrs):
+    """Root span of a pipeline task; its tree is reported by flush() on exit."""
+    try:
+        with span(name, **attrs) as s:
+            yield s
+    finally:
+        flush(name)
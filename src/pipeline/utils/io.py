@@ -16,3 +16,9 @@ def processed_dir() -> Path:
     d = data_dir() / "processed"
     d.mkdir(parents=True, exist_ok=True)
     return d
+
+
+def reports_dir() -> Path:
+    d = data_dir() / "reports"
+    d.mkdir(parents=True, exist_ok=True)
+    return d
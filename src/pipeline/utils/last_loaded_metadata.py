@@ -10,7 +10,7 @@ def get_last_loaded_date(conn: SnowflakeConnection, source: str) -> Optional[str
     """
     cur = conn.cursor()
     sql = "SELECT last_loaded_date FROM RAW.LOAD_METADATA WHERE source = %s"
-    row = cur.execute(sql, (source)).fetchone()
+    row = cur.execute(sql, (source,)).fetchone()
     return str(row[0]) if row and row[0] else None
 
 
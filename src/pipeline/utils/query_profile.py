@@ -0,0 +1,185 @@
+"""
+Attribute Snowflake query cost to pipeline tasks and flag regressions.
+
+Pipeline connections tag every query with a JSON QUERY_TAG (query_tag()); query
+history rows are grouped by that tag into one profile row per (run, task), and
+each task's cost is compared with its trailing median over previous runs.
+Everything here works on plain DataFrames, so recorded query-history exports can
+be replayed locally (src/pipeline/bench/query_profile.py).
+"""
+
+import json
+import os
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+APP = "uk_portfolio_health"
+# QUERY_HISTORY columns summed per task -> profile column
+COST_COLUMNS = {
+    "TOTAL_ELAPSED_TIME": "ELAPSED_S",  # ms in query history
+    "EXECUTION_TIME": "EXECUTION_S",
+    "QUEUED_OVERLOAD_TIME": "QUEUED_S",
+    "BYTES_SCANNED": "BYTES_SCANNED",
+    "PARTITIONS_SCANNED": "PARTITIONS_SCANNED",
+    "PARTITIONS_TOTAL": "PARTITIONS_TOTAL",
+    "BYTES_SPILLED_TO_LOCAL_STORAGE": "BYTES_SPILLED_LOCAL",
+    "BYTES_SPILLED_TO_REMOTE_STORAGE": "BYTES_SPILLED_REMOTE",
+    "ROWS_PRODUCED": "ROWS_PRODUCED",
+}
+MILLISECOND_COLUMNS = {"ELAPSED_S", "EXECUTION_S", "QUEUED_S"}
+PROFILE_COLUMNS = [
+    "RUN_ID",
+    "DAG_ID",
+    "TASK_ID",
+    "RUN_START",
+    "RUN_END",
+    "QUERIES",
+    *COST_COLUMNS.values(),
+    "ELAPSED_RATIO",
+    "BYTES_RATIO",
+    "SPILL_RATIO",
+    "REGRESSION",
+]
+# profile column -> (ratio column, floor below which growth is noise)
+REGRESSION_METRICS = {
+    "ELAPSED_S": ("ELAPSED_RATIO", 1.0),
+    "BYTES_SCANNED": ("BYTES_RATIO", 10 * 2**20),
+    "BYTES_SPILLED": ("SPILL_RATIO", 2**20),
+}
+
+
+def query_tag(task: Optional[str] = None) -> str:
+    """
+    QUERY_TAG for a pipeline connection: dag, task, run and map index from the
+    Airflow task context, else `task` (or "local") and the local run id.
+    """
+    from .instrument import run_id
+
+    tag = {
+        "app": APP,
+        "dag": os.getenv("AIRFLOW_CTX_DAG_ID", "local"),
+        "task": os.getenv("AIRFLOW_CTX_TASK_ID") or task or "local",
+        "run": run_id(),
+    }
+    map_index = os.getenv("AIRFLOW_CTX_MAP_INDEX")
+    if map_index not in (None, "", "-1"):
+        tag["map_index"] = int(map_index)
+    return json.dumps(tag, separators=(",", ":"))
+
+
+def parse_query_tag(tag) -> Optional[dict]:
+    """The tag's fields if it is one of ours, else None."""
+    if not isinstance(tag, str) or not tag.startswith("{"):
+        return None
+    try:
+        fields = json.loads(tag)
+    except ValueError:
+        return None
+    if not isinstance(fields, dict) or fields.get("app") != APP:
+        return None
+    return fields
+
+
+def aggregate_by_task(history: pd.DataFrame) -> pd.DataFrame:
+    """
+    One row per (RUN_ID, TASK_ID) from QUERY_HISTORY rows (QUERY_TAG, START_TIME,
+    END_TIME and the COST_COLUMNS present). Untagged queries are ignored; mapped
+    task instances add up into their task.
+    """
+    history = history.rename(columns=str.upper)
+    tags = history["QUERY_TAG"].map(parse_query_tag)
+    keep = tags.notna().to_numpy()
+    history, tags = history[keep], tags[keep]
+    if len(history) == 0:
+        return pd.DataFrame(columns=PROFILE_COLUMNS[:-4] + ["BYTES_SPILLED"])
+
+    df = pd.DataFrame(
+        {
+            "RUN_ID": [t["run"] for t in tags],
+            "DAG_ID": [t["dag"] for t in tags],
+            "TASK_ID": [t["task"] for t in tags],
+            "START_TIME": pd.to_datetime(history["START_TIME"]).to_numpy(),
+            "END_TIME": pd.to_datetime(history["END_TIME"]).to_numpy(),
+        }
+    )
+    for src, dst in COST_COLUMNS.items():
+        if src in history:
+            values = pd.to_numeric(history[src], errors="coerce").fillna(0)
+            df[dst] = values.to_numpy(dtype=np.float64)
+        else:
+            df[dst] = 0.0
+    profile = df.groupby(["RUN_ID", "DAG_ID", "TASK_ID"], as_index=False).agg(
+        RUN_START=("START_TIME", "min"),
+        RUN_END=("END_TIME", "max"),
+        QUERIES=("START_TIME", "size"),
+        **{c: (c, "sum") for c in COST_COLUMNS.values()},
+    )
+    for col in MILLISECOND_COLUMNS:
+        profile[col] = profile[col] / 1000
+    profile["BYTES_SPILLED"] = (
+        profile["BYTES_SPILLED_LOCAL"] + profile["BYTES_SPILLED_REMOTE"]
+    )
+    return profile
+
+
+def flag_regressions(
+    profile: pd.DataFrame,
+    threshold: float = 1.5,
+    trailing: int = 10,
+    min_runs: int = 3,
+) -> pd.DataFrame:
+    """
+    Add *_RATIO columns (cost / median of the task's previous `trailing` runs,
+    needing at least `min_runs` of them) and REGRESSION, the comma-separated
+    metrics whose ratio exceeds `threshold` while above their noise floor.
+    """
+    profile = profile.sort_values(["TASK_ID", "RUN_START"], ignore_index=True)
+    profile["BYTES_SPILLED"] = profile["BYTES_SPILLED_LOCAL"].fillna(0) + profile[
+        "BYTES_SPILLED_REMOTE"
+    ].fillna(0)
+    by_task = profile.groupby("TASK_ID", sort=False)
+    flags = pd.Series("", index=profile.index)
+    for metric, (ratio_col, floor) in REGRESSION_METRICS.items():
+        median = by_task[metric].transform(
+            lambda s: s.shift(1).rolling(trailing, min_periods=min_runs).median()
+        )
+        with np.errstate(invalid="ignore", divide="ignore"):
+            ratio = profile[metric] / median.where(median > 0)
+        profile[ratio_col] = ratio
+        hit = (ratio > threshold) & (profile[metric] >= floor)
+        flags = flags.where(~hit, flags + "," + metric)
+    profile["REGRESSION"] = flags.str.lstrip(",").replace("", None)
+    return profile
+
+
+def completed_runs(
+    profile: pd.DataFrame,
+    current_run: Optional[str] = None,
+    settle_minutes: float = 45,
+    now=None,
+) -> pd.DataFrame:
+    """
+    Rows of runs other than `current_run` whose last query ended at least
+    `settle_minutes` before `now`, i.e. runs ACCOUNT_USAGE has caught up with.
+    Naive timestamps are taken as UTC.
+    """
+    now = pd.Timestamp.now(tz="UTC") if now is None else pd.Timestamp(now)
+    if now.tzinfo is None:
+        now = now.tz_localize("UTC")
+    run_end = pd.to_datetime(profile["RUN_END"], utc=True)
+    run_end = run_end.groupby(profile["RUN_ID"]).transform("max")
+    settled = run_end <= now - pd.Timedelta(minutes=settle_minutes)
+    return profile[(settled & (profile["RUN_ID"] != current_run)).to_numpy()]
+
+
+def new_regressions(flagged: pd.DataFrame, previous: pd.DataFrame) -> pd.DataFrame:
+    """Flagged rows whose (RUN_ID, TASK_ID) was not already flagged in `previous`."""
+    regressed = flagged[flagged["REGRESSION"].notna()]
+    if len(previous) == 0:
+        return regressed
+    keys = ["RUN_ID", "TASK_ID"]
+    alerted = previous.loc[previous["REGRESSION"].notna(), keys].drop_duplicates()
+    seen = regressed[keys].merge(alerted, on=keys, how="left", indicator=True)
+    return regressed[(seen["_merge"] == "left_only").to_numpy()]
@@ -0,0 +1,124 @@
+"""
+Task dependencies of the etl_uk_portfolio_health DAG, kept free of Airflow imports
+so the graph can be inspected (and its critical path computed) locally.
+
+Edges follow the data: each task waits only for the tasks that produce what it
+reads, so the market-data and transactions branches run side by side.
+"""
+
+import hashlib
+import json
+from pathlib import Path
+
+import pandas as pd
+
+# task_id -> upstream task_ids
+TASK_DEPENDENCIES = {
+    # DDL, skipped as a block when the schema files are unchanged
+    "check_schema_version": [],
+    "apply_roles": ["check_schema_version"],
+    "apply_schemas": ["apply_roles"],
+    "apply_tables": ["apply_schemas"],
+    "apply_metrics_view": ["apply_tables"],
+    "record_schema_version": ["apply_metrics_view"],
+    # Market data: EQUITY_DAILY, FX_DAILY, FACT_BENCHMARK -> FACT_PRICES
+    "plan_incremental_load": ["record_schema_version"],
+    "incremental_load": ["plan_incremental_load"],
+    "dq_check": ["incremental_load"],
+    "build_fact_prices": ["dq_check"],
+    # Transactions: PORTFOLIO_TRANSACTIONS -> position runs / daily positions
+    "load_transactions_csv": ["record_schema_version"],
+    "build_positions_daily": ["load_transactions_csv"],
+    # FACT_PRICES x PORTFOLIO_POSITIONS_DAILY -> FACT_PORTFOLIO_DAILY
+    "build_portfolio_metrics": ["build_fact_prices", "build_positions_daily"],
+    "build_advanced_metrics": ["build_portfolio_metrics"],
+    "export_snapshot": ["build_portfolio_metrics"],
+    "upload_s3_snapshot": ["export_snapshot"],
+    "profile_queries": ["build_advanced_metrics"],
+}
+
+# Files whose content defines the schema version
+DDL_FILES = [
+    "00_roles_warehouses.sql",
+    "01_db_schemas.sql",
+    "02_staging_tables.sql",
+    "04_portfolio_metrics.sql",
+]
+
+
+def schema_hash(sql_dir, files: list[str] = DDL_FILES) -> str:
+    """SHA-256 over the DDL files' names and contents."""
+    digest = hashlib.sha256()
+    for name in files:
+        digest.update(name.encode())
+        digest.update((Path(sql_dir) / name).read_bytes())
+    return digest.hexdigest()
+
+
+def topological_order(deps: dict = TASK_DEPENDENCIES) -> list[str]:
+    """Tasks ordered so every task comes after its upstreams; rejects cycles."""
+    order, state = [], {}
+
+    def visit(task):
+        if state.get(task) == "done":
+            return
+        if state.get(task) == "visiting":
+            raise ValueError(f"Cycle in task dependencies at {task}")
+        state[task] = "visiting"
+        for upstream in deps.get(task, []):
+            visit(upstream)
+        state[task] = "done"
+        order.append(task)
+
+    for task in deps:
+        visit(task)
+    return order
+
+
+def critical_path(durations: dict, deps: dict = TASK_DEPENDENCIES):
+    """
+    Longest chain of task durations (seconds) through the graph: the DAG's
+    end-to-end time with unlimited parallelism. Tasks without a timing (e.g.
+    skipped) count as 0. Returns (seconds, [task_id, ...]).
+    """
+    finish, via = {}, {}
+    for task in topological_order(deps):
+        upstream = max(deps.get(task, []), key=lambda u: finish[u], default=None)
+        start = finish[upstream] if upstream else 0.0
+        finish[task] = start + float(durations.get(task, 0.0))
+        via[task] = upstream
+    last = max(finish, key=finish.get)
+    path = []
+    while last:
+        path.append(last)
+        last = via[last]
+    return finish[path[0]], path[::-1]
+
+
+def load_timings(path: str):
+    """
+    Recorded task timings ({task_id: seconds} JSON, or JSON/CSV records with
+    task_id and duration or start_date/end_date) as
+    ({task_id: seconds}, observed wall seconds or None).
+    """
+    path = Path(path)
+    if path.suffix == ".json":
+        raw = json.loads(path.read_text())
+        if isinstance(raw, dict):
+            return {k: float(v) for k, v in raw.items()}, None
+        df = pd.DataFrame(raw)
+    else:
+        df = pd.read_csv(path)
+    df.columns = [c.lower() for c in df.columns]
+    wall = None
+    if {"start_date", "end_date"} <= set(df.columns):
+        start = pd.to_datetime(df["start_date"], utc=True, format="mixed")
+        end = pd.to_datetime(df["end_date"], utc=True, format="mixed")
+        if "duration" not in df.columns:
+            df["duration"] = (end - start).dt.total_seconds()
+        if start.notna().any():
+            wall = (end.max() - start.min()).total_seconds()
+    # Mapped tasks (incremental_load) have a row per map_index; the stage takes as
+    # long as its slowest instance
+    durations = df["duration"].fillna(0).astype(float).groupby(df["task_id"]).max()
+    return durations.to_dict(), wall
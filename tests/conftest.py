@@ -0,0 +1,125 @@
+import sys
+from pathlib import Path
+
+import duckdb
+import numpy as np
+import pandas as pd
+import pytest
+
+# Jobs are imported as src.pipeline..., as the DAG and `python -m` do
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+END = "2025-09-30"
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """DATA_DIR pointed at a fresh temporary directory."""
+    monkeypatch.setenv("DATA_DIR", str(tmp_path))
+    return tmp_path
+
+
+@pytest.fixture
+def warehouse():
+    """DuckDB with PORTFOLIO.RAW and PORTFOLIO.ANALYTICS, standing in for Snowflake."""
+    con = duckdb.connect()
+    con.execute("ATTACH ':memory:' AS PORTFOLIO")
+    con.execute("CREATE SCHEMA PORTFOLIO.RAW")
+    con.execute("CREATE SCHEMA PORTFOLIO.ANALYTICS")
+    yield con
+    con.close()
+
+
+class DuckCursor:
+    """The Snowflake cursor calls the jobs make (pyformat params), on DuckDB."""
+
+    def __init__(self, con):
+        self.con = con
+
+    def execute(self, sql, params=()):
+        self.con.execute(sql.replace("%s", "?"), list(params))
+        return self
+
+    def fetchone(self):
+        return self.con.fetchone()
+
+    def fetch_pandas_all(self):
+        return self.con.fetchdf()
+
+
+@pytest.fixture
+def cursor(warehouse):
+    """A cursor on the `warehouse` DuckDB, for job queries written for Snowflake."""
+    return DuckCursor(warehouse)
+
+
+@pytest.fixture(scope="session")
+def market_data():
+    """
+    (EQUITY_DAILY, FX_DAILY) for 20 symbols over a year of business days: 2% of
+    bars missing, a few NULL closes, and USDGBP fixes missing some days.
+    """
+    rng = np.random.default_rng(0)
+    days = pd.bdate_range(end=END, periods=252)
+    n = 20 * len(days)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    close[rng.random(n) < 0.002] = np.nan
+    equity = pd.DataFrame(
+        {
+            "SYMBOL": np.repeat([f"S{i:04d}" for i in range(20)], len(days)),
+            "DATE": np.tile(days.values, 20),
+            "OPEN": close,
+            "HIGH": close * 1.01,
+            "LOW": close * 0.99,
+            "CLOSE": close,
+            "VOLUME": rng.integers(1_000, 1_000_000, n),
+        }
+    )
+    equity = equity[rng.random(n) > 0.02].reset_index(drop=True)
+    fx = pd.DataFrame(
+        {"PAIR": "USDGBP", "DATE": days, "RATE": rng.uniform(0.75, 0.82, len(days))}
+    )
+    fx = fx[rng.random(len(days)) > 0.03].reset_index(drop=True)
+    return equity, fx
+
+
+@pytest.fixture(scope="session")
+def portfolio_returns():
+    """
+    (VIEW_PORTFOLIO_METRICS rows, FACT_BENCHMARK) for 40 portfolios over two years.
+    Portfolios start on different days, some returns are NULL, the benchmark skips
+    a few dates, P00000 has a flat stretch and P00001 non-positive values.
+    """
+    rng = np.random.default_rng(0)
+    days = pd.bdate_range(end=END, periods=2 * 252)
+    portfolios, n_days = 40, len(days)
+
+    rets = rng.normal(0.0004, 0.01, size=(portfolios, n_days))
+    rets[rng.random(rets.shape) < 0.02] = np.nan
+    rets[:, 0] = np.nan
+    rets[0, :45] = 0.0
+    values = 10_000 * np.cumprod(1 + np.nan_to_num(rets), axis=1)
+    values[rng.random(values.shape) < 0.005] = np.nan
+    values[1] = -values[1]
+
+    first_day = rng.integers(0, n_days // 4, size=portfolios)
+    keep = (np.arange(n_days)[None, :] >= first_day[:, None]).ravel()
+    ids = np.array([f"P{i:05d}" for i in range(portfolios)], dtype=object)
+    base = pd.DataFrame(
+        {
+            "PORTFOLIO_ID": np.repeat(ids, n_days)[keep],
+            "DATE": np.tile(days.values, portfolios)[keep],
+            "WEIGHTED_DAILY_RETURN": rets.ravel()[keep],
+            "TOTAL_VALUE_GBP": values.ravel()[keep],
+        }
+    )
+
+    bench_days = days[rng.random(n_days) > 0.03]
+    benchmark = pd.DataFrame(
+        {
+            "SYMBOL": "SPY",
+            "DATE": bench_days,
+            "CLOSE": 400 * np.cumprod(1 + rng.normal(0.0003, 0.011, len(bench_days))),
+        }
+    )
+    return base, benchmark
@@ -0,0 +1,24 @@
+import json
+
+from src.pipeline.utils.task_graph import critical_path, load_timings
+
+
+def test_mapped_task_counts_its_slowest_instance(tmp_path):
+    records = [
+        {"task_id": "incremental_load", "map_index": 0, "duration": 40.0},
+        {"task_id": "incremental_load", "map_index": 1, "duration": 300.0},
+        {"task_id": "incremental_load", "map_index": 2, "duration": 25.0},
+        {"task_id": "dq_check", "map_index": -1, "duration": 10.0},
+        {"task_id": "build_fact_prices", "map_index": -1, "duration": None},
+    ]
+    path = tmp_path / "run.json"
+    path.write_text(json.dumps(records))
+
+    durations, wall = load_timings(path)
+
+    assert durations["incremental_load"] == 300.0
+    assert durations["build_fact_prices"] == 0.0
+    assert wall is None
+    total, path = critical_path(durations)
+    assert total == 310.0
+    assert path[-2:] == ["incremental_load", "dq_check"]
@@ -0,0 +1,67 @@
+import pandas as pd
+
+from src.pipeline.extract import alpha
+from src.pipeline.jobs import incremental_load
+
+OVERVIEWS = {
+    "AAPL": {"Symbol": "AAPL", "Name": "Apple Inc", "Currency": "USD"},
+    "VOD.LON": {"Symbol": "VOD.LON", "Name": "Vodafone Group", "Currency": "GBX"},
+    "SPY": {},  # ETFs have no overview
+}
+
+
+def fake_alpha_get(params, limiter=None, allow_empty=False, **kwargs):
+    assert params["function"] == "OVERVIEW" and allow_empty
+    return OVERVIEWS[params["symbol"]]
+
+
+def test_fetch_overviews_reads_name_and_currency(monkeypatch):
+    monkeypatch.setattr(alpha, "_alpha_get", fake_alpha_get)
+    df = alpha.fetch_overviews(["aapl", "VOD.LON", "SPY"], max_workers=2)
+    assert df["symbol"].tolist() == ["AAPL", "VOD.LON", "SPY"]
+    assert df["company_name"].tolist()[:2] == ["Apple Inc", "Vodafone Group"]
+    assert df["currency"].tolist()[:2] == ["USD", "GBX"]
+    assert df.iloc[2][["company_name", "currency"]].isna().all()
+
+
+def test_load_dim_symbol_only_fetches_symbols_without_currency(monkeypatch, warehouse):
+    con = warehouse
+    con.execute(
+        "CREATE TABLE PORTFOLIO.ANALYTICS.DIM_SYMBOL "
+        "(SYMBOL STRING PRIMARY KEY, COMPANY_NAME STRING, CURRENCY STRING)"
+    )
+    con.execute(
+        "INSERT INTO PORTFOLIO.ANALYTICS.DIM_SYMBOL VALUES "
+        "('AAPL', 'Apple Inc', 'USD'), ('SPY', NULL, NULL)"
+    )
+    fetched, upserted = [], []
+    monkeypatch.setattr(alpha, "_alpha_get", fake_alpha_get)
+    monkeypatch.setattr(
+        incremental_load,
+        "fetch_overviews",
+        lambda symbols: fetched.extend(symbols) or alpha.fetch_overviews(symbols),
+    )
+    monkeypatch.setattr(
+        incremental_load,
+        "upsert_df",
+        lambda conn, df, table, keys, schema: upserted.append((df, table, keys)),
+    )
+
+    incremental_load.load_dim_symbol(con, ["AAPL", "vod.lon", "SPY"])
+
+    assert fetched == ["VOD.LON", "SPY"]
+    ((df, table, keys),) = upserted
+    assert (table, keys) == ("DIM_SYMBOL", ["SYMBOL"])
+    assert list(df.columns) == ["SYMBOL", "COMPANY_NAME", "CURRENCY"]
+    currency = df.set_index("SYMBOL")["CURRENCY"]
+    assert currency["VOD.LON"] == "GBX" and pd.isna(currency["SPY"])
+
+    upserted.clear()
+    con.execute(
+        "UPDATE PORTFOLIO.ANALYTICS.DIM_SYMBOL SET CURRENCY = 'USD' WHERE SYMBOL = 'SPY'"
+    )
+    con.execute(
+        "INSERT INTO PORTFOLIO.ANALYTICS.DIM_SYMBOL VALUES ('VOD.LON', NULL, 'GBX')"
+    )
+    incremental_load.load_dim_symbol(con, ["AAPL", "VOD.LON", "SPY"])
+    assert upserted == []
@@ -0,0 +1,119 @@
+import datetime
+
+import duckdb
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.pipeline.utils.dq import DQ_SUITES, compile_suite, evaluate_suite, suite_values
+
+EQUITY = "PORTFOLIO.RAW.EQUITY_DAILY"
+TABLES = {EQUITY: "equity_daily", "PORTFOLIO.RAW.FX_DAILY": "fx_daily"}
+
+
+def with_defects(df: pd.DataFrame, value_col: str, seed: int = 1) -> pd.DataFrame:
+    """A few NULLs, duplicate keys, non-positive values and 3x spikes."""
+    rng = np.random.default_rng(seed)
+    df = df.copy()
+    n = len(df)
+    df.loc[rng.choice(n, 5, replace=False), value_col] = np.nan
+    df.loc[rng.choice(n, 3, replace=False), value_col] = -1.0
+    spikes = rng.choice(n, 7, replace=False)
+    df.loc[spikes, value_col] = df.loc[spikes, value_col] * 3
+    return pd.concat([df, df.sample(4, random_state=seed)], ignore_index=True)
+
+
+def scaled_suite(suite: dict, size: int) -> dict:
+    """`size` distinct rules: the suite's own, then variants with other thresholds."""
+    rules = []
+    i = 0
+    while len(rules) < size:
+        for rule in suite["rules"]:
+            if len(rules) == size:
+                break
+            variant = dict(rule, name=f"{rule['name']}_{i}")
+            if rule["type"] == "return_spike":
+                variant["max_abs_return"] = rule["max_abs_return"] * (1 + i / 10)
+            elif rule["type"] == "range":
+                variant["min"] = rule.get("min", 0) - i
+            elif rule["type"] == "freshness":
+                variant["max_age_days"] = rule["max_age_days"] + i
+            rules.append(variant)
+        i += 1
+    return {"rules": rules}
+
+
+def run_compiled(con, table: str, suite: dict) -> tuple:
+    return con.execute(compile_suite(table, suite)).fetchone()
+
+
+def run_per_rule(con, table: str, suite: dict) -> tuple:
+    return tuple(
+        con.execute(compile_suite(table, {"rules": [rule]})).fetchone()[0]
+        for rule in suite["rules"]
+    )
+
+
+@pytest.fixture(scope="module")
+def frames(market_data):
+    equity, fx = market_data
+    return {
+        "equity_daily": with_defects(equity, "CLOSE"),
+        "fx_daily": with_defects(fx, "RATE"),
+    }
+
+
+@pytest.fixture(scope="module")
+def con(frames):
+    con = duckdb.connect()
+    for name, df in frames.items():
+        con.register(name, df)
+    return con
+
+
+@pytest.mark.parametrize("table", sorted(TABLES))
+def test_compiled_query_matches_per_rule_and_local(con, frames, table):
+    suite, local = DQ_SUITES[table], TABLES[table]
+    compiled = run_compiled(con, local, suite)
+    assert list(compiled) == list(run_per_rule(con, local, suite))
+    assert list(compiled) == list(suite_values(frames[local], suite))
+    # with_defects injects NULLs, duplicate keys and non-positive values
+    not_null, unique, _, out_of_range, _ = compiled
+    assert not_null > 0 and unique > 0 and out_of_range > 0
+
+
+def test_scaled_suite_matches(con, frames):
+    suite = scaled_suite(DQ_SUITES[EQUITY], 20)
+    assert len({r["name"] for r in suite["rules"]}) == 20
+    compiled = run_compiled(con, "equity_daily", suite)
+    assert list(compiled) == list(run_per_rule(con, "equity_daily", suite))
+    assert list(compiled) == list(suite_values(frames["equity_daily"], suite))
+
+
+def test_rule_values_and_statuses():
+    today = datetime.date.today()
+    days_ago = [pd.Timestamp(today - datetime.timedelta(days=n)) for n in range(4)]
+    df = pd.DataFrame(
+        {
+            "SYMBOL": ["A", "A", "A", "A", "B", "B"],
+            "DATE": [days_ago[3], days_ago[2], days_ago[1], days_ago[1]]
+            + [days_ago[2], days_ago[1]],
+            "CLOSE": [10.0, 20.0, None, 21.0, 5.0, -1.0],
+        }
+    )
+    suite = DQ_SUITES[EQUITY]
+    con = duckdb.connect()
+    con.register("equity", df)
+    values = run_compiled(con, "equity", suite)
+    assert list(values) == list(suite_values(df, suite, today)) == [1, 2, 1, 1, 2]
+
+    statuses = {r["rule"]: r["status"] for r in evaluate_suite(EQUITY, suite, values)}
+    assert statuses == {
+        "EQUITY_DAILY_NOT_NULL": "FAIL",
+        "EQUITY_DAILY_PK_UNIQUE": "WARN",
+        "EQUITY_DAILY_FRESHNESS": "PASS",
+        "EQUITY_DAILY_CLOSE_RANGE": "FAIL",
+        "EQUITY_DAILY_RETURN_SPIKE": "WARN",
+    }
+    stale = evaluate_suite(EQUITY, suite, [0, 0, None, 0, 0])
+    assert [r["status"] for r in stale] == ["PASS", "PASS", "WARN", "PASS", "PASS"]
@@ -0,0 +1,149 @@
+import duckdb
+import numpy as np
+import pandas as pd
+
+from src.pipeline.jobs import fact_prices
+from src.pipeline.jobs.fact_prices import BARS_SQL
+from src.pipeline.transform.fx import convert_to_gbp, rate_matrix
+from src.pipeline.transform.prices import CONTEXT_ROWS, compute_fact_prices
+
+# 03_analytics_table.sql's window SELECT in DuckDB dialect, over all of history
+REFERENCE_SQL = """
+SELECT
+    SYMBOL,
+    DATE,
+    (CLOSE / LAG(CLOSE) OVER (PARTITION BY SYMBOL ORDER BY DATE)) - 1 AS DAILY_RETURN,
+    AVG(CLOSE) OVER (
+        PARTITION BY SYMBOL ORDER BY DATE ROWS BETWEEN 6 PRECEDING AND CURRENT ROW
+    ) AS ROLLING_7D_AVG_CLOSE,
+    STDDEV_SAMP(CLOSE) OVER (
+        PARTITION BY SYMBOL ORDER BY DATE ROWS BETWEEN 29 PRECEDING AND CURRENT ROW
+    ) AS ROLLING_30D_VOLATILITY
+FROM equity_daily
+"""
+CHECKED = ["DAILY_RETURN", "ROLLING_7D_AVG_CLOSE", "ROLLING_30D_VOLATILITY"]
+
+
+def run_sql(equity: pd.DataFrame) -> pd.DataFrame:
+    con = duckdb.connect()
+    con.register("equity_daily", equity)
+    return con.execute(REFERENCE_SQL).df()
+
+
+def joined(equity: pd.DataFrame, fx: pd.DataFrame) -> pd.DataFrame:
+    """BARS_SQL without DIM_SYMBOL (all USD listings), converted as the job does."""
+    return convert_to_gbp(equity.assign(CURRENCY="USD"), rate_matrix(fx))
+
+
+def replay_incremental(bars: pd.DataFrame, runs: int) -> pd.DataFrame:
+    """A build to a cutoff, then `runs` daily builds fed CONTEXT_SQL's look-back."""
+    days = np.sort(bars["DATE"].unique())
+    done = [compute_fact_prices(bars[bars["DATE"] <= days[-runs - 1]])]
+    for prev, day in zip(days[-runs - 1 : -1], days[-runs:]):
+        past = bars[bars["DATE"] <= prev].sort_values("DATE")
+        context = past.groupby("SYMBOL", sort=False).tail(CONTEXT_ROWS)
+        new = bars[bars["DATE"] == day]
+        done.append(compute_fact_prices(new, context[["SYMBOL", "DATE", "CLOSE"]]))
+    return pd.concat(done, ignore_index=True)
+
+
+def assert_matches(ours: pd.DataFrame, ref: pd.DataFrame):
+    keys = ["SYMBOL", "DATE"]
+    ours, ref = ours.copy(), ref.copy()
+    for df in (ours, ref):
+        df["DATE"] = pd.to_datetime(df["DATE"])
+    merged = ours.merge(ref, on=keys, suffixes=("", "_SQL"), validate="one_to_one")
+    assert len(merged) == len(ours) == len(ref)
+    for col in CHECKED:
+        a = merged[col].to_numpy(dtype=np.float64)
+        b = merged[f"{col}_SQL"].to_numpy(dtype=np.float64)
+        bad = ~np.isclose(a, b, rtol=1e-9, atol=1e-9, equal_nan=True)
+        assert not bad.any(), f"{col}: {bad.sum()} of {len(a)} values differ"
+
+
+def test_full_build_matches_sql_windows(market_data):
+    equity, fx = market_data
+    assert_matches(compute_fact_prices(joined(equity, fx)), run_sql(equity))
+
+
+def test_incremental_with_29_row_look_back_matches_full_recompute(market_data):
+    assert CONTEXT_ROWS == 29
+    equity, fx = market_data
+    assert_matches(replay_incremental(joined(equity, fx), runs=15), run_sql(equity))
+
+
+def load_tables(con, equity: pd.DataFrame, built: pd.DataFrame):
+    """EQUITY_DAILY, DIM_SYMBOL, FACT_PRICES and LOAD_METADATA under their Snowflake names."""
+    con.register("equity", equity)
+    con.register("built", built)
+    con.execute("CREATE TABLE PORTFOLIO.RAW.EQUITY_DAILY AS SELECT * FROM equity")
+    con.execute("CREATE TABLE PORTFOLIO.ANALYTICS.FACT_PRICES AS SELECT * FROM built")
+    con.execute(
+        "CREATE TABLE PORTFOLIO.ANALYTICS.DIM_SYMBOL "
+        "(SYMBOL VARCHAR, COMPANY_NAME VARCHAR, CURRENCY VARCHAR)"
+    )
+    con.execute(
+        "CREATE TABLE PORTFOLIO.RAW.LOAD_METADATA (SOURCE VARCHAR, LAST_LOADED_DATE DATE)"
+    )
+    con.execute(
+        "INSERT INTO PORTFOLIO.RAW.LOAD_METADATA VALUES ('equities', '2025-01-01')"
+    )
+
+
+def test_late_symbol_is_picked_up_below_other_symbols_dates(
+    monkeypatch, warehouse, cursor
+):
+    days = pd.bdate_range("2025-01-01", periods=60)
+    equity = pd.DataFrame(
+        {
+            "SYMBOL": np.repeat(["AAA", "BBB", "NEW"], len(days)),
+            "DATE": np.tile(days.date, 3),
+            "OPEN": 1.0,
+            "HIGH": 1.0,
+            "LOW": 1.0,
+            "CLOSE": np.arange(3 * len(days), dtype=float) + 1,
+            "VOLUME": 100,
+        }
+    )
+    # AAA is built to the last day; BBB's load failed 10 days earlier; NEW never ran
+    built = pd.DataFrame(
+        {
+            "SYMBOL": ["AAA"] * 60 + ["BBB"] * 50,
+            "DATE": list(days.date) + list(days.date[:50]),
+        }
+    )
+    con = warehouse
+    load_tables(con, equity, built)
+    monkeypatch.setattr(
+        fact_prices,
+        "update_last_loaded_date",
+        lambda conn, source, date: con.execute(
+            "INSERT INTO PORTFOLIO.RAW.LOAD_METADATA VALUES (?, ?)", [source, date]
+        ),
+    )
+
+    # Seeded once from FACT_PRICES, then read from LOAD_METADATA alone
+    watermarks = fact_prices._watermarks(con, cursor)
+    assert watermarks == {"AAA": str(days[59].date()), "BBB": str(days[49].date())}
+    con.execute("DROP TABLE PORTFOLIO.ANALYTICS.FACT_PRICES")
+    assert fact_prices._watermarks(con, cursor) == watermarks
+
+    where, params = fact_prices._bars_filter(["AAA", "BBB", "NEW"], watermarks)
+    bars = cursor.execute(BARS_SQL.format(filter=where), params).fetch_pandas_all()
+    got = bars.groupby("SYMBOL")["DATE"].agg(["min", "max", "count"])
+    assert "AAA" not in got.index
+    assert got.loc["BBB", "count"] == 10
+    assert pd.Timestamp(got.loc["BBB", "min"]) == days[50]
+    assert got.loc["NEW", "count"] == 60
+
+    context = fact_prices._context(cursor, {"BBB": watermarks["BBB"]})
+    assert set(context["SYMBOL"]) == {"BBB"}
+    assert len(context) == CONTEXT_ROWS
+    assert pd.Timestamp(context["DATE"].max()) == days[49]
+    # Too few rows within CONTEXT_DAYS: re-read without the lower bound
+    monkeypatch.setattr(fact_prices, "CONTEXT_DAYS", 10)
+    reread = fact_prices._context(cursor, {"BBB": watermarks["BBB"]})
+    assert sorted(reread["DATE"]) == sorted(context["DATE"])
+
+    everything = cursor.execute(BARS_SQL.format(filter="TRUE")).fetch_pandas_all()
+    assert len(everything) == len(equity)
@@ -0,0 +1,122 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.pipeline.transform.fx import RateMatrix, convert_to_gbp, rate_matrix
+
+FX = pd.DataFrame(
+    {
+        # Thu, Fri, then Mon: the weekend carries Friday's fixes
+        "PAIR": ["USDGBP", "USDGBP", "USDGBP", "EURUSD", "EURUSD", "EURCHF"],
+        "DATE": pd.to_datetime(
+            ["2025-01-02", "2025-01-03", "2025-01-06"]
+            + ["2025-01-02", "2025-01-03", "2025-01-03"]
+        ),
+        "RATE": [0.80, 0.81, 0.82, 1.05, 1.04, 0.94],
+    }
+)
+
+
+def gbp(currency, date):
+    return RateMatrix(FX).factors([currency], [pd.Timestamp(date)])[0]
+
+
+def test_direct_and_inverse_pairs():
+    assert gbp("USD", "2025-01-02") == pytest.approx(0.80)
+    assert gbp("GBP", "2025-01-02") == pytest.approx(1.0)
+    assert RateMatrix(FX).factors(["GBP"], [pd.Timestamp("2025-01-02")], "USD")[
+        0
+    ] == pytest.approx(1 / 0.80)
+
+
+def test_rates_carry_forward_over_missing_days():
+    assert gbp("USD", "2025-01-04") == pytest.approx(0.81)  # Saturday
+    assert gbp("USD", "2025-01-05") == pytest.approx(0.81)
+    assert gbp("EUR", "2025-01-06") == pytest.approx(1.04 * 0.82)  # EURUSD stale
+    assert gbp("USD", "2025-02-01") == pytest.approx(0.82)  # after the last fix
+
+
+def test_cross_is_triangulated_through_its_quoted_leg():
+    # EURCHF: 1 EUR = 0.94 CHF, EUR = 1.04 USD, USD = 0.81 GBP
+    assert gbp("CHF", "2025-01-03") == pytest.approx(1.04 / 0.94 * 0.81)
+    assert np.isnan(gbp("CHF", "2025-01-02"))  # before the cross's first fix
+
+
+def test_minor_units_and_unknown_currencies():
+    assert gbp("GBX", "2025-01-03") == pytest.approx(0.01)
+    assert gbp("GBp", "2025-01-03") == pytest.approx(0.01)
+    assert np.isnan(gbp("JPY", "2025-01-03"))
+    assert np.isnan(gbp("USD", "2025-01-01"))  # before the first fix
+
+
+def test_convert_to_gbp_defaults_missing_currency_to_usd():
+    bars = pd.DataFrame(
+        {"DATE": pd.to_datetime(["2025-01-03"] * 3), "CURRENCY": ["EUR", None, "GBX"]}
+    )
+    out = convert_to_gbp(bars, rate_matrix(FX))
+    assert out["USD_TO_GBP"].tolist() == pytest.approx([0.81] * 3)
+    assert out["FX_TO_GBP"].tolist() == pytest.approx([1.04 * 0.81, 0.81, 0.01])
+
+
+# EURCHF is a cross, triangulated through EUR and USD
+PAIRS = {"USDGBP": 0.79, "EURUSD": 1.08, "USDJPY": 150.0, "EURCHF": 0.95}
+CURRENCIES = ["USD", "EUR", "GBP", "GBX", "JPY", "CHF"]
+
+
+def synthetic_fx(years: int, seed: int = 0) -> pd.DataFrame:
+    """Random-walk fixes for PAIRS, each missing a few business days."""
+    rng = np.random.default_rng(seed)
+    days = pd.bdate_range(end="2025-09-30", periods=252 * years)
+    parts = []
+    for pair, level in PAIRS.items():
+        rate = level * np.exp(np.cumsum(rng.normal(0, 0.004, len(days))))
+        keep = rng.random(len(days)) > 0.03
+        parts.append(
+            pd.DataFrame({"PAIR": pair, "DATE": days[keep], "RATE": rate[keep]})
+        )
+    return pd.concat(parts, ignore_index=True)
+
+
+def synthetic_prices(rows: int, fx: pd.DataFrame, seed: int = 1) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    first, last = fx["DATE"].min(), fx["DATE"].max()
+    span = (last - first).days
+    # A few days before the first fix and after the last one
+    offsets = rng.integers(-5, span + 5, rows)
+    return pd.DataFrame(
+        {
+            "DATE": first + pd.to_timedelta(offsets, unit="D"),
+            "CURRENCY": rng.choice(CURRENCIES, rows),
+        }
+    )
+
+
+def reference(prices: pd.DataFrame, fx: pd.DataFrame) -> np.ndarray:
+    """GBP per unit of each row's currency via merge_asof on every pair."""
+    rows = prices.reset_index().sort_values("DATE")
+    for pair in PAIRS:
+        quotes = fx.loc[fx["PAIR"] == pair, ["DATE", "RATE"]].sort_values("DATE")
+        rows = pd.merge_asof(rows, quotes.rename(columns={"RATE": pair}), on="DATE")
+    usd_per = {
+        "USD": 1.0,
+        "GBP": 1 / rows["USDGBP"],
+        "EUR": rows["EURUSD"],
+        "JPY": 1 / rows["USDJPY"],
+        "CHF": rows["EURUSD"] / rows["EURCHF"],
+    }
+    out = pd.Series(np.nan, index=rows.index)
+    for currency in CURRENCIES:
+        mask = rows["CURRENCY"] == currency
+        base, scale = ("GBP", 0.01) if currency == "GBX" else (currency, 1.0)
+        value = usd_per[base] * scale / usd_per["GBP"]
+        out[mask] = value[mask] if isinstance(value, pd.Series) else value
+    return out.set_axis(rows["index"]).sort_index().to_numpy()
+
+
+def test_matrix_matches_merge_asof_reference():
+    fx = synthetic_fx(years=2)
+    prices = synthetic_prices(50_000, fx)
+    ours = rate_matrix(fx).factors(prices["CURRENCY"], prices["DATE"], "GBP")
+    ref = reference(prices, fx)
+    assert np.isclose(ours, ref, rtol=1e-12, atol=0, equal_nan=True).all()
+    assert rate_matrix(fx) is rate_matrix(fx.copy())  # memoized on content
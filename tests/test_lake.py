@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+
+from src.pipeline.load.lake import read_prices, scan
+from src.pipeline.load.local import compact_partitions, write_partitioned
+
+
+def bars(symbols, days, close):
+    dates = pd.bdate_range("2024-12-20", periods=days)
+    return pd.DataFrame(
+        {
+            "SYMBOL": np.repeat(symbols, len(dates)),
+            "DATE": np.tile(dates.values, len(symbols)),
+            "CLOSE": float(close),
+        }
+    )
+
+
+def write(df):
+    write_partitioned(
+        df,
+        "equity_daily",
+        ["SYMBOL", "DATE"],
+        granularity="year",
+        keys=["SYMBOL", "DATE"],
+    )
+
+
+def test_retried_partition_returns_each_row_once(data_dir):
+    write(bars(["AAPL", "MSFT"], 20, close=1))
+    write(bars(["AAPL"], 20, close=2))  # retry of AAPL with corrected closes
+
+    prices = read_prices()
+    assert len(prices) == 40
+    assert not prices.duplicated(["SYMBOL", "DATE"]).any()
+    assert set(prices.loc[prices["SYMBOL"] == "AAPL", "CLOSE"]) == {2.0}
+    assert set(prices.loc[prices["SYMBOL"] == "MSFT", "CLOSE"]) == {1.0}
+
+    # Keys are dropped from the result when not requested
+    table, stats = scan("equity_daily", ["AAPL"], "2025-01-01", None, ["CLOSE"])
+    assert table.column_names == ["CLOSE"]
+    assert stats["duplicates"] == table.num_rows
+    assert set(table["CLOSE"].to_pylist()) == {2.0}
+
+
+def test_scan_matches_after_compaction(data_dir):
+    for close in range(1, 9):
+        write(bars(["AAPL"], 10, close=close))
+    before = read_prices()
+    assert compact_partitions("equity_daily")
+    after = read_prices()
+    pd.testing.assert_frame_equal(before, after, check_dtype=False)
+    assert set(after["CLOSE"]) == {8.0}
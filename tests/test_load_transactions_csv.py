@@ -0,0 +1,152 @@
+import duckdb
+import pandas as pd
+import pytest
+
+from src.pipeline.jobs.load_transactions_csv import (
+    COLUMNS,
+    STAGE_TABLE,
+    TARGET_TABLE,
+    _checkpoint_path,
+    _truncate_stage,
+    finish_load,
+    read_chunks,
+    stream_csv,
+)
+from src.pipeline.load.delta import RowHashIndex, file_fingerprint
+
+
+def write_transactions(path, n: int, start: int = 0):
+    pd.DataFrame(
+        {
+            "transaction_id": [f"T{i:05d}" for i in range(start, start + n)],
+            "portfolio_id": "P1",
+            "symbol": ["AAPL", "MSFT"] * (n // 2) + ["AAPL"] * (n % 2),
+            "quantity_delta": [float(i) for i in range(n)],
+            "transaction_date": "2025-01-02",
+            "transaction_type": "BUY",
+            "note": "ignored",
+        }
+    ).to_csv(path, index=False)
+
+
+def test_read_chunks_resumes_after_skipped_chunks(tmp_path):
+    path = tmp_path / "transactions.csv"
+    write_transactions(path, 25)
+
+    full = list(read_chunks(path, chunk_rows=10))
+    resumed = list(read_chunks(path, chunk_rows=10, skip_chunks=2))
+
+    assert [(line, len(c)) for line, c in full] == [(2, 10), (12, 10), (22, 5)]
+    assert [line for line, _ in resumed] == [22]
+    pd.testing.assert_frame_equal(
+        resumed[0][1].reset_index(drop=True), full[2][1].reset_index(drop=True)
+    )
+    assert list(resumed[0][1].columns) == list(full[0][1].columns)
+    assert str(resumed[0][1]["portfolio_id"].dtype) == "category"
+
+
+def test_read_chunks_resumes_by_record_across_quoted_newlines(tmp_path):
+    path = tmp_path / "transactions.csv"
+    write_transactions(path, 25)
+    df = pd.read_csv(path)
+    df["note"] = [f"line one\nline two {i}" if i % 3 == 0 else "" for i in range(25)]
+    df.to_csv(path, index=False)
+
+    full = pd.concat([c for _, c in read_chunks(path, chunk_rows=10)])
+    resumed = list(read_chunks(path, chunk_rows=10, skip_chunks=1))
+
+    assert [(line, len(c)) for line, c in resumed] == [(12, 10), (22, 5)]
+    pd.testing.assert_frame_equal(
+        pd.concat([c for _, c in resumed]).reset_index(drop=True),
+        full.iloc[10:].reset_index(drop=True),
+    )
+
+
+def snowflake_standin():
+    """DuckDB with the stage and target tables under the same qualified names."""
+    con = duckdb.connect()
+    con.execute("ATTACH ':memory:' AS PORTFOLIO")
+    con.execute("CREATE SCHEMA PORTFOLIO.RAW")
+    for table in (STAGE_TABLE, TARGET_TABLE):
+        con.execute(
+            f"CREATE TABLE {table} (transaction_id VARCHAR, portfolio_id VARCHAR, "
+            "symbol VARCHAR, quantity_delta DOUBLE, transaction_date DATE, "
+            "transaction_type VARCHAR)"
+        )
+    return con
+
+
+def stage_upload(con, fail_on_call=None):
+    calls = []
+
+    def upload(chunk):
+        calls.append(len(chunk))
+        if len(calls) == fail_on_call:
+            raise ConnectionError("connection lost while staging")
+        con.register("chunk", chunk.astype({c: "object" for c in COLUMNS[:3]}))
+        con.execute(f"INSERT INTO {STAGE_TABLE} SELECT {', '.join(COLUMNS)} FROM chunk")
+        con.unregister("chunk")
+
+    return upload
+
+
+def attempt(con, path, index, fail_on_call=None):
+    cur = con.cursor()
+    return stream_csv(
+        str(path),
+        upload=stage_upload(con, fail_on_call),
+        chunk_rows=10,
+        on_fresh_start=lambda: _truncate_stage(cur),
+        index=index,
+    )
+
+
+def target_ids(con):
+    rows = con.execute(f"SELECT transaction_id FROM {TARGET_TABLE}").fetchall()
+    return sorted(r[0] for r in rows)
+
+
+def test_resume_after_crash_before_merge(data_dir):
+    path = data_dir / "transactions.csv"
+    write_transactions(path, 25)
+    con = snowflake_standin()
+    index = RowHashIndex(data_dir / "index")
+    fingerprint = file_fingerprint(str(path))
+
+    attempt(con, path, index)  # every chunk staged, then the task dies before MERGE
+
+    retry = attempt(con, path, index)
+    assert retry["staged"] == 0
+    assert finish_load(con.cursor(), index, fingerprint) == 25
+    assert target_ids(con) == [f"T{i:05d}" for i in range(25)]
+    assert len(index) == 25 and index.unchanged(fingerprint)
+    assert not _checkpoint_path().exists()
+
+
+def test_resume_after_crash_while_staging(data_dir):
+    path = data_dir / "transactions.csv"
+    write_transactions(path, 25)
+    con = snowflake_standin()
+    index = RowHashIndex(data_dir / "index")
+
+    with pytest.raises(ConnectionError):
+        attempt(con, path, index, fail_on_call=2)
+
+    retry = attempt(con, path, index)
+    assert retry["staged"] == 15  # chunks 2 and 3 only
+    assert finish_load(con.cursor(), index, file_fingerprint(str(path))) == 25
+    assert target_ids(con) == [f"T{i:05d}" for i in range(25)]
+
+
+def test_failed_merge_leaves_index_uncommitted(data_dir):
+    path = data_dir / "transactions.csv"
+    write_transactions(path, 25)
+    con = snowflake_standin()
+    index = RowHashIndex(data_dir / "index")
+    attempt(con, path, index)
+    con.execute(f"DROP TABLE {TARGET_TABLE}")
+
+    with pytest.raises(duckdb.Error):
+        finish_load(con.cursor(), index, file_fingerprint(str(path)))
+    assert len(index) == 0 and index.fingerprint is None
+    assert _checkpoint_path().exists()
@@ -0,0 +1,211 @@
+import duckdb
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.pipeline.jobs.portfolio_metrics import STATE_SQL, _inputs, _next_state
+from src.pipeline.transform.portfolio_metrics import (
+    VOL_WINDOW,
+    SortedWindow,
+    compute_portfolio_metrics,
+)
+
+CHECKED = ["ROLLING_30D_VOLATILITY", "DAILY_VAR_95"]
+# The former VIEW_PORTFOLIO_METRICS (04_portfolio_metrics.sql) in DuckDB dialect
+REFERENCE_SQL = """
+WITH with_vol AS (
+    SELECT
+        d.*,
+        STDDEV_SAMP(d.weighted_daily_return) OVER (
+            PARTITION BY d.PORTFOLIO_ID ORDER BY d.DATE ROWS BETWEEN 29 PRECEDING AND CURRENT ROW
+        ) AS rolling_30d_volatility
+    FROM daily d
+)
+SELECT
+    v.PORTFOLIO_ID,
+    v.DATE,
+    v.rolling_30d_volatility,
+    (
+        SELECT PERCENTILE_CONT(0.05) WITHIN GROUP (ORDER BY d2.weighted_daily_return)
+        FROM daily d2
+        WHERE d2.PORTFOLIO_ID = v.PORTFOLIO_ID
+          AND d2.DATE BETWEEN v.DATE - INTERVAL 29 DAY AND v.DATE
+    ) AS daily_var_95
+FROM with_vol v
+"""
+
+
+def run_sql(daily: pd.DataFrame) -> pd.DataFrame:
+    con = duckdb.connect()
+    con.register("daily", daily)
+    return con.execute(REFERENCE_SQL).df().rename(columns=str.upper)
+
+
+@pytest.fixture(scope="module")
+def daily(portfolio_returns):
+    """30 portfolios' last year, some days dropped so row and calendar windows differ."""
+    base, _ = portfolio_returns
+    base = base[
+        (base["PORTFOLIO_ID"] < "P00030")
+        & (base["DATE"] > base["DATE"].max() - pd.Timedelta(days=365))
+    ]
+    gaps = np.random.default_rng(2).random(len(base)) < 0.05
+    return base[~gaps].reset_index(drop=True)
+
+
+def assert_matches_view(ours: pd.DataFrame, ref: pd.DataFrame):
+    keys = ["PORTFOLIO_ID", "DATE"]
+    ours, ref = ours.copy(), ref.copy()
+    for df in (ours, ref):
+        df["DATE"] = pd.to_datetime(df["DATE"])
+    merged = ours.merge(ref, on=keys, suffixes=("", "_SQL"), validate="one_to_one")
+    assert len(merged) == len(ours) == len(ref)
+    for col in CHECKED:
+        a = merged[col].to_numpy(dtype=np.float64)
+        b = merged[f"{col}_SQL"].to_numpy(dtype=np.float64)
+        bad = ~np.isclose(a, b, rtol=1e-9, atol=1e-12, equal_nan=True)
+        assert not bad.any(), f"{col}: {bad.sum()} of {len(a)} values differ"
+
+
+def test_sorted_window_percentile_cont():
+    rng = np.random.default_rng(0)
+    values = rng.normal(size=25).tolist()
+    window = SortedWindow()
+    for v in values:
+        window.add(v)
+    for v in values[:5]:
+        window.remove(v)
+    expected = np.quantile(values[5:], 0.05)  # linear interpolation
+    assert len(window) == 20
+    assert np.isclose(window.percentile_cont(0.05), expected)
+
+
+def test_full_build_matches_former_view(daily):
+    assert_matches_view(compute_portfolio_metrics(daily), run_sql(daily))
+
+
+def test_incremental_runs_match_former_view(daily):
+    """Daily appends with only the last VOL_WINDOW - 1 rows per portfolio as context."""
+    days = np.sort(daily["DATE"].unique())
+    runs = 15
+    done = compute_portfolio_metrics(daily[daily["DATE"] <= days[-runs - 1]])
+    for day in days[-runs:]:
+        context = (
+            done.sort_values("DATE")
+            .groupby("PORTFOLIO_ID", sort=False)
+            .tail(VOL_WINDOW - 1)
+        )
+        new = compute_portfolio_metrics(daily[daily["DATE"] == day], context)
+        done = pd.concat([done, new], ignore_index=True)
+
+    assert_matches_view(done, run_sql(daily))
+
+
+def _insert(con, table: str, df: pd.DataFrame):
+    con.register("rows", df)
+    con.execute(
+        f"INSERT OR REPLACE INTO PORTFOLIO.ANALYTICS.{table} SELECT * FROM rows"
+    )
+    con.unregister("rows")
+
+
+def _run_job(con, cur, until):
+    """build_portfolio_metrics' steps, with DuckDB upserts."""
+    state = cur.execute(STATE_SQL).fetch_pandas_all()
+    since = state["LOADED_THROUGH"].min() if len(state) else None
+    daily, context = _inputs(cur, since, until)
+    if len(daily):
+        _insert(con, "FACT_PORTFOLIO_DAILY", compute_portfolio_metrics(daily, context))
+    _insert(con, "PORTFOLIO_METRICS_STATE", _next_state(state, daily, until))
+    return daily
+
+
+def test_job_recomputes_late_prices_and_new_portfolios(warehouse, cursor):
+    con = warehouse
+    con.execute("""
+        CREATE TABLE PORTFOLIO.ANALYTICS.FACT_PRICES (
+            SYMBOL VARCHAR, DATE DATE, CLOSE_GBP DOUBLE, DAILY_RETURN DOUBLE,
+            _LOADED_AT TIMESTAMP, PRIMARY KEY (SYMBOL, DATE)
+        );
+        CREATE TABLE PORTFOLIO.ANALYTICS.PORTFOLIO_POSITIONS_DAILY (
+            PORTFOLIO_ID VARCHAR, SYMBOL VARCHAR, DATE DATE, QUANTITY DOUBLE,
+            _CREATED_AT TIMESTAMP, PRIMARY KEY (PORTFOLIO_ID, SYMBOL, DATE)
+        );
+        CREATE TABLE PORTFOLIO.ANALYTICS.FACT_PORTFOLIO_DAILY (
+            PORTFOLIO_ID VARCHAR, DATE DATE, TOTAL_VALUE_GBP DOUBLE,
+            WEIGHTED_DAILY_RETURN DOUBLE, ROLLING_30D_VOLATILITY DOUBLE,
+            DAILY_VAR_95 DOUBLE, PRIMARY KEY (PORTFOLIO_ID, DATE)
+        );
+        CREATE TABLE PORTFOLIO.ANALYTICS.PORTFOLIO_METRICS_STATE (
+            PORTFOLIO_ID VARCHAR PRIMARY KEY, LOADED_THROUGH TIMESTAMP
+        );
+    """)
+    rng = np.random.default_rng(3)
+    days = pd.bdate_range("2025-01-01", periods=81)
+
+    def prices(symbol, dates, loaded_at):
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, len(dates))))
+        return pd.DataFrame(
+            {
+                "SYMBOL": symbol,
+                "DATE": dates.date,
+                "CLOSE_GBP": close,
+                "DAILY_RETURN": pd.Series(close).pct_change().to_numpy(),
+                "_LOADED_AT": pd.Timestamp(loaded_at),
+            }
+        )
+
+    def positions(portfolio, holdings, dates, created_at):
+        return pd.DataFrame(
+            [
+                (portfolio, symbol, day, qty, pd.Timestamp(created_at))
+                for symbol, qty in holdings.items()
+                for day in dates.date
+            ],
+            columns=["PORTFOLIO_ID", "SYMBOL", "DATE", "QUANTITY", "_CREATED_AT"],
+        )
+
+    # First load: LATE's prices are missing (its load failed)
+    first = "2025-04-30 06:00"
+    _insert(
+        con,
+        "FACT_PRICES",
+        pd.concat([prices(s, days[:80], first) for s in ("AAA", "BBB")]),
+    )
+    held = {"P1": {"AAA": 10, "LATE": 5}, "P2": {"BBB": 3}}
+    for p, holdings in held.items():
+        _insert(
+            con, "PORTFOLIO_POSITIONS_DAILY", positions(p, holdings, days[:80], first)
+        )
+    assert len(_run_job(con, cursor, "2025-04-30 07:00")) == 2 * 80
+
+    # Next load: LATE's whole history, the next day, and a new portfolio P3 with
+    # positions back to day 10
+    second = "2025-05-01 06:00"
+    _insert(con, "FACT_PRICES", prices("LATE", days, second))
+    for s in ("AAA", "BBB"):
+        _insert(con, "FACT_PRICES", prices(s, days[80:], second))
+    for p, holdings in held.items():
+        _insert(
+            con, "PORTFOLIO_POSITIONS_DAILY", positions(p, holdings, days[80:], second)
+        )
+    p3 = positions("P3", {"AAA": 1, "BBB": 2}, days[10:], second)
+    _insert(con, "PORTFOLIO_POSITIONS_DAILY", p3)
+    daily = _run_job(con, cursor, "2025-05-01 07:00")
+
+    counts = daily["PORTFOLIO_ID"].value_counts()
+    assert counts["P1"] == 81  # LATE re-priced all of P1's history
+    assert counts["P2"] == 1  # only the new day
+    assert counts["P3"] == 71
+
+    built = con.execute("SELECT * FROM PORTFOLIO.ANALYTICS.FACT_PORTFOLIO_DAILY").df()
+    everything, _ = _inputs(cursor, None, None)
+    expected = compute_portfolio_metrics(everything)
+    assert len(built) == len(expected) == 81 + 81 + 71
+    assert_matches_view(built, expected)
+    merged = built.merge(expected, on=["PORTFOLIO_ID", "DATE"], suffixes=("", "_FULL"))
+    for col in ["TOTAL_VALUE_GBP", "WEIGHTED_DAILY_RETURN"]:
+        assert np.allclose(merged[col], merged[f"{col}_FULL"], equal_nan=True)
+
+    # Nothing loaded since: nothing recomputed
+    assert len(_run_job(con, cursor, "2025-05-02 07:00")) == 0
@@ -0,0 +1,165 @@
+import duckdb
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.pipeline.transform.positions import (
+    KEYS,
+    RUN_COLUMNS,
+    expand_daily,
+    position_runs,
+    positions_as_of,
+)
+
+# 05_positions_daily.sql's first load in DuckDB dialect
+REFERENCE_SQL = """
+WITH base AS (
+    SELECT DISTINCT portfolio_id, symbol FROM tx
+),
+deltas AS (
+    SELECT portfolio_id, symbol, transaction_date AS date,
+           SUM(CAST(quantity_delta AS DECIMAL(18, 6))) AS qty_delta
+    FROM tx
+    WHERE transaction_date <= $as_of
+    GROUP BY 1, 2, 3
+),
+date_spine AS (
+    SELECT CAST(d AS DATE) AS date
+    FROM generate_series(
+        (SELECT MIN(transaction_date) FROM tx), $as_of, INTERVAL 1 DAY
+    ) t(d)
+),
+calc AS (
+    SELECT b.portfolio_id, b.symbol, s.date,
+           SUM(COALESCE(dl.qty_delta, 0)) OVER (
+               PARTITION BY b.portfolio_id, b.symbol ORDER BY s.date
+               ROWS UNBOUNDED PRECEDING
+           ) AS quantity
+    FROM base b
+    CROSS JOIN date_spine s
+    LEFT JOIN deltas dl
+      ON dl.portfolio_id = b.portfolio_id
+     AND dl.symbol = b.symbol
+     AND dl.date = s.date
+)
+SELECT portfolio_id, symbol, date, CAST(quantity AS DOUBLE) AS quantity,
+       quantity <> 0 AS held
+FROM calc
+"""
+
+
+def synthetic_transactions(
+    transactions: int, portfolios: int, symbols: int, years: int, seed: int = 0
+) -> pd.DataFrame:
+    """
+    PORTFOLIO_TRANSACTIONS-shaped rows: 6-decimal quantities, several trades on
+    some days, short positions, and about one trade in six closing the position
+    out exactly (the running quantity returns to zero).
+    """
+    rng = np.random.default_rng(seed)
+    end = pd.Timestamp("2025-09-30")
+    days = pd.date_range(end=end, periods=365 * years).to_numpy("datetime64[D]")
+    ids = np.array([f"P{i:05d}" for i in range(portfolios)], dtype=object)
+    syms = np.array([f"S{i:04d}" for i in range(symbols)], dtype=object)
+
+    # Keys trade at different rates; dates are independent uniform draws
+    key = rng.zipf(1.3, transactions) % (portfolios * symbols)
+    tx = pd.DataFrame(
+        {
+            "PORTFOLIO_ID": ids[key // symbols],
+            "SYMBOL": syms[key % symbols],
+            "TRANSACTION_DATE": rng.choice(days, transactions),
+            "QUANTITY_DELTA": np.round(rng.normal(5, 40, transactions), 6),
+        }
+    ).sort_values(KEYS + ["TRANSACTION_DATE"], kind="stable", ignore_index=True)
+
+    # Close-outs: the last trade of a day sells exactly what is held, so the
+    # day ends flat. Each close-out ends a segment of its key's trades.
+    micro = np.rint(tx["QUANTITY_DELTA"].to_numpy() * 1e6).astype(np.int64)
+    code = tx.groupby(KEYS, sort=False).ngroup().to_numpy()
+    dates = tx["TRANSACTION_DATE"].to_numpy()
+    last_of_day = np.ones(transactions, dtype=bool)
+    last_of_day[:-1] = (code[1:] != code[:-1]) | (dates[1:] != dates[:-1])
+    close = (rng.random(transactions) < 1 / 6) & last_of_day
+    micro[close] = 0
+    closes = pd.Series(close.astype(np.int64)).groupby(code).cumsum().to_numpy()
+    segment = closes - close
+    held = pd.Series(micro).groupby([code, segment]).transform("sum").to_numpy()
+    micro[close] = -held[close]
+    tx["QUANTITY_DELTA"] = micro / 1e6
+    return tx
+
+
+def run_sql(tx: pd.DataFrame, as_of) -> pd.DataFrame:
+    con = duckdb.connect()
+    con.register("tx", tx)
+    out = con.execute(REFERENCE_SQL, {"as_of": pd.Timestamp(as_of).date()}).df()
+    return out.rename(columns=str.upper)
+
+
+def expand_all(runs: pd.DataFrame, start, end) -> pd.DataFrame:
+    return pd.concat(expand_daily(runs, start, end), ignore_index=True)
+
+
+def replay_incremental(tx: pd.DataFrame, runs: int, as_of) -> pd.DataFrame:
+    """Full replay up to a cutoff, then `runs` daily runs fed the open runs only."""
+    days = np.sort(tx["TRANSACTION_DATE"].unique())
+    cutoff = days[-runs - 1]
+    table = position_runs(tx[tx["TRANSACTION_DATE"] <= cutoff], as_of=cutoff)
+    for day in days[-runs:]:
+        new = tx[(tx["TRANSACTION_DATE"] > cutoff) & (tx["TRANSACTION_DATE"] <= day)]
+        open_runs = table[table["VALID_TO"].isna()]
+        touched = pd.MultiIndex.from_frame(open_runs[KEYS]).isin(
+            pd.MultiIndex.from_frame(new[KEYS])
+        )
+        changed = position_runs(new, opening=open_runs[touched], as_of=day)
+        # Upsert on the runs table's primary key
+        table = pd.concat([table, changed], ignore_index=True).drop_duplicates(
+            subset=KEYS + ["VALID_FROM"], keep="last"
+        )
+        cutoff = day
+    return table.sort_values(RUN_COLUMNS[:3], ignore_index=True)
+
+
+@pytest.fixture(scope="module")
+def tx():
+    # A key set small enough for the dense SQL
+    return synthetic_transactions(20_000, portfolios=40, symbols=10, years=2)
+
+
+def test_runs_expand_to_05_sql_non_zero_rows(tx):
+    as_of = tx["TRANSACTION_DATE"].max()
+    start = tx["TRANSACTION_DATE"].min()
+    ours = expand_all(position_runs(tx, as_of=as_of), start, as_of)
+    ref = run_sql(tx, as_of)
+    held = ref[ref["HELD"]].drop(columns="HELD")
+    for df in (ours, held):
+        df["DATE"] = pd.to_datetime(df["DATE"])
+
+    merged = ours.merge(held, on=KEYS + ["DATE"], how="outer", suffixes=("", "_SQL"))
+    assert not merged["QUANTITY"].isna().any(), "rows missing from the engine"
+    assert not merged["QUANTITY_SQL"].isna().any(), "rows the SQL does not hold"
+    assert np.allclose(merged["QUANTITY"], merged["QUANTITY_SQL"], rtol=0, atol=5e-7)
+    assert len(held) < len(ref)  # close-outs leave zero rows in the dense SQL
+
+
+def test_incremental_runs_match_full_replay(tx):
+    as_of = tx["TRANSACTION_DATE"].max()
+    full = position_runs(tx, as_of=as_of).sort_values(
+        RUN_COLUMNS[:3], ignore_index=True
+    )
+    replayed = replay_incremental(tx, 15, as_of)
+    pd.testing.assert_frame_equal(
+        replayed[RUN_COLUMNS].astype(full.dtypes.to_dict()), full[RUN_COLUMNS]
+    )
+
+
+def test_positions_as_of_matches_expanded_day(tx):
+    as_of = tx["TRANSACTION_DATE"].max()
+    runs = position_runs(tx, as_of=as_of)
+    day = as_of - pd.Timedelta(days=100)
+    expected = expand_all(runs, day, day)
+    holdings = positions_as_of(runs, day)
+    merged = holdings.merge(expected, on=KEYS, suffixes=("", "_DAY"), validate="1:1")
+    assert len(merged) == len(holdings) == len(expected)
+    assert np.allclose(merged["QUANTITY"], merged["QUANTITY_DAY"])
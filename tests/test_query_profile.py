@@ -0,0 +1,106 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from src.pipeline.utils.query_profile import (
+    APP,
+    aggregate_by_task,
+    completed_runs,
+    flag_regressions,
+    new_regressions,
+)
+
+RUNS = 12
+TASKS = {
+    # task_id: (map instances, queries per instance, seconds, GB scanned)
+    "incremental_load": (3, 6, 4.0, 0.2),
+    "build_fact_prices": (1, 5, 12.0, 1.5),
+    "build_positions_daily": (1, 8, 20.0, 2.0),
+    "build_portfolio_metrics": (1, 4, 9.0, 0.8),
+}
+REGRESSED = "build_portfolio_metrics"
+
+
+def _tag(task, run, map_index=None, app=APP):
+    tag = {"app": app, "dag": "etl_uk_portfolio_health", "task": task, "run": run}
+    if map_index is not None:
+        tag["map_index"] = map_index
+    return json.dumps(tag, separators=(",", ":"))
+
+
+def synthetic_history(runs: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    rows = []
+    for r in range(runs):
+        run = f"scheduled__2025-09-{r + 1:02d}T06:00:00+00:00"
+        start = pd.Timestamp("2025-09-01 06:00") + pd.Timedelta(days=r)
+        for task, (instances, queries, seconds, gb) in TASKS.items():
+            scale = 3.0 if (task == REGRESSED and r == runs - 1) else 1.0
+            for m in range(instances):
+                for _ in range(queries):
+                    jitter = rng.uniform(0.9, 1.1)
+                    elapsed = seconds / queries * scale * jitter * 1000
+                    rows.append(
+                        {
+                            "QUERY_ID": f"q{len(rows)}",
+                            "QUERY_TAG": _tag(task, run, m if instances > 1 else None),
+                            "START_TIME": start,
+                            "END_TIME": start + pd.Timedelta(milliseconds=elapsed),
+                            "TOTAL_ELAPSED_TIME": elapsed,
+                            "EXECUTION_TIME": elapsed * 0.9,
+                            "QUEUED_OVERLOAD_TIME": 0,
+                            "BYTES_SCANNED": int(gb / queries * scale * jitter * 2**30),
+                            "PARTITIONS_SCANNED": int(40 * scale * jitter),
+                            "PARTITIONS_TOTAL": 400,
+                            "BYTES_SPILLED_TO_LOCAL_STORAGE": 0,
+                            "BYTES_SPILLED_TO_REMOTE_STORAGE": 0,
+                            "ROWS_PRODUCED": 1000,
+                        }
+                    )
+                    start += pd.Timedelta(milliseconds=elapsed)
+        # Not ours: ad-hoc queries and another application's tags
+        for tag in ("", "adhoc analysis", _tag("build_fact_prices", run, app="other")):
+            rows.append({**rows[-1], "QUERY_ID": f"q{len(rows)}", "QUERY_TAG": tag})
+    return pd.DataFrame(rows)
+
+
+def profile():
+    return aggregate_by_task(synthetic_history(RUNS))
+
+
+def run(i):
+    return f"scheduled__2025-09-{i + 1:02d}T06:00:00+00:00"
+
+
+def test_completed_runs_skips_current_and_unsettled_runs():
+    p = profile()
+    last_end = pd.Timestamp(p.loc[p["RUN_ID"] == run(RUNS - 1), "RUN_END"].max())
+
+    settled = completed_runs(p, settle_minutes=45, now=last_end + pd.Timedelta("1h"))
+    assert settled["RUN_ID"].nunique() == RUNS
+
+    lagging = completed_runs(p, settle_minutes=45, now=last_end + pd.Timedelta("10min"))
+    assert run(RUNS - 1) not in set(lagging["RUN_ID"])
+    assert lagging["RUN_ID"].nunique() == RUNS - 1
+
+    current = completed_runs(
+        p, current_run=run(RUNS - 2), now=last_end + pd.Timedelta("1h")
+    )
+    assert run(RUNS - 2) not in set(current["RUN_ID"])
+
+    aware = completed_runs(p, now=(last_end + pd.Timedelta("1h")).tz_localize("UTC"))
+    assert len(aware) == len(p)
+
+
+def test_regression_is_alerted_once():
+    flagged = flag_regressions(profile())
+    first = new_regressions(flagged, flagged.iloc[0:0])
+    assert list(zip(first["RUN_ID"], first["TASK_ID"])) == [(run(RUNS - 1), REGRESSED)]
+
+    # The next run re-profiles the lookback window, now stored with its flag
+    assert len(new_regressions(flagged, flagged)) == 0
+
+    # Stored before it was flagged (e.g. a shorter trailing baseline): alert now
+    stored = flagged.assign(REGRESSION=None)
+    assert len(new_regressions(flagged, stored)) == 1